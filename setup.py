@@ -16,6 +16,8 @@ extras_require = dict(
         "panel>=0.12",
         "holoviews>=1.14",
     ],
+    hdf5=["h5py>=3"],
+    blosc=["blosc"],
     docs=["sphinx>=1.4", "nbsphinx", "sphinx-autobuild", "sphinx-rtd-theme"],
     dev=["versioneer", "black", "jupyterlab>=3.1", "pooch"],
     test=["pytest>=3.8", "hypothesis>=4.53"],
@@ -0,0 +1,109 @@
+import os
+import os.path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import xcompact3d_toolbox as x3d
+from xcompact3d_toolbox.cache import GeometryCache, load_mask, save_mask
+
+from .test_sandbox import cube
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GeometryCache(path=str(tmp_path / "cache"))
+
+
+def test_cache_key():
+    array = np.arange(10.0)
+    key = GeometryCache.key("a", array, dict(x=1, y=(2, 3)))
+    assert key == GeometryCache.key("a", array.copy(), dict(y=(2, 3), x=1))
+    assert key != GeometryCache.key("a", array.astype(np.float32), dict(x=1, y=(2, 3)))
+    assert key != GeometryCache.key("a", array, dict(x=1, y=(2, 4)))
+    assert key != GeometryCache.key("b", array, dict(x=1, y=(2, 3)))
+
+
+def test_cache_store_load(cache):
+    mask = np.random.default_rng(0).random((5, 7, 3)) > 0.5
+    key = cache.key("mask")
+    assert cache.load(key) is None
+
+    with cache.store(key) as entry:
+        save_mask(entry, "mask", mask)
+
+    np.testing.assert_equal(load_mask(cache.load(key), "mask"), mask)
+
+
+def test_cache_store_failure(cache):
+    key = cache.key("failure")
+    with pytest.raises(RuntimeError):
+        with cache.store(key) as entry:
+            save_mask(entry, "mask", np.ones(10, dtype=bool))
+            raise RuntimeError
+    assert cache.load(key) is None
+    assert cache.size() == 0
+
+
+def test_cache_evict(cache):
+    keys = [cache.key(n) for n in range(3)]
+    for n, key in enumerate(keys):
+        with cache.store(key) as entry:
+            with open(os.path.join(entry, "data"), "wb") as file:
+                file.write(bytes(1000))
+        os.utime(cache.load(key), (n, n))
+
+    # Recently used
+    cache.load(keys[0])
+
+    cache.max_size = 2000
+    cache.evict()
+    assert cache.load(keys[1]) is None
+    assert cache.load(keys[0]) is not None
+    assert cache.load(keys[2]) is not None
+
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_from_stl_cache(cache, cube):
+    prm = x3d.Parameters(xlx=2.0, yly=2.0, zlz=2.0, iibm=2)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    ds_stl = epsi.geo.from_stl(stl_mesh=cube, user_tol=0.05, cache=cache)
+    assert cache.size() > 0
+
+    # The cache is content-addressed, so the mesh is not even tested now
+    cube_shifted = type(cube)(cube.data.copy())
+    ds_cached = epsi.geo.from_stl(stl_mesh=cube_shifted, user_tol=0.05, cache=cache)
+    xr.testing.assert_equal(ds_stl, ds_cached)
+
+    cube_shifted.translate([0.5, 0.0, 0.0])
+    ds_shifted = epsi.geo.from_stl(stl_mesh=cube_shifted, user_tol=0.05, cache=cache)
+    assert not ds_shifted.equals(ds_stl)
+
+
+def test_gene_epsi_3D_cache(cache, tmp_path):
+    prm = x3d.Parameters(
+        xlx=4.0, yly=4.0, zlz=4.0, nx=17, ny=17, nz=17, iibm=2, nraf=4
+    )
+    prm.dataset.data_path = str(tmp_path / "data")
+    epsi = x3d.init_epsi(prm)
+    for key in epsi.keys():
+        epsi[key] = epsi[key].geo.sphere(x=2.0, y=2.0, z=2.0, radius=1.0)
+
+    ds = x3d.gene_epsi_3D(epsi, prm, cache=cache)
+    geometry = os.path.join(prm.dataset.data_path, "geometry")
+    files = {}
+    for filename in sorted(os.listdir(geometry)):
+        with open(os.path.join(geometry, filename), "rb") as file:
+            files[filename] = file.read()
+        os.remove(os.path.join(geometry, filename))
+
+    ds_cached = x3d.gene_epsi_3D(epsi, prm, cache=cache)
+    xr.testing.assert_identical(ds, ds_cached)
+    (entry,) = cache._entries()
+    assert "epsi.npz" in os.listdir(entry)
+    for filename, content in files.items():
+        with open(os.path.join(geometry, filename), "rb") as file:
+            assert file.read() == content
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+import xcompact3d_toolbox as x3d
+from xcompact3d_toolbox.csg import Box, Cylinder, HalfSpace, Sphere
+
+
+@pytest.fixture
+def epsi():
+    prm = x3d.Parameters(
+        xlx=4.0, yly=3.0, zlz=2.0, nx=33, ny=25, nz=16, nclz1=0, nclzn=0, iibm=1
+    )
+    return x3d.init_epsi(prm)["epsi"]
+
+
+@pytest.mark.parametrize(
+    "shape, reference",
+    [
+        (
+            Box(x=(1.0, 2.5), z=(0.5, 1.0)),
+            lambda epsi: epsi.geo.box(x=(1.0, 2.5), z=(0.5, 1.0)),
+        ),
+        (
+            Cylinder(x=2.0, y=1.5, radius=0.6),
+            lambda epsi: epsi.geo.cylinder(x=2.0, y=1.5, radius=0.6),
+        ),
+        (
+            Cylinder(x=2.0, y=1.0, z=1.0, axis="y", radius=0.4, height=1.0),
+            lambda epsi: epsi.geo.cylinder(
+                x=2.0, y=1.0, z=1.0, axis="y", radius=0.4, height=1.0
+            ),
+        ),
+        (
+            Sphere(x=1.0, y=1.0, z=1.0, radius=0.8),
+            lambda epsi: epsi.geo.sphere(x=1.0, y=1.0, z=1.0, radius=0.8),
+        ),
+    ],
+)
+def test_csg_primitives(epsi, shape, reference):
+    xr.testing.assert_equal(epsi.geo.from_csg(shape), reference(epsi))
+
+
+def test_csg_operators(epsi):
+    a = Sphere(x=1.5, y=1.5, z=1.0, radius=0.8)
+    b = Box(x=(1.0, 3.0), y=(1.0, 2.0))
+    c = Cylinder(x=2.5, y=1.5, radius=0.3)
+    mask_a, mask_b, mask_c = (epsi.geo.from_csg(shape).values for shape in (a, b, c))
+
+    shape = (a | b) - (c & HalfSpace(offset=3.0, x=1.0, z=1.0))
+    mask_d = (epsi.x + epsi.z <= 3.0).broadcast_like(epsi).values
+    reference = (mask_a | mask_b) & ~(mask_c & mask_d)
+    np.testing.assert_equal(epsi.geo.from_csg(shape).values, reference)
+
+    np.testing.assert_equal(
+        epsi.geo.from_csg((a & b) | c).values, (mask_a & mask_b) | mask_c
+    )
+    np.testing.assert_equal(
+        epsi.geo.from_csg(a, remp=False).values, np.zeros_like(mask_a)
+    )
+
+
+def test_csg_mirror(epsi):
+    shape = Sphere(x=1.5, y=1.5, z=0.5, radius=0.4) | Box(x=(3.0, 3.5), z=(0.0, 1.5))
+    mirror = shape.mirror("z", 0.5 * float(epsi.z[-1]))
+    xr.testing.assert_equal(
+        epsi.geo.from_csg(mirror), epsi.geo.from_csg(shape).geo.mirror("z")
+    )
+
+
+def test_csg_translate(epsi):
+    shape = Cylinder(radius=0.6).translate(x=2.0, y=1.5)
+    xr.testing.assert_equal(
+        epsi.geo.from_csg(shape), epsi.geo.cylinder(x=2.0, y=1.5, radius=0.6)
+    )
+
+
+def test_csg_empty(epsi):
+    shape = Sphere(x=10.0, y=10.0, z=10.0) | (Box(x=(0.0, 1.0)) & Box(x=(2.0, 3.0)))
+    assert not epsi.geo.from_csg(shape).any()
+
+
+def test_csg_dask(epsi):
+    shape = (
+        Sphere(x=1.5, y=1.5, z=0.5, radius=0.4) | Cylinder(x=3.0, y=1.0, radius=0.5)
+    ).mirror("z", 1.0)
+    ds_dask = epsi.chunk(dict(x=8, y=8)).geo.from_csg(shape)
+    assert ds_dask.chunks is not None
+    xr.testing.assert_equal(ds_dask.compute(), epsi.geo.from_csg(shape))
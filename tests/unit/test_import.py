@@ -0,0 +1,77 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import xcompact3d_toolbox as x3d
+
+CODE = """
+import json, sys, time
+start = time.perf_counter()
+import xcompact3d_toolbox
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(elapsed=elapsed, modules=sorted(sys.modules))))
+"""
+
+
+ACCESSORS = """
+import numpy as np
+import xarray as xr
+
+array = xr.DataArray(np.zeros(3), coords=dict(x=[0.0, 1.0, 2.0]), dims="x")
+print(type(array.x3d).__name__, type(array.geo).__name__)
+print(type(array.to_dataset(name="array").x3d).__name__)
+"""
+
+
+def import_toolbox():
+    output = subprocess.run(
+        [sys.executable, "-c", CODE], capture_output=True, check=True, text=True
+    )
+    return json.loads(output.stdout)
+
+
+def test_import_is_lazy():
+    result = import_toolbox()
+    heavy = {"dask", "IPython", "ipywidgets", "numba", "pandas", "scipy", "xarray"}
+    assert heavy.isdisjoint(result["modules"])
+
+
+@pytest.mark.parametrize("first", ["xcompact3d_toolbox", "xarray"])
+def test_accessors(first):
+    code = f"import {first}\nimport xcompact3d_toolbox\n{ACCESSORS}"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert output.stdout.split() == ["X3dDataArray", "Geometry", "X3dDataset"]
+    assert "AccessorRegistrationWarning" not in output.stderr
+
+
+def test_import_time():
+    assert min(import_toolbox()["elapsed"] for _ in range(3)) < 0.2
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "X3dDataArray",
+        "X3dDataset",
+        "gene_epsi_3D",
+        "ParametersGui",
+        "Parameters",
+        "init_dataset",
+        "init_epsi",
+        "sandbox",
+        "__version__",
+    ],
+)
+def test_lazy_attributes(name):
+    assert getattr(x3d, name) is not None
+    assert name in dir(x3d)
+
+
+def test_invalid_attribute():
+    with pytest.raises(AttributeError):
+        x3d.invalid_attribute
+    assert x3d.param["mytype"] is not None
@@ -1,4 +1,7 @@
 import filecmp
+import glob
+import os
+import time
 
 import numpy as np
 import pytest
@@ -46,6 +49,17 @@ def test_write_read_field(dataset):
     xr.testing.assert_equal(array_out, array_in)
 
 
+def test_write_read_field_dask(dataset):
+    coords = dataset._mesh.get()
+    shape = [len(x) for x in coords.values()]
+    numpy_array = np.random.random(size=shape).astype(x3d.param["mytype"])
+    filename = dataset.filename_properties.get_filename_for_binary("ux", 1)
+    array_out = xr.DataArray(numpy_array, coords=coords, dims=coords.keys())
+    dataset.write(array_out.chunk(dict(x=5, y=7, z=3)), filename)
+    array_in = dataset.load_array(dataset.data_path + filename, add_time=False)
+    xr.testing.assert_equal(array_out, array_in)
+
+
 @pytest.fixture
 def snapshot(dataset):
     def numpy_array(**kwargs):
@@ -113,3 +127,465 @@ def test_dataset_write_xdmf(dataset, snapshot, istret):
     assert filecmp.cmp(
         filename, f"./tests/unit/data/{filename}"
     )
+
+
+@pytest.mark.parametrize("split", [False, True])
+def test_dataset_write_xdmf_append(dataset, snapshot, split, tmp_path):
+    dataset.data_path = str(tmp_path / "data")
+    dataset.write(snapshot)
+    os.mkdir(tmp_path / "reference")
+    dataset.write_xdmf(str(tmp_path / "reference" / "snapshots.xdmf"), split=split)
+
+    # Just the first snapshots are available, and then the solver progresses
+    for filename in os.listdir(tmp_path / "data"):
+        if dataset.filename_properties.get_info_from_filename(filename)[0] > 5:
+            os.remove(tmp_path / "data" / filename)
+    os.mkdir(tmp_path / "append")
+    xdmf_name = str(tmp_path / "append" / "snapshots.xdmf")
+    dataset.write_xdmf(xdmf_name, split=split)
+    dataset.write(snapshot)
+    dataset.write_xdmf(xdmf_name, append=True, split=split)
+
+    files = os.listdir(tmp_path / "reference")
+    assert len(files) == (len(snapshot.t) + 1 if split else 1)
+    match, mismatch, errors = filecmp.cmpfiles(
+        tmp_path / "reference", tmp_path / "append", files, shallow=False
+    )
+    assert sorted(match) == sorted(files)
+
+
+@pytest.mark.parametrize("dim", ["x", "y", "z"])
+def test_load_plane(dataset, snapshot, dim):
+    filename = dataset.filename_properties.get_filename_for_binary(
+        "pp", 2, dataset.data_path
+    )
+    value = float(snapshot[dim][5]) + 0.01
+    xr.testing.assert_equal(
+        dataset.load_plane(filename, **{dim: value}),
+        dataset.load_array(filename).sel({dim: value}, method="nearest"),
+    )
+
+
+def test_i3d_string_to_dict():
+    string = """
+    ! Comment
+    &Group ! Comment
+    integer = 1
+    real = 1.0d-3 ! Comment
+    exponent = 1e5
+    string = 'a b ! c'
+    boolean = T, .false., .true.
+    array(1) = 1.
+    array(2) = 2.
+    values = 1, 2, 3*0.5
+    /End
+    """
+    assert x3d.io.i3d_string_to_dict(string) == dict(
+        Group=dict(
+            integer=1,
+            real=0.001,
+            exponent=1e5,
+            string="a b ! c",
+            boolean=[True, False, True],
+            array=[1.0, 2.0],
+            values=[1, 2, 0.5, 0.5, 0.5],
+        )
+    )
+
+    with pytest.warns(UserWarning, match="Can't convert invalid"):
+        assert x3d.io.i3d_string_to_dict("&Group\ninvalid = x\n/End") == dict(Group={})
+
+
+def test_prm_string_to_dict():
+    string = "# Comment\n1 #itype\n0.5 #re\n'name' #filename\n1. #xld(1)\n2d0 #xld(2)"
+    assert x3d.io.prm_string_to_dict(string) == dict(
+        itype=1, re=0.5, filename="name", xld=[1.0, 2.0]
+    )
+
+
+def test_i3d_to_dict_cache(tmp_path):
+    filename = tmp_path / "input.i3d"
+    filename.write_text("&Group\nvalues(1) = 1\n/End\n")
+
+    dictionary = x3d.io.i3d_to_dict(filename)
+    assert dictionary == dict(Group=dict(values=[1]))
+    # The cached entry is not changed by the caller
+    dictionary["Group"]["values"].append(2)
+    assert x3d.io.i3d_to_dict(filename) == dict(Group=dict(values=[1]))
+
+    filename.write_text("&Group\nvalues(1) = 10\n/End\n")
+    assert x3d.io.i3d_to_dict(filename) == dict(Group=dict(values=[10]))
+
+
+@pytest.mark.parametrize("chunks", [None, dict(x=5, y=7, z=3), dict(z=1)])
+def test_write_raw(dataset, chunks, tmp_path):
+    dataset.data_path = str(tmp_path) + "/"
+    coords = dataset._mesh.get()
+    shape = [len(x) for x in coords.values()]
+    # Any order for the dimensions and any dtype
+    array_out = xr.DataArray(
+        np.random.random(size=shape), coords=coords, dims=coords.keys()
+    ).transpose("y", "z", "x")
+    if chunks is not None:
+        array_out = array_out.chunk(chunks)
+    filename = dataset.filename_properties.get_filename_for_binary("raw", 0)
+    dataset.write(array_out, filename)
+
+    expected = array_out.values.astype(x3d.param["mytype"]).transpose(2, 0, 1)
+    with open(dataset.data_path + filename, "rb") as file:
+        assert file.read() == expected.tobytes(order="F")
+    # Not executable, as the files written by numpy
+    assert not os.stat(dataset.data_path + filename).st_mode & 0o111
+
+
+@pytest.mark.parametrize("chunks", [None, dict(t=1, z=4)])
+def test_write_max_workers(dataset, snapshot, chunks, tmp_path):
+    if chunks is not None:
+        snapshot = snapshot.chunk(chunks)
+    dataset.data_path = str(tmp_path) + "/"
+    dataset.write(snapshot, max_workers=4)
+    for k, time in enumerate(snapshot.t.values):
+        xr.testing.assert_equal(
+            snapshot.sel(t=time, drop=True), dataset[k].sel(t=time, drop=True)
+        )
+
+
+def test_write_manifest(dataset, snapshot, tmp_path):
+    dataset.set(data_path=str(tmp_path) + "/", manifest=True)
+    dataset.write(snapshot)
+
+    def inodes():
+        return {
+            filename: os.stat(tmp_path / filename).st_ino
+            for filename in os.listdir(tmp_path)
+        }
+
+    before = inodes()
+    manifest = dataset._load_manifest()
+    assert sorted(manifest) == sorted(set(before) - {".manifest.json"})
+    assert dataset.verify() == dataset.verify(full=True) == []
+
+    # Just the changed files are written again
+    snapshot["pp"][dict(t=0)] += 1.0
+    dataset.write(snapshot["pp"])
+    after = inodes()
+    changed = {filename for filename in before if before[filename] != after[filename]}
+    pp0 = dataset.filename_properties.get_filename_for_binary("pp", 0)
+    assert changed == {pp0, ".manifest.json"}
+    xr.testing.assert_equal(
+        snapshot["pp"].isel(t=0, drop=True),
+        dataset.load_array(str(tmp_path / pp0), add_time=False),
+    )
+
+    with open(tmp_path / pp0, "r+b") as file:
+        file.write(b"corrupted")
+    assert dataset.verify() == dataset.verify(full=True) == [pp0]
+
+
+def test_write_manifest_dask(dataset, snapshot, tmp_path):
+    dataset.set(data_path=str(tmp_path) + "/", manifest=True)
+    blocks = []
+
+    def compute(block):
+        blocks.append(block.shape)
+        return block
+
+    pp = snapshot["pp"].chunk(dict(t=1))
+    pp = pp.copy(data=pp.data.map_blocks(compute, meta=np.array((), pp.dtype)))
+
+    # Each block is computed just once, for both the hash and the file
+    dataset.write(pp)
+    assert len(blocks) == pp.data.npartitions
+    xr.testing.assert_equal(snapshot["pp"], dataset["pp"])
+    assert dataset.verify(full=True) == []
+
+
+@pytest.mark.parametrize("layout", ["hdf5", "hdf5-run"])
+def test_write_read_hdf5(dataset, snapshot, layout, tmp_path):
+    pytest.importorskip("h5py")
+    dataset.set(data_path=str(tmp_path) + "/", layout=layout)
+    dataset.write(snapshot)
+    assert not glob.glob(str(tmp_path / "*.bin"))
+    xr.testing.assert_equal(snapshot, dataset[:])
+    filename = dataset.filename_properties.get_filename_for_binary(
+        "pp", 2, dataset.data_path
+    )
+    value = float(snapshot["y"][5]) + 0.01
+    xr.testing.assert_equal(
+        dataset.load_plane(filename, y=value),
+        dataset.load_array(filename).sel(y=value, method="nearest"),
+    )
+
+    dataset.write_xdmf(str(tmp_path / "snapshots.xdmf"))
+    with open(tmp_path / "snapshots.xdmf", "r") as file:
+        xdmf = file.read()
+    assert "snapshots.h5:/pp" in xdmf if layout == "hdf5-run" else "000.h5:/pp" in xdmf
+
+
+@pytest.mark.parametrize("layout", ["hdf5", "hdf5-run"])
+def test_convert(dataset, snapshot, layout, tmp_path):
+    pytest.importorskip("h5py")
+    dataset.data_path = str(tmp_path) + "/"
+    dataset.write(snapshot)
+    dataset.convert(layout, remove=True)
+    assert not glob.glob(str(tmp_path / "*.bin"))
+    dataset.layout = layout
+    xr.testing.assert_equal(snapshot, dataset[:])
+
+
+def test_load_wind_turbine_data(tmp_path, monkeypatch):
+    prm = x3d.Parameters(dt=0.5, iturboutput=4)
+    prm.dataset.data_path = str(tmp_path / "data") + "/"
+    os.mkdir(tmp_path / "data")
+    rng = np.random.default_rng(0)
+    values = rng.random((12, 3))
+    for n, row in enumerate(values):
+        with open(tmp_path / f"{n * 10}_NREL.perf", "w") as file:
+            file.write(" Number of Revs, Thrust, Power\n")
+            file.write(" [-], [N], [W]\n")
+            file.write(", ".join(f"{value:.16e}" for value in row) + "\n")
+
+    cache = x3d.cache.GeometryCache(path=str(tmp_path / "cache"))
+    ds = prm.dataset.load_wind_turbine_data(max_workers=4, cache=cache)
+    np.testing.assert_array_equal(ds.t, 20.0 * np.arange(12))
+    np.testing.assert_array_equal(ds["Thrust"], values[:, 1])
+    assert ds["Power"].attrs["units"] == "W"
+    assert cache.size() > 0
+
+    # Loaded from the cache now
+    def fail(filename):
+        raise AssertionError
+
+    monkeypatch.setattr(x3d.io, "_read_perf", fail)
+    xr.testing.assert_identical(ds, prm.dataset.load_wind_turbine_data(cache=cache))
+    monkeypatch.undo()
+
+    with open(tmp_path / "120_NREL.perf", "w") as file:
+        file.write(" Number of Revs, Thrust\n")
+        file.write(" [-], [N]\n")
+        file.write("0.0, 0.0\n")
+    with pytest.raises(ValueError, match="columns"):
+        prm.dataset.load_wind_turbine_data()
+
+
+@pytest.mark.parametrize("layout", ["binary", "hdf5-run"])
+def test_extract_probes(dataset, snapshot, layout, tmp_path):
+    if layout != "binary":
+        pytest.importorskip("h5py")
+    dataset.set(data_path=str(tmp_path) + "/", layout=layout)
+    dataset._mesh.y.set(istret=1, beta=0.75)
+    snapshot = snapshot.assign_coords(y=dataset._mesh.y.vector)
+    dataset.write(snapshot)
+    points = dict(x=[0.0, 0.3, 1.0], y=[0.2, 1.0, 0.55], z=[0.9, 0.3, 1.0])
+
+    pp = dataset.extract_probes(points, "pp", max_workers=4)
+    assert pp.dims == ("probe", "t")
+    expected = snapshot["pp"].interp(
+        {dim: xr.DataArray(value, dims="probe") for dim, value in points.items()}
+    )
+    xr.testing.assert_allclose(pp, expected.transpose("probe", "t"))
+
+    ds = dataset.extract_probes(points, method="nearest")
+    assert sorted(ds) == ["phi1", "phi2", "phi3", "pp", "ux", "uy", "uz"]
+    expected = snapshot["pp"].sel(
+        {dim: xr.DataArray(value, dims="probe") for dim, value in points.items()},
+        method="nearest",
+    )
+    np.testing.assert_array_equal(ds["pp"], expected.transpose("probe", "t"))
+
+    with pytest.raises(ValueError):
+        dataset.extract_probes(dict(x=[-1.0], y=[0.0], z=[0.0]), "pp")
+
+
+@pytest.mark.parametrize(
+    "indexer", [dict(x=0.3), dict(y=0.55), dict(z=1.0), dict(y=1.2, z=0.3)]
+)
+@pytest.mark.parametrize("layout", ["binary", "hdf5"])
+def test_extract_planes(dataset, snapshot, indexer, layout, tmp_path):
+    if layout != "binary":
+        pytest.importorskip("h5py")
+        dataset.set(data_path=str(tmp_path / "hdf5") + "/", layout=layout)
+        os.mkdir(tmp_path / "hdf5")
+        dataset.write(snapshot)
+    planes = dataset.extract_planes(str(tmp_path) + "/", max_workers=4, **indexer)
+    assert planes.drop_coords == "".join(indexer)
+    expected = snapshot.sel(indexer, method="nearest").drop_vars(list(indexer))
+    xr.testing.assert_equal(planes[:], expected)
+
+    # Resumed, just the missing file is extracted again
+    pp0 = dataset.filename_properties.get_filename_for_binary("pp", 0)
+    os.remove(tmp_path / pp0)
+
+    def inodes():
+        return {
+            filename: os.stat(tmp_path / filename).st_ino
+            for filename in os.listdir(tmp_path)
+            if filename != "planes.json"
+        }
+
+    before = inodes()
+    dataset.extract_planes(str(tmp_path) + "/", **indexer)
+    after = inodes()
+    assert set(after) - set(before) == {pp0}
+    assert all(before[filename] == after[filename] for filename in before)
+    xr.testing.assert_equal(planes["pp"], expected["pp"])
+
+
+def test_extract_planes_invalidate(dataset, snapshot, tmp_path):
+    with pytest.raises(ValueError):
+        dataset.extract_planes(dataset.data_path, z=0.5)
+
+    # Another plane with the same size, the files from the first one are stale
+    dataset.extract_planes(str(tmp_path) + "/", variables=["pp", "ux"], z=0.5)
+    planes = dataset.extract_planes(str(tmp_path) + "/", variables="pp", z=1.0)
+    expected = snapshot["pp"].sel(z=1.0, method="nearest").drop_vars("z")
+    xr.testing.assert_equal(planes["pp"], expected)
+    assert not glob.glob(str(tmp_path / "ux-*.bin"))
+
+
+@pytest.mark.parametrize("method", ["mean", "stride"])
+def test_build_pyramid(dataset, snapshot, method, tmp_path):
+    dataset.data_path = str(tmp_path) + "/"
+    dataset.write(snapshot)
+    dataset.build_pyramid(levels=3, method=method, max_workers=4)
+
+    for level in range(1, 4):
+        factor = 2 ** level
+        if method == "mean":
+            expected = snapshot.coarsen(x=factor, y=factor, z=factor, boundary="pad")
+            expected = expected.mean()
+        else:
+            expected = snapshot.isel(
+                x=slice(None, None, factor),
+                y=slice(None, None, factor),
+                z=slice(None, None, factor),
+            )
+        for k in [0, 5]:
+            xr.testing.assert_allclose(
+                dataset.load_snapshot(k, level=level).sel(t=k, drop=True),
+                expected.isel(t=k, drop=True),
+            )
+
+    with pytest.raises(ValueError):
+        dataset.load_snapshot(0, level=4)
+
+    # Built again when the method changes
+    before = dataset.load_snapshot(0, level=1)
+    dataset.build_pyramid(levels=3, method="stride" if method == "mean" else "mean")
+    assert not before.equals(dataset.load_snapshot(0, level=1))
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma", "blosc"])
+def test_write_read_compressed(dataset, snapshot, compression, tmp_path):
+    if compression == "blosc":
+        pytest.importorskip("blosc")
+    dataset.set(data_path=str(tmp_path) + "/", compression=compression)
+    dataset.write(snapshot)
+    xr.testing.assert_equal(snapshot, dataset[:])
+
+    filename = dataset.filename_properties.get_filename_for_binary(
+        "pp", 2, dataset.data_path
+    )
+    xr.testing.assert_equal(
+        dataset.load_plane(filename, z=1.0),
+        dataset.load_array(filename).sel(z=1.0, method="nearest"),
+    )
+    points = dict(x=[0.3], y=[0.55], z=[1.0])
+    expected = snapshot["pp"].interp(
+        {dim: xr.DataArray(value, dims="probe") for dim, value in points.items()}
+    )
+    xr.testing.assert_allclose(
+        dataset.extract_probes(points, "pp"), expected.transpose("probe", "t")
+    )
+    dataset.build_pyramid(levels=1, method="stride", variables=["pp"])
+    step = slice(None, None, 2)
+    xr.testing.assert_equal(
+        dataset.load_snapshot(2, level=1)["pp"],
+        snapshot["pp"].isel(t=[2], x=step, y=step, z=step),
+    )
+
+
+def test_read_compressed_chunks(tmp_path, monkeypatch):
+    get_codec = x3d.io._get_codec
+    decoded, running, peak = [], [0], [0]
+
+    def slow_codec(name):
+        encode, decode = get_codec(name)
+
+        def slow_decode(buffer, values):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            decode(buffer, values)
+            decoded.append(values.size)
+            running[0] -= 1
+
+        return encode, slow_decode
+
+    monkeypatch.setattr(x3d.io, "_CHUNK_SIZE", 2 ** 16)
+    values = np.random.random(2 ** 16)
+    parts = x3d.io._encode(values, np.float64, "zlib")
+    filename = str(tmp_path / "values.bin")
+    x3d.io._write_parts(filename, parts)
+    monkeypatch.setattr(x3d.io, "_get_codec", slow_codec)
+
+    # Just the chunks with the requested values are decompressed
+    offsets = np.array([3, 10, 2 ** 15 + 1])
+    np.testing.assert_equal(
+        x3d.io._read_values(filename, offsets, np.float64), values[offsets]
+    )
+    assert len(decoded) == 2
+    # While the whole file is decompressed in parallel
+    decoded.clear()
+    np.testing.assert_equal(x3d.io._read_compressed(filename, max_workers=4), values)
+    assert len(decoded) == len(parts) - 3 == 8
+    assert peak[0] > 1
+
+
+def test_write_compressed_keepbits(dataset, snapshot, tmp_path):
+    snapshot["pp"][dict(t=0, x=0, y=0, z=0)] = np.nan
+    dataset.set(
+        data_path=str(tmp_path) + "/", compression="zlib", keepbits=7, manifest=True
+    )
+    dataset.write(snapshot["pp"])
+    pp = dataset["pp"]
+    xr.testing.assert_allclose(snapshot["pp"], pp, rtol=2.0 ** -8, atol=0.0)
+    assert np.isnan(pp[dict(t=0, x=0, y=0, z=0)])
+    assert dataset.verify(full=True) == []
+
+    size = os.path.getsize(tmp_path / "pp-000.bin")
+    assert size < snapshot["pp"].isel(t=0).nbytes / 2
+
+    # Lossy without a compression is not supported
+    dataset.compression = None
+    with pytest.raises(ValueError):
+        dataset.write(snapshot["pp"])
+
+    # Many chunks, decompressed in parallel
+    values = np.random.random(2 ** 20)
+    parts = x3d.io._encode(values, np.float64, "zlib", keepbits=12)
+    assert len(parts) > 4
+    x3d.io._write_parts(str(tmp_path / "values.bin"), parts)
+    np.testing.assert_allclose(
+        x3d.io._read_compressed(str(tmp_path / "values.bin"), max_workers=4),
+        values,
+        rtol=2.0 ** -13,
+    )
+
+
+def test_extract_probes_time(tmp_path, monkeypatch):
+    monkeypatch.setitem(x3d.param, "mytype", np.float32)
+    prm = x3d.Parameters(nx=9, ny=9, nz=9, dt=0.1, ioutput=3, ilast=30)
+    prm.dataset.data_path = str(tmp_path) + "/"
+    coords = dict(prm.dataset._mesh.get())
+    coords["t"] = [prm.dataset._time_step * k for k in range(len(prm.dataset))]
+    pp = xr.DataArray(
+        np.random.random([len(coord) for coord in coords.values()]),
+        coords=coords,
+        dims=coords.keys(),
+        attrs=dict(file_name="pp"),
+    )
+    prm.dataset.write(pp)
+
+    probes = prm.dataset.extract_probes(dict(x=[0.5], y=[0.5], z=[0.5]), "pp")
+    np.testing.assert_array_equal(probes.t, prm.dataset["pp"].t)
@@ -84,6 +84,44 @@ def test_stretched_coordinate(stretched_coordinate, filename):
     )
 
 
+@pytest.mark.parametrize(
+    "change",
+    [
+        dict(grid_size=33),
+        dict(length=2.0),
+        dict(delta=0.125),
+        dict(is_periodic=True),
+        dict(istret=1),
+        dict(istret=2, beta=0.5),
+    ],
+)
+def test_coordinate_cache(stretched_coordinate, change):
+    vector = stretched_coordinate.vector
+    # A copy of the cached vector, so it can be modified in place
+    vector *= 2.0
+    assert vector is not stretched_coordinate.vector
+    assert stretched_coordinate._get_vector() is stretched_coordinate._get_vector()
+    assert not stretched_coordinate._get_vector().flags.writeable
+    index = stretched_coordinate._get_index("y")
+    assert stretched_coordinate._get_index("y") is index
+
+    stretched_coordinate.set(**change)
+    reference = x3d.mesh.StretchedCoordinate(**change)
+    np.testing.assert_array_equal(stretched_coordinate.vector, reference.vector)
+    assert stretched_coordinate._get_index("y") is not index
+    np.testing.assert_array_equal(
+        stretched_coordinate._get_index("y"), stretched_coordinate.vector
+    )
+
+
+def test_coordinate_cache_mytype(stretched_coordinate, monkeypatch):
+    index = stretched_coordinate._get_index("y")
+    assert stretched_coordinate.vector.dtype == np.float64
+    monkeypatch.setitem(x3d.param, "mytype", np.float32)
+    assert stretched_coordinate.vector.dtype == np.float32
+    assert stretched_coordinate._get_index("y") is not index
+
+
 @pytest.fixture
 def mesh3d():
     return x3d.mesh.Mesh3D()
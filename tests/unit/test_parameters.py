@@ -1,7 +1,10 @@
+import collections
+import functools
 import unittest
 import os.path
 import pytest
 import traitlets
+import xcompact3d_toolbox.parameters
 from xcompact3d_toolbox.parameters import Parameters
 
 # TODO - migrate do Pytest
@@ -95,5 +98,58 @@ def test_initial_datapath(i3d_path, data_path):
     assert os.path.normpath(prm.dataset.data_path) == os.path.normpath(data_path)
 
 
+def test_set_batch():
+    prm = Parameters()
+    changes = []
+    prm.observe(changes.append, names="size")
+    prm.set(nx=129, ny=65, nz=33, ilast=45000, ioutput=200, numscalar=2, itimescheme=2)
+
+    # The storage demand is computed just once, for the final values
+    assert len(changes) == 1
+    size = prm.size
+    prm._observe_size(None)
+    assert prm.size == size
+
+
+def test_batch_observers(monkeypatch):
+    calls = collections.Counter()
+    for name in ["_observe_2Decomp", "_observe_bc", "_observe_numscalar"]:
+        handler = getattr(Parameters, name)
+        observer = handler.func.__wrapped__
+
+        @functools.wraps(observer)
+        def counter(self, change, observer=observer):
+            calls[observer.__name__, change["name"]] += 1
+            observer(self, change)
+
+        deferred = xcompact3d_toolbox.parameters._deferred(counter)
+        monkeypatch.setattr(handler, "func", deferred)
+
+    def change(prm):
+        for ncores in [8, 16, 32]:
+            prm.ncores = ncores
+        prm.p_row = 4
+        for numscalar in [1, 2, 3]:
+            prm.numscalar = numscalar
+        prm.nclx1, prm.nclxn = 0, 1
+        return {name: repr(getattr(prm, name)) for name in prm.trait_names()}
+
+    expected = change(Parameters())
+    unbatched, calls = calls.copy(), collections.Counter()
+
+    prm = Parameters()
+    with prm._batch():
+        change(prm)
+        # Nothing is called before the end of the batch
+        assert not calls
+
+    # Then just once for each trait that changed, besides their side effects
+    assert calls["_observe_2Decomp", "ncores"] == 1
+    assert calls["_observe_numscalar", "numscalar"] == 1
+    assert unbatched["_observe_numscalar", "numscalar"] == 3
+    assert sum(calls.values()) < sum(unbatched.values())
+    assert {name: repr(getattr(prm, name)) for name in prm.trait_names()} == expected
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 import math
 
+import dask
 import hypothesis
 import numpy as np
 import pytest
@@ -80,3 +81,410 @@ def test_geometry_from_stl(cube):
         x=(-1.0, 1.0), y=(-1.0, 1.0), z=(-1.0, 1.0)
     )
     xr.testing.assert_equal(ds_stl, ds_box)
+
+
+@pytest.fixture(scope="session")
+def sphere():
+    """Create a sphere of unitary radius, by the subdivision of an icosahedron"""
+
+    t = (1.0 + math.sqrt(5.0)) / 2.0
+    vertices = [
+        [-1, t, 0],
+        [1, t, 0],
+        [-1, -t, 0],
+        [1, -t, 0],
+        [0, -1, t],
+        [0, 1, t],
+        [0, -1, -t],
+        [0, 1, -t],
+        [t, 0, -1],
+        [t, 0, 1],
+        [-t, 0, -1],
+        [-t, 0, 1],
+    ]
+    vertices = [np.array(v) / np.linalg.norm(v) for v in vertices]
+    faces = [
+        [0, 11, 5],
+        [0, 5, 1],
+        [0, 1, 7],
+        [0, 7, 10],
+        [0, 10, 11],
+        [1, 5, 9],
+        [5, 11, 4],
+        [11, 10, 2],
+        [10, 7, 6],
+        [7, 1, 8],
+        [3, 9, 4],
+        [3, 4, 2],
+        [3, 2, 6],
+        [3, 6, 8],
+        [3, 8, 9],
+        [4, 9, 5],
+        [2, 4, 11],
+        [6, 2, 10],
+        [8, 6, 7],
+        [9, 8, 1],
+    ]
+
+    for _ in range(2):
+        middle_points = {}
+
+        def middle(a, b):
+            key = (min(a, b), max(a, b))
+            if key not in middle_points:
+                point = vertices[a] + vertices[b]
+                vertices.append(point / np.linalg.norm(point))
+                middle_points[key] = len(vertices) - 1
+            return middle_points[key]
+
+        new_faces = []
+        for a, b, c in faces:
+            ab, bc, ca = middle(a, b), middle(b, c), middle(c, a)
+            new_faces += [[a, ab, ca], [b, bc, ab], [c, ca, bc], [ab, bc, ca]]
+        faces = new_faces
+
+    vertices, faces = np.array(vertices), np.array(faces)
+
+    sphere = stl.mesh.Mesh(np.zeros(faces.shape[0], dtype=stl.mesh.Mesh.dtype))
+    sphere.vectors[:] = vertices[faces]
+
+    return sphere
+
+
+@pytest.mark.parametrize("method", ["fast", "raycast"])
+@pytest.mark.parametrize("user_tol", [0.05, np.pi])
+def test_geometry_from_stl_accelerated(sphere, user_tol, method):
+    prm = x3d.Parameters(xlx=3.0, yly=3.0, zlz=3.0, nx=25, ny=25, nz=25, iibm=2)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    stl_mesh = stl.mesh.Mesh(sphere.data.copy())
+    stl_mesh.translate([1.52, 1.49, 1.51])
+    ds_accelerated = epsi.geo.from_stl(
+        stl_mesh=stl_mesh, user_tol=user_tol, method=method
+    )
+
+    # The exact method is the reference for accuracy
+    x, y, z = (epsi[dim].data.astype(np.float64) for dim in "xyz")
+    lim = (0, x.size)
+    inside = x3d.sandbox._geometry_inside_mesh(
+        stl_mesh.vectors.astype(np.float64), x, y, z, user_tol, lim, lim, lim
+    )
+    xr.testing.assert_equal(ds_accelerated, epsi.where(~inside, True))
+    assert ds_accelerated.any()
+
+
+def test_geometry_from_stl_raycast(cube):
+    prm = x3d.Parameters(xlx=2.0, yly=2.0, zlz=2.0, iibm=2)
+    ds_stl = x3d.init_epsi(prm)["epsi"].geo.from_stl(stl_mesh=cube, method="raycast")
+    ds_box = x3d.init_epsi(prm)["epsi"].geo.box(
+        x=(-1.0, 1.0), y=(-1.0, 1.0), z=(-1.0, 1.0)
+    )
+    xr.testing.assert_equal(ds_stl, ds_box)
+
+
+@pytest.mark.parametrize("precision", ["float32", "float64"])
+@pytest.mark.parametrize("user_tol", [0.05, np.pi, 2.0 * np.pi])
+def test_geometry_from_stl_precision(sphere, user_tol, precision):
+    prm = x3d.Parameters(xlx=3.0, yly=3.0, zlz=3.0, nx=25, ny=25, nz=25, iibm=2)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    stl_mesh = stl.mesh.Mesh(sphere.data.copy())
+    stl_mesh.translate([1.52, 1.49, 1.51])
+    ds_fast = epsi.geo.from_stl(
+        stl_mesh=stl_mesh, user_tol=user_tol, precision=precision
+    )
+    ds_extended = epsi.geo.from_stl(
+        stl_mesh=stl_mesh, user_tol=user_tol, precision="longdouble"
+    )
+    xr.testing.assert_equal(ds_fast, ds_extended)
+    assert ds_fast.any()
+
+
+@pytest.mark.parametrize("precision", ["float32", "float64"])
+def test_geometry_from_stl_refined_points(sphere, precision, monkeypatch):
+    prm = x3d.Parameters(xlx=3.0, yly=3.0, zlz=3.0, nx=25, ny=25, nz=25, iibm=2)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    stl_mesh = stl.mesh.Mesh(sphere.data.copy())
+    stl_mesh.translate([1.52, 1.49, 1.51])
+    refined = []
+    extended = x3d.sandbox._winding_number_extended
+
+    def winding_number_extended(triangles, points):
+        refined.append(points.shape[0])
+        return extended(triangles, points)
+
+    monkeypatch.setattr(
+        x3d.sandbox, "_winding_number_extended", winding_number_extended
+    )
+    ds = epsi.geo.from_stl(stl_mesh=stl_mesh, precision=precision)
+    # Just the points close to the surface, not the whole interior
+    assert sum(refined) < ds.sum() / 10
+
+
+@pytest.mark.parametrize("kwargs", [dict(method="unknown"), dict(precision="float16")])
+def test_geometry_from_stl_invalid_argument(cube, kwargs):
+    prm = x3d.Parameters(iibm=2)
+    with pytest.raises(ValueError):
+        x3d.init_epsi(prm)["epsi"].geo.from_stl(stl_mesh=cube, **kwargs)
+
+
+@pytest.mark.parametrize("axis", ["x", "y", "z"])
+@pytest.mark.parametrize("height", [None, 0.8])
+def test_geometry_cylinders(axis, height):
+    prm = x3d.Parameters(xlx=4.0, yly=3.0, zlz=2.0, nx=33, ny=25, nz=17, iibm=1)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    rng = np.random.default_rng(seed=42)
+    centers = dict(
+        x=rng.uniform(-0.5, 4.5, size=30),
+        y=rng.uniform(-0.5, 3.5, size=30),
+        z=rng.uniform(-0.5, 2.5, size=30),
+    )
+    radii = rng.uniform(0.05, 0.5, size=30)
+
+    reference = epsi.copy()
+    for n in range(radii.size):
+        reference = reference.geo.cylinder(
+            radius=radii[n],
+            axis=axis,
+            height=height,
+            **{dim: value[n] for dim, value in centers.items()},
+        )
+
+    ds = epsi.geo.cylinders(centers, radii, axis=axis, height=height)
+    xr.testing.assert_equal(ds, reference)
+    assert ds.any()
+
+    ds_dask = epsi.chunk(dict(x=8)).geo.cylinders(
+        centers, radii, axis=axis, height=height
+    )
+    xr.testing.assert_equal(ds_dask.compute(), reference)
+
+
+def test_geometry_cylinders_2D():
+    prm = x3d.Parameters(xlx=4.0, yly=3.0, nx=33, ny=25, iibm=1)
+    epsi = x3d.init_epsi(prm)["epsi"].isel(z=0, drop=True)
+    x, y = np.meshgrid(np.arange(0.5, 4.0), np.arange(0.5, 3.0))
+    x[1::2] += 0.5
+    centers = dict(x=x.ravel(), y=y.ravel())
+
+    reference = epsi.copy()
+    for cx, cy in zip(centers["x"], centers["y"]):
+        reference = reference.geo.cylinder(radius=0.25, x=cx, y=cy)
+
+    ds = epsi.geo.cylinders(centers, radii=0.25)
+    assert ds.dims == ("x", "y")
+    xr.testing.assert_equal(ds, reference)
+    assert ds.any()
+
+
+def test_geometry_square():
+    prm = x3d.Parameters(xlx=4.0, yly=4.0, zlz=4.0, nx=41, ny=41, nz=41, iibm=1)
+    epsi = x3d.init_epsi(prm)["epsi"]
+    ds = epsi.geo.square(x=2.0, y=2.0, z=2.0, length=2.0, thickness=0.4)
+
+    outer = epsi.geo.box(x=(1.8, 2.2), y=(1.0, 3.0), z=(1.0, 3.0))
+    inner = epsi.geo.box(x=(1.8, 2.2), y=(1.4, 2.6), z=(1.4, 2.6))
+    xr.testing.assert_equal(ds, outer & ~inner)
+
+
+@pytest.mark.parametrize("method", ["exact", "fast", "raycast"])
+def test_geometry_dask(cube, method):
+    prm = x3d.Parameters(
+        xlx=4.0, yly=3.0, zlz=2.0, nx=32, ny=25, nz=17, nclx1=0, nclxn=0, iibm=1
+    )
+
+    def geometry(epsi):
+        return (
+            epsi.geo.from_stl(stl_mesh=cube, user_tol=0.05, method=method)
+            .geo.cylinder(x=3.0, y=1.5, radius=0.4)
+            .geo.cylinders(dict(x=[2.5, 3.5], y=[0.5, 2.5]), radii=0.3)
+            .geo.ahmed_body()
+            .geo.mirror("x")
+        )
+
+    def forbidden(*args, **kwargs):
+        raise RuntimeError("Unexpected computation")
+
+    epsi = x3d.init_epsi(prm, dask=True)["epsi"]
+    with dask.config.set(scheduler=forbidden):
+        ds_dask = geometry(epsi)
+
+    assert ds_dask.chunks is not None
+    ds = geometry(x3d.init_epsi(prm)["epsi"])
+    xr.testing.assert_equal(ds_dask.compute(), ds)
+    assert ds.any()
+
+
+@pytest.mark.parametrize("istret", [0, 1])
+def test_geometry_signed_distance(istret):
+    prm = x3d.Parameters(
+        xlx=4.0, yly=4.0, zlz=4.0, nx=33, ny=33, nz=33, istret=istret, beta=1.0, iibm=1
+    )
+    epsi = x3d.init_epsi(prm)["epsi"].geo.sphere(x=2.0, y=2.0, z=2.0, radius=1.0)
+
+    sdf = epsi.geo.signed_distance()
+    exact = np.sqrt((epsi.x - 2.0) ** 2 + (epsi.y - 2.0) ** 2 + (epsi.z - 2.0) ** 2)
+    exact -= 1.0
+
+    assert sdf.dims == epsi.dims
+    xr.testing.assert_equal(sdf < 0.0, epsi)
+    # First order accurate
+    assert abs(sdf - exact).max() < 1.5 * prm.dx
+
+    sdf_band = epsi.geo.signed_distance(band=0.5)
+    xr.testing.assert_allclose(sdf_band, sdf.clip(-0.5, 0.5))
+
+
+def test_init_dataset_dask(tmp_path):
+    prm = x3d.Parameters(
+        nx=17, ny=17, nz=16, nclz1=0, nclzn=0, nclx1=2, nclxn=2, numscalar=2
+    )
+    prm.dataset.data_path = str(tmp_path)
+    ds = x3d.init_dataset(prm)
+    ds_dask = x3d.init_dataset(prm, dask=True, dtype=np.float32)
+
+    assert set(ds.keys()) == set(ds_dask.keys())
+    for name, array in ds_dask.items():
+        assert array.chunks is not None
+        assert array.dtype == np.float32
+        assert array.attrs == ds[name].attrs
+
+    prm.dataset.write(ds_dask.ux + ds_dask.y, "ux")
+    ux = prm.dataset.load_array(str(tmp_path / "ux.bin"), add_time=False)
+    xr.testing.assert_allclose(ux, ds.ux + ds.y)
+
+
+@pytest.fixture
+def periodic_prm():
+    return x3d.Parameters(
+        xlx=2.0 * np.pi,
+        yly=2.0 * np.pi,
+        zlz=2.0 * np.pi,
+        nx=32,
+        ny=32,
+        nz=32,
+        nclx1=0,
+        nclxn=0,
+        ncly1=0,
+        nclyn=0,
+        nclz1=0,
+        nclzn=0,
+    )
+
+
+def test_random_noise(periodic_prm):
+    ds = x3d.init_dataset(periodic_prm, dask=True)
+    ux = ds.ux.chunk(dict(x=8, y=16))
+
+    noise = x3d.sandbox.random_noise(ux, amplitude=0.1, seed=42)
+    assert noise.chunks == ux.chunks
+    assert noise.attrs == ux.attrs
+
+    # Bit-identical, regardless of the number of workers
+    values = noise.compute(scheduler="threads")
+    xr.testing.assert_identical(values, noise.compute(scheduler="sync"))
+    xr.testing.assert_identical(
+        values, x3d.sandbox.random_noise(ux, amplitude=0.1, seed=42).compute()
+    )
+    assert not values.equals(x3d.sandbox.random_noise(ux, 0.1, seed=43).compute())
+    assert abs(values).max() <= 0.1
+    assert abs(values).max() > 0.09
+
+    # Modulated noise for the inflow plane
+    plane = ds.ux.isel(x=0, drop=True)
+    plane = x3d.sandbox.random_noise(plane, amplitude=ds.y, seed=42).compute()
+    assert (abs(plane) <= ds.y).all()
+
+
+def test_synthetic_turbulence(periodic_prm):
+    ds = x3d.init_dataset(periodic_prm)
+    u = x3d.sandbox.synthetic_turbulence(
+        ds.ux, intensity=0.5, peak_wavenumber=2.0, modes=200, seed=42
+    )
+    assert u.dims == ("i", "x", "y", "z")
+
+    # The result does not depend on the chunks
+    u_dask = x3d.sandbox.synthetic_turbulence(
+        ds.ux.chunk(dict(x=8, z=16)),
+        intensity=0.5,
+        peak_wavenumber=2.0,
+        modes=200,
+        seed=42,
+    )
+    assert u_dask.chunks is not None
+    xr.testing.assert_identical(u_dask.compute(), u)
+
+    # The prescribed intensity
+    np.testing.assert_allclose((u ** 2).mean(), 0.25, rtol=0.1)
+
+    # And divergence-free
+    h = float(ds.x[1] - ds.x[0])
+    gradient = [
+        np.gradient(u.sel(i=dim).values, h, axis=n) for n, dim in enumerate("xyz")
+    ]
+    divergence = sum(gradient)
+    assert np.sqrt(np.mean(divergence ** 2)) < 0.1 * np.sqrt(np.mean(gradient[0] ** 2))
+
+    # For planes, the missing coordinates are zero
+    plane = x3d.sandbox.synthetic_turbulence(
+        ds.ux.isel(x=0, drop=True),
+        intensity=0.5,
+        peak_wavenumber=2.0,
+        modes=200,
+        seed=42,
+    )
+    xr.testing.assert_allclose(plane, u.isel(x=0, drop=True))
+
+
+def test_inflow_from_precursor(tmp_path):
+    precursor = x3d.Parameters(
+        xlx=4.0,
+        yly=2.0,
+        zlz=2.0,
+        nx=16,
+        ny=17,
+        nz=16,
+        nclx1=0,
+        nclxn=0,
+        nclz1=0,
+        nclzn=0,
+    )
+    precursor.dataset.data_path = str(tmp_path / "precursor")
+    ds = x3d.init_dataset(precursor)
+    for k in range(3):
+        for n, var in enumerate("ux uy uz".split()):
+            ds[var] = (n + 1) * ds.y + k * ds.z + ds.x ** 2
+            filename = precursor.dataset.filename_properties.get_filename_for_binary(
+                var, k
+            )
+            precursor.dataset.write(ds[var], filename)
+
+    prm = x3d.Parameters(
+        yly=2.0, zlz=2.0, ny=33, nz=8, nclx1=2, nclz1=0, nclzn=0, istret=1, beta=1.0
+    )
+    prm.dataset.set(data_path=str(tmp_path / "inflow"), drop_coords="x")
+    x3d.sandbox.inflow_from_precursor(precursor, prm, x=1.0, snapshots=range(3))
+
+    inflow = x3d.init_dataset(prm)
+    for k in range(3):
+        for n, var in enumerate("bxx1 bxy1 bxz1".split()):
+            filename = prm.dataset.filename_properties.get_filename_for_binary(
+                var, k, prm.dataset.data_path
+            )
+            plane = prm.dataset.load_array(filename, add_time=False)
+            # Linear functions are recovered exactly
+            reference = (n + 1) * inflow.y + k * inflow.z + 1.0
+            np.testing.assert_allclose(
+                plane.values, reference.broadcast_like(inflow.bxx1).values, atol=1e-12
+            )
+
+
+@pytest.mark.parametrize("period", [None, 2.0])
+def test_interpolation_matrix(period):
+    source = np.array([0.0, 0.5, 1.0, 1.5])
+    target = np.array([0.25, 1.75, 2.25, -0.25])
+    values = x3d.sandbox._interpolation_matrix(source, target, period) @ source
+    if period is None:
+        # Constant extrapolation
+        np.testing.assert_allclose(values, [0.25, 1.5, 1.5, 0.0])
+    else:
+        # Wrapped around, between the last point and the first one
+        np.testing.assert_allclose(values, [0.25, 0.75, 0.25, 0.75])
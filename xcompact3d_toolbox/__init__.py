@@ -1,11 +1,62 @@
-from . import tutorial
-from ._version import get_versions
-from .array import X3dDataArray, X3dDataset
-from .genepsi import gene_epsi_3D
-from .gui import ParametersGui
+"""A set of tools for pre and postprocessing prepared for the high-order
+Navier-Stokes solver XCompact3d.
+
+The submodules and their heavy dependencies (like xarray, dask, numba, scipy
+and ipywidgets) are imported on demand, when any of the objects bellow is used
+for the first time (`PEP 562`_), so short scripts start quickly.
+The xarray accessors ``x3d`` and ``geo`` are registered at once, and their
+submodules are imported at their first use.
+
+.. _`PEP 562`: https://www.python.org/dev/peps/pep-0562/
+"""
+
+import importlib
+
+from . import _accessors
 from .param import param
-from .parameters import Parameters
-from .sandbox import init_dataset, init_epsi
 
-__version__ = get_versions()["version"]
-del get_versions
+_accessors.register()
+
+_submodules = {
+    "array",
+    "cache",
+    "csg",
+    "derive",
+    "genepsi",
+    "gui",
+    "io",
+    "mesh",
+    "parameters",
+    "sandbox",
+    "tutorial",
+}
+
+_objects = {
+    "X3dDataArray": "array",
+    "X3dDataset": "array",
+    "gene_epsi_3D": "genepsi",
+    "ParametersGui": "gui",
+    "Parameters": "parameters",
+    "init_dataset": "sandbox",
+    "init_epsi": "sandbox",
+}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _objects:
+        module = importlib.import_module(f".{_objects[name]}", __name__)
+        value = getattr(module, name)
+    elif name == "__version__":
+        from ._version import get_versions
+
+        value = get_versions()["version"]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | _submodules | set(_objects) | {"__version__"})
@@ -0,0 +1,58 @@
+"""Registers the xarray accessors ``x3d`` (:obj:`xcompact3d_toolbox.array`) and
+``geo`` (:obj:`xcompact3d_toolbox.sandbox`) when the package is imported, without
+importing their submodules, that are loaded on demand at the first use of the
+accessors. Since xarray itself is heavy, the registration waits until xarray is
+imported, if it was not yet.
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+
+_accessors = {
+    ("dataset", "x3d"): ("array", "X3dDataset"),
+    ("dataarray", "x3d"): ("array", "X3dDataArray"),
+    ("dataarray", "geo"): ("sandbox", "Geometry"),
+}
+
+
+def _lazy_accessor(module: str, name: str):
+    def accessor(obj):
+        return getattr(importlib.import_module(f".{module}", __package__), name)(obj)
+
+    accessor.__name__ = accessor.__qualname__ = name
+    return accessor
+
+
+def _register(xr):
+    for (kind, accessor), (module, name) in _accessors.items():
+        register = getattr(xr, f"register_{kind}_accessor")
+        register(accessor)(_lazy_accessor(module, name))
+
+
+class _XarrayFinder(importlib.abc.MetaPathFinder):
+    """Registers the accessors right after xarray is executed."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "xarray":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            _register(module)
+
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+def register():
+    if "xarray" in sys.modules:
+        _register(sys.modules["xarray"])
+    elif not any(isinstance(finder, _XarrayFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _XarrayFinder())
@@ -24,14 +24,11 @@ and :obj:`xarray.Dataset`, all the details are described bellow.
 """
 
 import xarray as xr
-from scipy.integrate import cumtrapz, simps
 
-from .derive import FirstDerivative, SecondDerivative
 from .mesh import _stretching
 from .param import param
 
 
-@xr.register_dataset_accessor("x3d")
 class X3dDataset:
     """An accessor with extra utilities for :obj:`xarray.Dataset`."""
 
@@ -61,6 +58,7 @@ class X3dDataset:
         >>> ds.x3d.cumtrapz('t')
 
         """
+        from scipy.integrate import cumtrapz
 
         return xr.apply_ufunc(
             cumtrapz,
@@ -100,6 +98,7 @@ class X3dDataset:
         >>> ds.x3d.simps('x', 'y', 'z')
 
         """
+        from scipy.integrate import simps
 
         def integrate(dataset, dim):
             return xr.apply_ufunc(
@@ -168,7 +167,6 @@ class X3dDataset:
         )
 
 
-@xr.register_dataarray_accessor("x3d")
 class X3dDataArray:
     """An accessor with extra utilities for :obj:`xarray.DataArray`."""
 
@@ -320,6 +318,8 @@ class X3dDataArray:
         """
 
         if dim not in self._Dx:
+            from .derive import FirstDerivative
+
             try:
                 ncl1 = self._data_array.attrs["BC"][dim]["ncl1"]
                 ncln = self._data_array.attrs["BC"][dim]["ncln"]
@@ -418,6 +418,8 @@ class X3dDataArray:
         >>> da.x3d.second_derivative('x')
         """
         if dim not in self._Dxx:
+            from .derive import SecondDerivative
+
             try:
                 ncl1 = self._data_array.attrs["BC"][dim]["ncl1"]
                 ncln = self._data_array.attrs["BC"][dim]["ncln"]
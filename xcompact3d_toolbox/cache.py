@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache on the disc for the preprocessing of the geometry,
+so parametric studies with the same object and mesh can skip
+:obj:`xcompact3d_toolbox.sandbox.Geometry.from_stl` and
+:obj:`xcompact3d_toolbox.genepsi.gene_epsi_3D`. Despite the name, it is a
+general-purpose cache, also used by
+:obj:`xcompact3d_toolbox.io.Dataset.load_wind_turbine_data`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+
+import numpy as np
+import traitlets
+
+
+class GeometryCache(traitlets.HasTraits):
+    """A content-addressed cache for voxelized geometries.
+
+    It is not specific to geometries, any result can be stored as files in an
+    entry, like the tables parsed by
+    :obj:`xcompact3d_toolbox.io.Dataset.load_wind_turbine_data`.
+    Each entry is a directory named after the SHA-256 hash of everything
+    the result depends on (the triangles of the STL file, the mesh coordinates,
+    :obj:`nraf`, :obj:`npif`, :obj:`izap` and so on), so there is no need
+    to invalidate them manually.
+    When the total size of the cache exceeds :obj:`max_size`, the least recently
+    used entries are evicted.
+
+    Parameters
+    ----------
+    path : str
+        The directory where the entries are stored
+        (default is ``~/.cache/xcompact3d_toolbox``).
+    max_size : int
+        The maximum size of the cache, in bytes (default is 1 GiB).
+
+    Examples
+    --------
+
+    >>> cache = xcompact3d_toolbox.cache.GeometryCache(max_size=2**32)
+    >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+    >>> epsi = xcompact3d_toolbox.init_epsi(prm)
+    >>> for key in epsi.keys():
+    ...     epsi[key] = epsi[key].geo.from_stl("My_file.stl", cache=cache)
+    >>> dataset = xcompact3d_toolbox.gene_epsi_3D(epsi, prm, cache=cache)
+
+    """
+
+    path = traitlets.Unicode(
+        default_value=os.path.join(
+            os.path.expanduser("~"), ".cache", "xcompact3d_toolbox"
+        )
+    )
+    max_size = traitlets.Int(default_value=2 ** 30, min=0)
+
+    def __init__(self, **kwargs):
+        """Initializes the object.
+
+        Parameters
+        ----------
+        **kwargs
+            Keyword arguments for the parameters, like :obj:`path` and :obj:`max_size`.
+
+        Returns
+        -------
+        :obj:`xcompact3d_toolbox.cache.GeometryCache`
+            Geometry cache
+        """
+        super().__init__(**kwargs)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path = {self.path!r}, max_size = {self.max_size})"
+
+    @staticmethod
+    def key(*args) -> str:
+        """Compute the key for a new entry, it is the SHA-256 hash of the arguments.
+
+        Parameters
+        ----------
+        *args
+            Anything the cached result depends on. It supports
+            :obj:`numpy.ndarray`, :obj:`dict`, :obj:`list`, :obj:`tuple`,
+            :obj:`bytes` and any other object with a stable representation,
+            like numbers and strings.
+
+        Returns
+        -------
+        str
+            The hexadecimal digest
+        """
+
+        def update(hash, value):
+            if isinstance(value, np.ndarray):
+                hash.update(f"ndarray{value.dtype.str}{value.shape}".encode())
+                hash.update(np.ascontiguousarray(value).tobytes())
+            elif isinstance(value, dict):
+                hash.update(f"dict{len(value)}".encode())
+                for k in sorted(value, key=str):
+                    update(hash, str(k))
+                    update(hash, value[k])
+            elif isinstance(value, (list, tuple)):
+                hash.update(f"{type(value).__name__}{len(value)}".encode())
+                for v in value:
+                    update(hash, v)
+            elif isinstance(value, bytes):
+                hash.update(f"bytes{len(value)}".encode())
+                hash.update(value)
+            else:
+                hash.update(f"{type(value).__name__}{value!r}".encode())
+
+        hash = hashlib.sha256()
+        for arg in args:
+            update(hash, arg)
+        return hash.hexdigest()
+
+    def load(self, key: str) -> str | None:
+        """Look for an entry in the cache.
+
+        Parameters
+        ----------
+        key : str
+            The key computed by :obj:`GeometryCache.key`
+
+        Returns
+        -------
+        str or None
+            The directory with the files of the entry, or :obj:`None`
+            if it is not in the cache.
+        """
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return None
+        # The modification time keeps track of the least recently used entries
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return entry
+
+    @contextlib.contextmanager
+    def store(self, key: str):
+        """Add a new entry to the cache.
+
+        It is a context manager that yields a temporary directory, where the
+        files should be written. The entry is moved to the cache at once if
+        no exception is raised, so other processes never find an incomplete entry.
+
+        Parameters
+        ----------
+        key : str
+            The key computed by :obj:`GeometryCache.key`
+
+        Examples
+        --------
+
+        >>> with cache.store(key) as directory:
+        ...     np.save(os.path.join(directory, "array.npy"), array)
+
+        """
+        os.makedirs(self.path, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        try:
+            yield tmp
+            entry = self._entry(key)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # The same entry was just stored by another process
+                pass
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the size of the cache
+        is not larger than :obj:`max_size`.
+        """
+        entries = []
+        for entry in self._entries():
+            with contextlib.suppress(OSError):
+                entries.append((os.path.getmtime(entry), _size(entry), entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        for entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def size(self) -> int:
+        """The total size of the entries in the cache, in bytes."""
+        return sum(_size(entry) for entry in self._entries())
+
+    def _entry(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def _entries(self):
+        if not os.path.isdir(self.path):
+            return
+        for prefix in os.listdir(self.path):
+            directory = os.path.join(self.path, prefix)
+            if prefix.startswith(".") or not os.path.isdir(directory):
+                continue
+            for key in os.listdir(directory):
+                yield os.path.join(directory, key)
+
+
+def _size(directory):
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, _, filenames in os.walk(directory)
+        for filename in filenames
+    )
+
+
+def save_mask(directory: str, name: str, mask: np.ndarray) -> None:
+    """Save a boolean array packed into bits, in the file ``{name}.npz``
+    inside :obj:`directory`.
+    """
+    np.savez(
+        os.path.join(directory, f"{name}.npz"),
+        bits=np.packbits(mask.astype(bool), axis=None),
+        shape=np.array(mask.shape, dtype=np.int64),
+    )
+
+
+def load_mask(directory: str, name: str) -> np.ndarray:
+    """Load a boolean array saved by :obj:`save_mask`."""
+    with np.load(os.path.join(directory, f"{name}.npz")) as data:
+        shape = tuple(data["shape"])
+        bits = np.unpackbits(data["bits"], count=int(np.prod(shape)))
+    return bits.astype(bool).reshape(shape)
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""Constructive solid geometry for the sandbox flow configuration.
+
+Shapes are composed with the operators ``|`` (union), ``&`` (intersection)
+and ``-`` (difference), besides :obj:`Shape.mirror` and :obj:`Shape.translate`.
+Nothing is computed while the expression is built, so the whole tree is
+evaluated at once by :obj:`Shape.evaluate` or
+:obj:`xcompact3d_toolbox.sandbox.Geometry.from_csg`. Each node is evaluated
+just inside its bounding box, so small primitives are cheap even
+in large domains, and the temporary arrays are not larger than them.
+
+Examples
+--------
+
+>>> from xcompact3d_toolbox.csg import Box, Cylinder, Sphere
+>>> prm = xcompact3d_toolbox.Parameters()
+>>> epsi = xcompact3d_toolbox.init_epsi(prm)
+>>> shape = (
+...     Box(x=(1.0, 3.0), y=(0.0, 1.0)) | Sphere(x=4.0, y=1.0, z=1.0, radius=0.5)
+... ) - Cylinder(x=2.0, y=0.5, radius=0.25, axis="z")
+>>> for key in epsi.keys():
+...     epsi[key] = epsi[key].geo.from_csg(shape)
+
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+_EMPTY = (math.inf, -math.inf)
+_FULL = (-math.inf, math.inf)
+
+
+class Shape:
+    """Base class for the nodes of the expression tree.
+
+    Subclasses implement :obj:`Shape.bounds` and :obj:`Shape.mask`,
+    all the other methods are shared.
+    """
+
+    def __or__(self, other: Shape) -> Shape:
+        return Union(self, other)
+
+    def __and__(self, other: Shape) -> Shape:
+        return Intersection(self, other)
+
+    def __sub__(self, other: Shape) -> Shape:
+        return Difference(self, other)
+
+    def mirror(self, dim: str, center: float) -> Shape:
+        """Mirror the shape with respect to the plane ``dim = center``,
+        see :obj:`Mirror`.
+        """
+        return Mirror(self, dim, center)
+
+    def translate(self, **offset: float) -> Shape:
+        """Translate the shape by ``offset`` on each dimension,
+        see :obj:`Translate`.
+        """
+        return Translate(self, **offset)
+
+    def bounds(self, dims: tuple) -> dict:
+        """Bounding box of the shape.
+
+        Parameters
+        ----------
+        dims : tuple of str
+            The dimensions of the domain.
+
+        Returns
+        -------
+        :obj:`dict` of :obj:`tuple` of float
+            The minimum and maximum values for each dimension, infinite when
+            the shape is not bounded in that direction.
+        """
+        raise NotImplementedError()
+
+    def mask(self, coords: dict) -> np.ndarray:
+        """Compute what points are inside the shape, for a block that
+        can be restricted by the bounding box of the shape (see :obj:`Shape.bounds`).
+
+        Parameters
+        ----------
+        coords : :obj:`dict` of :obj:`numpy.ndarray`
+            One-dimensional and increasing coordinates of the block, for each dimension.
+
+        Returns
+        -------
+        :obj:`numpy.ndarray`
+            Boolean array with the shape of the block, it is True inside the shape.
+        """
+        raise NotImplementedError()
+
+    def evaluate(self, coords: dict) -> np.ndarray:
+        """Compute what points of the domain are inside the shape.
+
+        Parameters
+        ----------
+        coords : :obj:`dict` of :obj:`numpy.ndarray`
+            One-dimensional and increasing coordinates of the domain, for
+            each dimension.
+
+        Returns
+        -------
+        :obj:`numpy.ndarray`
+            Boolean array, it is True inside the shape.
+
+        Examples
+        --------
+
+        >>> shape = Sphere(x=0.5, y=0.5, radius=0.25)
+        >>> x = y = np.linspace(0.0, 1.0, num=11)
+        >>> inside = shape.evaluate(dict(x=x, y=y))
+
+        """
+        coords = {dim: np.asarray(coord) for dim, coord in coords.items()}
+        result = np.zeros(_shape(coords), dtype=bool)
+        _fill(result, self, coords)
+        return result
+
+    def evaluate_bounded(self, coords: dict) -> tuple:
+        """Compute what points of the domain are inside the shape, just
+        for the sub-block inside its bounding box.
+
+        Parameters
+        ----------
+        coords : :obj:`dict` of :obj:`numpy.ndarray`
+            One-dimensional and increasing coordinates of the domain, for
+            each dimension.
+
+        Returns
+        -------
+        :obj:`tuple` of slice or None
+            The index of the sub-block in the domain, it is None
+            when the bounding box does not intersect the domain.
+        :obj:`numpy.ndarray` or None
+            Boolean array with the shape of the sub-block, it is True inside the shape.
+        """
+        coords = {dim: np.asarray(coord) for dim, coord in coords.items()}
+        index, sub_coords = _restrict(coords, self.bounds(tuple(coords)))
+        if sub_coords is None:
+            return None, None
+        return index, self.mask(sub_coords)
+
+
+class Union(Shape):
+    """Points inside any of the shapes, the same as ``a | b``."""
+
+    def __init__(self, *shapes: Shape):
+        # Nested unions are flattened, so they share the same output block
+        self.shapes = []
+        for shape in shapes:
+            if isinstance(shape, Union):
+                self.shapes.extend(shape.shapes)
+            else:
+                self.shapes.append(shape)
+
+    def bounds(self, dims):
+        bounds = {dim: _EMPTY for dim in dims}
+        for shape in self.shapes:
+            for dim, (lo, hi) in shape.bounds(dims).items():
+                bounds[dim] = (min(bounds[dim][0], lo), max(bounds[dim][1], hi))
+        return bounds
+
+    def mask(self, coords):
+        result = np.zeros(_shape(coords), dtype=bool)
+        for shape in self.shapes:
+            _fill(result, shape, coords)
+        return result
+
+
+class Intersection(Shape):
+    """Points inside all the shapes, the same as ``a & b``."""
+
+    def __init__(self, *shapes: Shape):
+        self.shapes = []
+        for shape in shapes:
+            if isinstance(shape, Intersection):
+                self.shapes.extend(shape.shapes)
+            else:
+                self.shapes.append(shape)
+
+    def bounds(self, dims):
+        bounds = {dim: _FULL for dim in dims}
+        for shape in self.shapes:
+            for dim, (lo, hi) in shape.bounds(dims).items():
+                bounds[dim] = (max(bounds[dim][0], lo), min(bounds[dim][1], hi))
+        return bounds
+
+    def mask(self, coords):
+        result = np.ones(_shape(coords), dtype=bool)
+        for shape in self.shapes:
+            index, sub_coords = _restrict(coords, shape.bounds(tuple(coords)))
+            if sub_coords is None:
+                return np.zeros_like(result)
+            # Everything outside the bounding box of a shape is outside the intersection
+            inside = np.zeros_like(result)
+            inside[index] = shape.mask(sub_coords)
+            result &= inside
+        return result
+
+
+class Difference(Shape):
+    """Points inside the first shape and outside the second one,
+    the same as ``a - b``.
+    """
+
+    def __init__(self, shape: Shape, other: Shape):
+        self.shape = shape
+        self.other = other
+
+    def bounds(self, dims):
+        return self.shape.bounds(dims)
+
+    def mask(self, coords):
+        result = self.shape.mask(coords)
+        index, sub_coords = _restrict(coords, self.other.bounds(tuple(coords)))
+        if sub_coords is not None:
+            result[index] &= ~self.other.mask(sub_coords)
+        return result
+
+
+class Mirror(Shape):
+    """Mirror a shape with respect to the plane ``dim = center``.
+
+    Just as :obj:`xcompact3d_toolbox.sandbox.Geometry.mirror`, the part of the
+    shape where ``dim <= center`` is kept, and it is reflected to the other side.
+    """
+
+    def __init__(self, shape: Shape, dim: str, center: float):
+        self.shape = shape
+        self.dim = dim
+        self.center = center
+
+    def bounds(self, dims):
+        bounds = self.shape.bounds(dims)
+        lo, hi = bounds[self.dim]
+        if lo > min(hi, self.center):
+            bounds[self.dim] = _EMPTY
+        else:
+            bounds[self.dim] = (lo, 2.0 * self.center - lo)
+        return bounds
+
+    def mask(self, coords):
+        dims = tuple(coords)
+        axis = dims.index(self.dim)
+        coord = coords[self.dim]
+        split = coord.searchsorted(self.center, "right")
+
+        result = np.zeros(_shape(coords), dtype=bool)
+
+        lower = {**coords, self.dim: coord[:split]}
+        _fill(result[_index(axis, slice(None, split))], self.shape, lower)
+
+        # The reflected coordinates are reversed, so they are still increasing
+        upper = {**coords, self.dim: (2.0 * self.center - coord[split:])[::-1]}
+        flip = _index(axis, slice(None, None, -1))
+        _fill(result[_index(axis, slice(split, None))][flip], self.shape, upper)
+
+        return result
+
+
+class Translate(Shape):
+    """Translate a shape by ``offset`` on each dimension."""
+
+    def __init__(self, shape: Shape, **offset: float):
+        self.shape = shape
+        self.offset = offset
+
+    def bounds(self, dims):
+        bounds = self.shape.bounds(dims)
+        for dim, (lo, hi) in bounds.items():
+            delta = self.offset.get(dim, 0.0)
+            bounds[dim] = (lo + delta, hi + delta)
+        return bounds
+
+    def mask(self, coords):
+        return self.shape.mask(
+            {dim: coord - self.offset.get(dim, 0.0) for dim, coord in coords.items()}
+        )
+
+
+class Box(Shape):
+    """A box, the boundaries are included.
+
+    Parameters
+    ----------
+    **boundaries : tuple of float
+        Minimum and maximum values for each dimension,
+        the box is not bounded in the missing dimensions.
+    """
+
+    def __init__(self, **boundaries: tuple):
+        self.boundaries = boundaries
+
+    def bounds(self, dims):
+        return {dim: tuple(self.boundaries.get(dim, _FULL)) for dim in dims}
+
+    def mask(self, coords):
+        result = np.ones(_shape(coords), dtype=bool)
+        for dim, (lo, hi) in self.boundaries.items():
+            coord = _broadcast(coords, dim)
+            result &= (coord >= lo) & (coord <= hi)
+        return result
+
+
+class Cylinder(Shape):
+    """A cylinder, just as :obj:`xcompact3d_toolbox.sandbox.Geometry.cylinder`.
+
+    Parameters
+    ----------
+    radius : float
+        Cylinder's radius (the default is 0.5).
+    axis : str
+        Cylinder's axis (the default is ``"z"``).
+    height : float or None
+        Cylinder's height (the default is None), if None, it will take
+        the entire axis, otherwise :math:`\\pm h/2` is considered from the center.
+    **center : float
+        Cylinder's center point, it is zero for the missing dimensions.
+    """
+
+    def __init__(
+        self, radius: float = 0.5, axis: str = "z", height: float = None, **center
+    ):
+        self.radius = radius
+        self.axis = axis
+        self.height = height
+        self.center = center
+
+    def bounds(self, dims):
+        bounds = {}
+        for dim in dims:
+            center = self.center.get(dim, 0.0)
+            if dim != self.axis:
+                bounds[dim] = (center - self.radius, center + self.radius)
+            elif self.height is not None:
+                bounds[dim] = (center - 0.5 * self.height, center + 0.5 * self.height)
+            else:
+                bounds[dim] = _FULL
+        return bounds
+
+    def mask(self, coords):
+        dis = 0.0
+        for dim in coords:
+            if dim == self.axis:
+                continue
+            dis = dis + (_broadcast(coords, dim) - self.center.get(dim, 0.0)) ** 2.0
+        result = np.sqrt(dis) <= self.radius
+
+        if self.height is not None:
+            coord = _broadcast(coords, self.axis)
+            center = self.center.get(self.axis, 0.0)
+            result = (
+                result
+                & (coord <= center + 0.5 * self.height)
+                & (coord >= center - 0.5 * self.height)
+            )
+
+        return np.broadcast_to(result, _shape(coords)).copy()
+
+
+class Sphere(Shape):
+    """A sphere, just as :obj:`xcompact3d_toolbox.sandbox.Geometry.sphere`.
+
+    Parameters
+    ----------
+    radius : float
+        Sphere's radius (the default is 0.5).
+    **center : float
+        Sphere's center, it is zero for the missing dimensions.
+    """
+
+    def __init__(self, radius: float = 0.5, **center: float):
+        self.radius = radius
+        self.center = center
+
+    def bounds(self, dims):
+        return {
+            dim: (
+                self.center.get(dim, 0.0) - self.radius,
+                self.center.get(dim, 0.0) + self.radius,
+            )
+            for dim in dims
+        }
+
+    def mask(self, coords):
+        dis = 0.0
+        for dim in coords:
+            dis = dis + (_broadcast(coords, dim) - self.center.get(dim, 0.0)) ** 2.0
+        return np.broadcast_to(np.sqrt(dis) <= self.radius, _shape(coords)).copy()
+
+
+class HalfSpace(Shape):
+    """The points where :math:`\\sum_i n_i x_i \\le` ``offset``.
+
+    Parameters
+    ----------
+    offset : float
+        The right hand side of the inequality (the default is 0).
+    **normal : float
+        The components of the outward normal vector, they are
+        zero for the missing dimensions.
+
+    Examples
+    --------
+
+    The points below the line :math:`y = 2 x + 1`:
+
+    >>> HalfSpace(offset=1.0, x=-2.0, y=1.0)
+
+    """
+
+    def __init__(self, offset: float = 0.0, **normal: float):
+        self.offset = offset
+        self.normal = normal
+
+    def bounds(self, dims):
+        bounds = {dim: _FULL for dim in dims}
+        normal = {dim: n for dim, n in self.normal.items() if n != 0.0}
+        # Bounded just when it is aligned with one of the dimensions
+        if len(normal) == 1:
+            ((dim, n),) = normal.items()
+            if n > 0.0:
+                bounds[dim] = (-math.inf, self.offset / n)
+            else:
+                bounds[dim] = (self.offset / n, math.inf)
+        return bounds
+
+    def mask(self, coords):
+        value = 0.0
+        for dim, n in self.normal.items():
+            value = value + n * _broadcast(coords, dim)
+        return np.broadcast_to(value <= self.offset, _shape(coords)).copy()
+
+
+def _shape(coords):
+    return tuple(coord.size for coord in coords.values())
+
+
+def _index(axis, index):
+    return (slice(None),) * axis + (index,)
+
+
+def _broadcast(coords, dim):
+    # The coordinate as a view that broadcasts against the block
+    dims = tuple(coords)
+    shape = [1] * len(dims)
+    shape[dims.index(dim)] = coords[dim].size
+    return coords[dim].reshape(shape)
+
+
+def _restrict(coords, bounds):
+    """The index and the coordinates of the sub-block inside ``bounds``,
+    or ``(None, None)`` when it is empty.
+    """
+    index, sub_coords = [], {}
+    for dim, coord in coords.items():
+        lo, hi = bounds.get(dim, _FULL)
+        start = coord.searchsorted(lo, "left")
+        stop = coord.searchsorted(hi, "right")
+        if start >= stop:
+            return None, None
+        index.append(slice(start, stop))
+        sub_coords[dim] = coord[start:stop]
+    return tuple(index), sub_coords
+
+
+def _fill(result, shape, coords):
+    # Set to True the points inside shape, evaluating it just at its bounding box
+    index, sub_coords = _restrict(coords, shape.bounds(tuple(coords)))
+    if sub_coords is not None:
+        result[index] |= shape.mask(sub_coords)
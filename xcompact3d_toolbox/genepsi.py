@@ -18,13 +18,16 @@ can approach the speeds of C or FORTRAN.
 """
 
 import os.path
+import shutil
 
 import numba
 import numpy as np
 import xarray as xr
 
+from .cache import load_mask, save_mask
 
-def gene_epsi_3D(epsi_in_dict, prm):
+
+def gene_epsi_3D(epsi_in_dict, prm, cache=None):
     """This function generates all the auxiliar files necessary for our
     customize IBM, based on Lagrange reconstructions. The arrays can be
     initialized with :obj:`xcompact3d_toolbox.sandbox.init_epsi()`, then,
@@ -44,6 +47,11 @@ def gene_epsi_3D(epsi_in_dict, prm):
         A dictionary containing the epsi(s) array(s).
     prm : :obj:`xcompact3d_toolbox.parameters.Parameters`
         Contains the computational and physical parameters.
+    cache : :obj:`xcompact3d_toolbox.cache.GeometryCache`, optional
+        If provided, the auxiliar files and the Dataset are loaded from the cache
+        when the epsi arrays, their coordinates, :obj:`nraf`, :obj:`npif` and
+        :obj:`izap` are the same as in a previous call, otherwise,
+        they are computed and stored in the cache. By default None
 
     Returns
     -------
@@ -250,6 +258,34 @@ def gene_epsi_3D(epsi_in_dict, prm):
     npif = prm.npif
     nraf = prm.nraf
 
+    if cache is not None:
+        key = cache.key(
+            "gene_epsi_3D",
+            {
+                name: (array.values, *(array[dim].values for dim in array.dims))
+                for name, array in epsi_in_dict.items()
+            },
+            izap,
+            npif,
+            nraf,
+            prm.xlx,
+            prm.yly,
+            prm.zlz,
+        )
+        entry = cache.load(key)
+        if entry is not None:
+            epsi = epsi_in_dict["epsi"].copy(data=load_mask(entry, "epsi"))
+            ds = epsi.to_dataset(name="epsi").assign(
+                xr.load_dataset(os.path.join(entry, "genepsi.nc")).data_vars
+            )
+            prm.dataset.write(ds["epsi"])
+            for filename in _geomcomplex_files():
+                shutil.copy(
+                    os.path.join(entry, filename),
+                    os.path.join(prm.dataset.data_path, "geometry", filename),
+                )
+            return ds
+
     epsi = epsi_in_dict["epsi"]
     xepsi = epsi_in_dict["xepsi"]
     yepsi = epsi_in_dict["yepsi"]
@@ -305,9 +341,28 @@ def gene_epsi_3D(epsi_in_dict, prm):
 
     write_geomcomplex(prm, ds)
 
+    if cache is not None:
+        with cache.store(key) as entry:
+            # The mask is packed into bits, so more entries fit in the cache
+            save_mask(entry, "epsi", ds["epsi"].values)
+            ds.drop_vars("epsi").to_netcdf(os.path.join(entry, "genepsi.nc"))
+            for filename in _geomcomplex_files():
+                shutil.copy(
+                    os.path.join(prm.dataset.data_path, "geometry", filename),
+                    os.path.join(entry, filename),
+                )
+
     return ds
 
 
+def _geomcomplex_files():
+    # The auxiliar files written by write_geomcomplex
+    for dir in ["x", "y", "z"]:
+        yield f"nobj{dir}.dat"
+        yield f"n{dir}ifpif.dat"
+        yield f"{dir}i{dir}f.dat"
+
+
 def write_geomcomplex(prm, ds) -> None:
     def write_nobj(array, dim) -> None:
         with open(os.path.join(data_path, f"nobj{dim}.dat"), "w", newline="\n") as file:
@@ -5,11 +5,22 @@ Usefull objects to read and write the binary fields produced by XCompact3d.
 
 from __future__ import annotations
 
+import copy
+import fnmatch
+import functools
 import glob
-import io
+import hashlib
+import itertools
+import json
+import lzma
 import os
 import os.path
+import re
+import threading
+import uuid
 import warnings
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from typing import Type, Union
 
 import numpy as np
@@ -18,6 +29,8 @@ import traitlets
 import xarray as xr
 from tqdm.auto import tqdm
 
+from .array import X3dDataArray, X3dDataset
+from .cache import GeometryCache
 from .mesh import Mesh3D
 from .param import param
 
@@ -238,12 +251,47 @@ class Dataset(traitlets.HasTraits):
         The path to the folder where the binary fields are located (default is ``"./data/"``).
         .. note :: the default ``"./data/"`` is relative to the path to the parameters
            file when initialized from :obj:`xcompact3d_toolbox.parameters.ParametersExtras`.
+    compression : str
+        When set, :obj:`Dataset.write` compresses the raw binaries with the codec
+        ``"zlib"`` or ``"lzma"`` from the standard library, or ``"blosc"``
+        (that needs the optional dependency blosc). The bytes of the values are
+        shuffled before the compression, and the files are split into chunks
+        that are decompressed in parallel, just the ones with the requested
+        values for planes and probes. Reading them is faster than the raw
+        binaries when the storage is slower than the decompression (like
+        network file systems), blosc being the fastest codec. The files keep
+        their names and are detected by their header, so all methods to load the
+        arrays support them, but notice that XCompact3d itself does not
+        (default is :obj:`None`).
     drop_coords : str
         If working with two-dimensional planes, specify which of the coordinates should be
         dropped, i.e., ``"x"``, ``"y"`` or ``"z"``, or leave it empty for 3D fields (default is ``""``).
     filename_properties : :obj:`FilenameProperties`
         Specifies filename properties for the binary files, like the separator, file extension and
         number of digits.
+    hdf5_compression : str
+        Compression filter for the HDF5 layouts, like ``"gzip"`` or ``"lzf"``,
+        see :obj:`h5py.Group.create_dataset` (default is :obj:`None`).
+    keepbits : int
+        The number of bits of the mantissa kept when writing compressed files
+        (see :obj:`compression`), the other ones are rounded to the nearest, so the
+        compression ratio is much higher at the cost of the precision.
+        The relative error is up to ``2 ** -(keepbits + 1)``
+        (default is :obj:`None`, meaning lossless).
+    layout : str
+        How the time series are stored at :obj:`data_path`. ``"binary"`` is the raw
+        binary format used by XCompact3d, with one file per variable per snapshot.
+        ``"hdf5"`` packs all variables into one HDF5 file per snapshot
+        (e.g., ``snapshot-000.h5``), while ``"hdf5-run"`` uses just one HDF5 file for
+        the whole run (``snapshots.h5``), with one chunk per snapshot. The HDF5 layouts
+        need the optional dependency h5py, and they are supported by
+        :obj:`Dataset.write`, :obj:`Dataset.write_xdmf` and all the methods to load
+        the arrays. See :obj:`Dataset.convert` (default is ``"binary"``).
+    manifest : bool
+        When :obj:`True`, :obj:`Dataset.write` records the hash, shape and dtype of each file
+        at the manifest ``.manifest.json`` in :obj:`data_path`. The files with unchanged
+        content are skipped, and the other ones are written atomically (to a temporary
+        file that is renamed at the end). See :obj:`Dataset.verify` (default is :obj:`False`).
     set_of_variables : set
         The methods in this class will try to find all
         variables per snapshot, use this parameter
@@ -286,13 +334,21 @@ class Dataset(traitlets.HasTraits):
 
     data_path = traitlets.Unicode(default_value="./data/")
     drop_coords = traitlets.Unicode(default_value="")
+    compression = traitlets.Enum(
+        ["zlib", "lzma", "blosc"], default_value=None, allow_none=True
+    )
     filename_properties = traitlets.Instance(klass=FilenameProperties)
+    hdf5_compression = traitlets.Unicode(default_value=None, allow_none=True)
+    keepbits = traitlets.Int(default_value=None, allow_none=True, min=0)
+    layout = traitlets.Enum(["binary", "hdf5", "hdf5-run"], default_value="binary")
+    manifest = traitlets.Bool(default_value=False)
     set_of_variables = traitlets.Set()
     snapshot_counting = traitlets.Unicode(default_value="ilast")
     snapshot_step = traitlets.Unicode(default_value="ioutput")
     stack_scalar = traitlets.Bool(default_value=False)
     stack_velocity = traitlets.Bool(default_value=False)
 
+    _coords = traitlets.Dict(default_value=None, allow_none=True)
     _mesh = traitlets.Instance(klass=Mesh3D)
     _prm = traitlets.Instance(
         klass="xcompact3d_toolbox.parameters.Parameters", allow_none=True
@@ -323,7 +379,7 @@ class Dataset(traitlets.HasTraits):
 
         self.set_of_variables = set()
         self.filename_properties = FilenameProperties()
-        self._mesh = Mesh3D()
+        self._mesh = kwargs.pop("_mesh") if "_mesh" in kwargs else Mesh3D()
         self._prm = None
 
         self.set(**kwargs)
@@ -561,6 +617,30 @@ class Dataset(traitlets.HasTraits):
                 raise KeyError(f"{key} is not a valid argument for Dataset")
             setattr(self, key, arg)
 
+    def _derive(self, **kwargs) -> Dataset:
+        """A new dataset with the same properties and mesh, for the arrays derived
+        from this one (like planes and the levels of the pyramid)."""
+        properties = dict(
+            _mesh=self._mesh,
+            data_path=self.data_path,
+            drop_coords=self.drop_coords,
+            filename_properties=self.filename_properties.trait_values(),
+            layout=self.layout,
+            set_of_variables=self.set_of_variables,
+            snapshot_counting=self.snapshot_counting,
+            snapshot_step=self.snapshot_step,
+            stack_scalar=self.stack_scalar,
+            stack_velocity=self.stack_velocity,
+        )
+        dataset = Dataset(**{**properties, **kwargs})
+        dataset._prm = self._prm
+        return dataset
+
+    def _get_coords(self) -> dict:
+        if self._coords is not None:
+            return dict(self._coords)
+        return self._mesh._get_indexes(*self.drop_coords)
+
     def load_array(
         self, filename: str, add_time: bool = True, attrs: dict = None
     ) -> Type[xr.DataArray]:
@@ -604,7 +684,8 @@ class Dataset(traitlets.HasTraits):
 
         """
 
-        coords = self._mesh.drop(*self.drop_coords)
+        # Shared by all arrays, so they are not rebuilt for every file
+        coords = self._get_coords()
 
         if add_time:
             time_int, name = self.filename_properties.get_info_from_filename(filename)
@@ -615,19 +696,119 @@ class Dataset(traitlets.HasTraits):
         # We obtain the shape for np.fromfile from the coordinates
         shape = [len(value) for value in coords.values()]
 
-        # This is necessary if the file is a link
-        if os.path.islink(filename):
-            filename = os.readlink(filename)
+        if self.layout != "binary":
+            counter, prefix = self.filename_properties.get_info_from_filename(filename)
+            values = self._read_hdf5(prefix, counter).transpose().reshape(shape)
+        else:
+            # This is necessary if the file is a link
+            if os.path.islink(filename):
+                filename = os.readlink(filename)
+            if _is_compressed(filename):
+                values = _read_compressed(filename).astype(param["mytype"], copy=False)
+            else:
+                values = np.fromfile(filename, dtype=param["mytype"])
+            values = values.reshape(shape, order="F")
 
-        # Finally, we read the array and wrap it into a xarray object
+        # Finally, we wrap the array into a xarray object
         return xr.DataArray(
-            np.fromfile(filename, dtype=param["mytype"]).reshape(shape, order="F"),
+            values,
             dims=coords.keys(),
             coords=coords,
             name=name,
             attrs=attrs,
         )
 
+    def load_plane(
+        self, filename: str, add_time: bool = True, attrs: dict = None, **indexer
+    ) -> Type[xr.DataArray]:
+        """Read just one plane from a three-dimensional binary field, like
+        :obj:`Dataset.load_array` followed by ``.sel(method="nearest")``, but
+        the file is mapped in memory with :obj:`numpy.memmap`
+        and only the selected plane is copied, so the whole array is never
+        in memory.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+        add_time : bool, optional
+            Add time as a coordinate (default is :obj:`True`).
+        attrs : dict_like, optional
+            Attributes to assign to the new instance :obj:`xarray.DataArray`.
+        **indexer
+            Exactly one coordinate and its value, like ``x=0.0``,
+            the nearest plane is selected.
+
+        Returns
+        -------
+        :obj:`xarray.DataArray`
+            Data array containing the plane loaded from the disc, the selected
+            coordinate is kept as a scalar.
+
+        Raises
+        ------
+        KeyError
+            Exception is raised when the indexer is not exactly one of
+            the coordinates ``x``, ``y`` or ``z``.
+
+        Examples
+        --------
+
+        >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+        >>> inflow = prm.dataset.load_plane("./data/ux-010.bin", x=0.0)
+
+        """
+
+        coords = self._mesh.get()
+
+        if len(indexer) != 1 or not set(indexer).issubset(coords):
+            raise KeyError(
+                f"Specify exactly one of {', '.join(coords)} to select a plane"
+            )
+        ((dim, value),) = indexer.items()
+        index = int(np.abs(coords[dim] - value).argmin())
+
+        if add_time:
+            time_int, name = self.filename_properties.get_info_from_filename(filename)
+        else:
+            name = None
+
+        if self.layout != "binary":
+            # Just the plane is read from HDF5, in the reversed order of the axes
+            counter, prefix = self.filename_properties.get_info_from_filename(filename)
+            key = (slice(None),) * (len(coords) - 1 - list(coords).index(dim))
+            plane = self._read_hdf5(prefix, counter, key + (index,)).transpose()
+        else:
+            # This is necessary if the file is a link
+            if os.path.islink(filename):
+                filename = os.readlink(filename)
+
+            shape = tuple(len(value) for value in coords.values())
+            key = (slice(None),) * list(coords).index(dim) + (index,)
+            if _is_compressed(filename):
+                # Just the chunks that contain the plane are decompressed
+                plane = _read_values(
+                    filename, _plane_offsets(shape, key), param["mytype"]
+                ).reshape([n for d, n in zip(coords, shape) if d != dim], order="F")
+            else:
+                mmap = _map_file(filename, param["mytype"], shape, order="F")
+                plane = np.array(mmap[key])
+                del mmap
+
+        array = xr.DataArray(
+            plane,
+            dims=[key for key in coords if key != dim],
+            coords=self._mesh._get_indexes(dim),
+            name=name,
+            attrs=attrs,
+        ).assign_coords({dim: coords[dim][index]})
+
+        if add_time:
+            array = array.expand_dims(t=[param["mytype"](self._time_step * time_int)])
+            array = array.transpose(..., "t")
+
+        return array
+
     def load_snapshot(
         self,
         numerical_identifier: int,
@@ -635,6 +816,7 @@ class Dataset(traitlets.HasTraits):
         add_time: bool = True,
         stack_scalar: bool = None,
         stack_velocity: bool = None,
+        level: int = 0,
     ) -> Type[xr.Dataset]:
         """Load the variables for a given snapshot.
 
@@ -654,6 +836,10 @@ class Dataset(traitlets.HasTraits):
         stack_velocity : bool, optional
             When true, the velocity will be stacked in a new coordinate ``i``, otherwise returns one array per velocity component.
             If none, it uses :obj:`Dataset.stack_velocity`, by default None.
+        level : int, optional
+            The level of the multiscale pyramid built by :obj:`Dataset.build_pyramid`,
+            where each level is coarser by a factor of two in every direction,
+            by default 0, meaning the full resolution.
 
         Returns
         -------
@@ -690,7 +876,21 @@ class Dataset(traitlets.HasTraits):
 
         >>> snapshot = prm.dataset[10]
 
+        Or a coarser version of it, for a quick look:
+
+        >>> prm.dataset.build_pyramid()
+        >>> snapshot = prm.dataset.load_snapshot(10, level=3)
+
         """
+        if level:
+            return self._get_pyramid_level(level).load_snapshot(
+                numerical_identifier,
+                list_of_variables,
+                add_time,
+                stack_scalar,
+                stack_velocity,
+            )
+
         dataset = xr.Dataset()
 
         if list_of_variables is not None:
@@ -702,11 +902,9 @@ class Dataset(traitlets.HasTraits):
                 "*", numerical_identifier
             )
 
-            list_of_variables = glob.glob(os.path.join(self.data_path, target_filename))
-            list_of_variables = map(
-                self.filename_properties.get_name_from_filename, list_of_variables
-            )
-            set_of_variables = set(list_of_variables)
+            set_of_variables = {
+                name for _, name in self._get_info(counter=numerical_identifier)
+            }
 
         if not set_of_variables:
             raise IOError(
@@ -835,7 +1033,12 @@ class Dataset(traitlets.HasTraits):
             array_prefix, "*"
         )
         filename_pattern = os.path.join(self.data_path, target_filename)
-        filename_list = sorted(glob.glob(filename_pattern))
+        filename_list = [
+            self.filename_properties.get_filename_for_binary(
+                name, counter, self.data_path
+            )
+            for counter, name in sorted(self._get_info(array_prefix))
+        ]
 
         if not filename_list:
             raise IOError(f"No file was found corresponding to {filename_pattern}.")
@@ -848,25 +1051,500 @@ class Dataset(traitlets.HasTraits):
             dim="t",
         )
 
-    def load_wind_turbine_data(self, file_pattern: str = None) -> Type[xr.Dataset]:
+    def extract_probes(
+        self,
+        points: dict,
+        variables: Union[str, list] = None,
+        method: str = "linear",
+        max_workers: int = None,
+    ) -> Union[xr.DataArray, xr.Dataset]:
+        """Extract the time series at a few probe locations.
+
+        Instead of loading the whole snapshots, the probes are mapped to the
+        indexes of the mesh (or to the interpolation stencils, including the
+        stretched mesh in :obj:`y`), and just the values around them are read
+        from each file, at their offset in the raw binary. The files are read
+        by a pool of threads.
+
+        Parameters
+        ----------
+        points : dict
+            The physical coordinates of the probes, in the form
+            ``{"x": [...], "y": [...], "z": [...]}``, with one entry
+            per dimension of the arrays (the coordinates at :obj:`drop_coords`
+            are not included). It can be a :obj:`pandas.DataFrame` as well.
+        variables : str or list of str, optional
+            Name of the variables, for instance ``ux``, ``uy``, ``uz``, ``pp``,
+            ``phi1``. By default None, meaning all the variables at
+            :obj:`data_path`.
+        method : str, optional
+            ``"linear"`` for multilinear interpolation or ``"nearest"`` for
+            the nearest mesh point, by default ``"linear"``.
+        max_workers : int, optional
+            The maximum number of threads used to read the files,
+            see :obj:`concurrent.futures.ThreadPoolExecutor`. By default None.
+
+        Returns
+        -------
+        :obj:`xarray.DataArray` or :obj:`xarray.Dataset`
+            Arrays with the dimensions ``(probe, t)``, the coordinates of the
+            probes are included along ``probe``. It is a DataArray if
+            ``variables`` is a string, or a Dataset otherwise.
+
+        Raises
+        ------
+        IOError
+            If no snapshot is found for a variable
+        ValueError
+            If any probe is out of the domain
+
+        Examples
+        --------
+
+        >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+        >>> ux = prm.dataset.extract_probes(
+        ...     dict(x=[1.0, 2.0], y=[0.5, 0.5], z=[1.0, 1.0]), "ux"
+        ... )
+        >>> ux.sel(probe=0).plot()
+        """
+        if method not in ("linear", "nearest"):
+            raise ValueError(f"Unknown method {method!r}.")
+
+        coords = self._mesh._get_indexes(*self.drop_coords)
+        if set(points) != set(coords):
+            raise ValueError(f"Expected the coordinates {list(coords)} for the probes.")
+        points = {
+            dim: np.atleast_1d(np.asarray(points[dim], dtype=np.float64))
+            for dim in coords
+        }
+        shape = [len(coord) for coord in coords.values()]
+
+        # Indexes and weights for each probe at each corner of the stencil
+        indexes, weights = _probe_stencil(
+            [np.asarray(coord) for coord in coords.values()],
+            [points[dim] for dim in coords],
+            method,
+        )
+        lower = indexes.min(axis=(1, 2))
+        upper = indexes.max(axis=(1, 2)) + 1
+        flat = np.ravel_multi_index(tuple(indexes), shape, order="F")
+        unique, inverse = np.unique(flat, return_inverse=True)
+        inverse = inverse.reshape(flat.shape)
+        dtype = np.dtype(param["mytype"])
+
+        def read(info):
+            counter, name = info
+            if self.layout != "binary":
+                # Just the box around the probes is read from HDF5
+                key = tuple(slice(lo, hi) for lo, hi in zip(lower, upper))[::-1]
+                box = self._read_hdf5(name, counter, key).transpose()
+                values = box[tuple(indexes - lower[:, None, None])]
+            else:
+                filename = self.filename_properties.get_filename_for_binary(
+                    name, counter, self.data_path
+                )
+                values = _read_values(filename, unique, dtype)[inverse]
+            return np.sum(values * weights, axis=-1)
+
+        if variables is None:
+            variables = sorted({name for _, name in self._get_info()})
+        names = [variables] if isinstance(variables, str) else list(variables)
+
+        ds = xr.Dataset(
+            coords={
+                dim: xr.DataArray(values, dims="probe")
+                for dim, values in points.items()
+            }
+        )
+        with ThreadPoolExecutor(max_workers) as executor:
+            for name in names:
+                info = sorted(self._get_info(name))
+                if not info:
+                    raise IOError(
+                        f"No snapshot was found for {name} at {self.data_path}."
+                    )
+                # The same time as in load_array, so the results can be aligned
+                time = [
+                    param["mytype"](self._time_step * counter) for counter, _ in info
+                ]
+                values = np.stack(list(executor.map(read, info)), axis=-1)
+                ds[name] = xr.DataArray(
+                    values.astype(dtype, copy=False),
+                    dims=("probe", "t"),
+                    coords=dict(t=time),
+                )
+        ds.t.attrs = dict(name="t", long_name="Time")
+
+        if isinstance(variables, str):
+            return ds[variables]
+        return ds
+
+    def extract_planes(
+        self,
+        data_path: str,
+        variables: Union[str, list] = None,
+        max_workers: int = None,
+        **indexer,
+    ) -> Dataset:
+        """Extract planes or lines from all snapshots into a new compact dataset.
+
+        Just the strips of the raw binaries that contain the plane are read (the
+        plane at a given :obj:`z` is contiguous on the disc, while there is one strip
+        per mesh point in :obj:`z` for a plane at a given :obj:`y`, for instance),
+        and they are written to files with the same names at ``data_path``.
+        The files are processed by a pool of threads, and the progress bar
+        reports the throughput.
+
+        The extraction can be resumed: the files already available at ``data_path``
+        are skipped. Each file is written to a temporary file that is renamed at
+        the end, so an interrupted extraction never leaves an incomplete file.
+        The plane, the shape and the variables are recorded at the sidecar
+        ``planes.json``, and the files extracted before are removed if
+        a different plane is extracted to the same ``data_path``.
+
+        Parameters
+        ----------
+        data_path : str
+            The path to the folder where the planes are written.
+        variables : str or list of str, optional
+            Name of the variables, for instance ``ux``, ``uy``, ``uz``, ``pp``,
+            ``phi1``. By default None, meaning all the variables at
+            :obj:`data_path`.
+        max_workers : int, optional
+            The maximum number of threads,
+            see :obj:`concurrent.futures.ThreadPoolExecutor`. By default None.
+        **indexer
+            One coordinate and its value for a plane, like ``z=0.0``, or two of them
+            for a line, like ``y=1.0, z=0.0``. The nearest mesh point is selected.
+
+        Returns
+        -------
+        :obj:`Dataset`
+            A new dataset to load the planes from ``data_path``, with the same
+            properties as this one and the appropriate :obj:`drop_coords`.
+
+        Raises
+        ------
+        KeyError
+            Exception is raised when the indexer is not one or two of
+            the coordinates ``x``, ``y`` or ``z``.
+        ValueError
+            If the arrays are not three-dimensional (see :obj:`drop_coords`),
+            or if ``data_path`` is the same as :obj:`data_path`.
+
+        Examples
+        --------
+
+        >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+        >>> planes = prm.dataset.extract_planes("./planes/", z=0.0)
+        >>> ux = planes["ux"]  # with the dimensions x, y and t
+
+        """
+        coords = self._mesh.get()
+
+        if not 0 < len(indexer) < len(coords) or not set(indexer).issubset(coords):
+            raise KeyError(
+                f"Specify one or two of {', '.join(coords)} to select a plane or line"
+            )
+        if self.drop_coords:
+            raise ValueError("The arrays at data_path are not three-dimensional.")
+        if os.path.realpath(data_path) == os.path.realpath(self.data_path):
+            raise ValueError(
+                "The planes would overwrite the arrays, extract them to another path."
+            )
+
+        # Offsets in the Fortran order of the raw binaries, for the mesh points at
+        # the plane, so the strips are sorted and contiguous on the disc
+        shape = tuple(len(coord) for coord in coords.values())
+        key = tuple(
+            int(np.abs(coord - indexer[dim]).argmin())
+            if dim in indexer
+            else slice(None)
+            for dim, coord in coords.items()
+        )
+        offsets = _plane_offsets(shape, key)
+        dtype = np.dtype(param["mytype"])
+        size = offsets.size * dtype.itemsize
+
+        # The planes are always written as raw binaries
+        planes = self._derive(
+            data_path=data_path,
+            drop_coords="".join(dim for dim in coords if dim in indexer),
+            layout="binary",
+        )
+        os.makedirs(data_path, exist_ok=True)
+
+        if variables is None:
+            variables = sorted({name for _, name in self._get_info()})
+        names = [variables] if isinstance(variables, str) else list(variables)
+        info = sorted(info for name in names for info in self._get_info(name))
+
+        def target(counter, name):
+            return self.filename_properties.get_filename_for_binary(
+                name, counter, data_path
+            )
+
+        # The files extracted before are kept just if they are from the same plane,
+        # so any file available at data_path after this point is up to date
+        metadata = dict(
+            indexer={dim: k for dim, k in zip(coords, key) if dim in indexer},
+            shape=list(shape),
+            variables=sorted(names),
+        )
+        filename = os.path.join(data_path, "planes.json")
+        previous = _load_json(filename)
+        if previous is not None and any(
+            previous[field] != metadata[field] for field in ("indexer", "shape")
+        ):
+            for name in previous["variables"]:
+                for stale in glob.glob(target("*", name)):
+                    os.remove(stale)
+        elif previous is not None:
+            metadata["variables"] = sorted(set(previous["variables"]) | set(names))
+        with open(filename + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=1)
+        os.replace(filename + ".tmp", filename)
+
+        # The files from a previous extraction are skipped
+        pending = [
+            (counter, name)
+            for counter, name in info
+            if not os.path.isfile(target(counter, name))
+            or os.path.getsize(target(counter, name)) != size
+        ]
+
+        def extract(counter, name):
+            if self.layout != "binary":
+                # The plane is read from HDF5, in the reversed order of the axes
+                values = self._read_hdf5(name, counter, key[::-1]).transpose()
+            else:
+                filename = self.filename_properties.get_filename_for_binary(
+                    name, counter, self.data_path
+                )
+                values = _read_values(filename, offsets, dtype)
+            filename = target(counter, name)
+            with open(filename + ".tmp", "wb") as file:
+                file.write(np.asarray(values, dtype=dtype).tobytes(order="F"))
+            os.replace(filename + ".tmp", filename)
+            return size
+
+        with tqdm(
+            total=len(info) * size,
+            initial=(len(info) - len(pending)) * size,
+            desc=data_path,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+        ) as progress, ThreadPoolExecutor(max_workers) as executor:
+            for written in executor.map(lambda args: extract(*args), pending):
+                progress.update(written)
+
+        return planes
+
+    def build_pyramid(
+        self,
+        levels: int = 3,
+        method: str = "mean",
+        variables: Union[str, list] = None,
+        max_workers: int = None,
+    ) -> None:
+        """Build a multiscale pyramid for all snapshots, for a quick look at them
+        with :obj:`Dataset.load_snapshot` and the argument ``level``.
+
+        Each level is coarser by a factor of two in every direction
+        (2×, 4×, 8× and so on), and they are all computed in a single streaming
+        pass over each file, slab by slab along :obj:`z`. They are stored as
+        raw binaries in the sidecar folder ``pyramid`` at :obj:`data_path`,
+        one subfolder per level. The files are processed by a pool of threads,
+        and the ones that are up to date are skipped.
+
+        Parameters
+        ----------
+        levels : int, optional
+            The number of coarse levels, by default 3.
+        method : str, optional
+            ``"mean"`` for the average over blocks of mesh points (the coordinates
+            are averaged as well), or ``"stride"`` to just pick every other
+            mesh point, that is faster. By default ``"mean"``.
+        variables : str or list of str, optional
+            Name of the variables, for instance ``ux``, ``uy``, ``uz``, ``pp``,
+            ``phi1``. By default None, meaning all the variables at
+            :obj:`data_path`.
+        max_workers : int, optional
+            The maximum number of threads,
+            see :obj:`concurrent.futures.ThreadPoolExecutor`. By default None.
+
+        Raises
+        ------
+        ValueError
+            If the arrays are not three-dimensional (see :obj:`drop_coords`),
+            or for an unknown ``method``.
+
+        Examples
+        --------
+
+        >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+        >>> prm.dataset.build_pyramid(levels=3)
+        >>> snapshot = prm.dataset.load_snapshot(10, level=3)  # 8× coarser
+
+        """
+        if method not in ("mean", "stride"):
+            raise ValueError(f"Unknown method {method!r}.")
+        if self.drop_coords:
+            raise ValueError("The arrays at data_path are not three-dimensional.")
+
+        coords = self._mesh.get()
+        shape = tuple(len(coord) for coord in coords.values())
+        dtype = np.dtype(param["mytype"])
+        path = os.path.join(self.data_path, _PYRAMID)
+        for level in range(1, levels + 1):
+            os.makedirs(os.path.join(path, str(level)), exist_ok=True)
+
+        # The files are up to date just if they were built the same way
+        metadata = dict(levels=levels, method=method, shape=list(shape))
+        filename = os.path.join(path, "pyramid.json")
+        skip = self.layout == "binary" and _load_json(filename) == metadata
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+        # The slabs are aligned to the blocks of the coarsest level
+        factor = 2 ** levels
+        planes = max(1, _SLAB_SIZE // (shape[0] * shape[1] * dtype.itemsize))
+        planes = max(factor, planes // factor * factor)
+
+        if variables is None:
+            variables = sorted({name for _, name in self._get_info()})
+        names = [variables] if isinstance(variables, str) else list(variables)
+        info = sorted(info for name in names for info in self._get_info(name))
+
+        def build(counter, name):
+            source = self.filename_properties.get_filename_for_binary(
+                name, counter, self.data_path
+            )
+            targets = [
+                self.filename_properties.get_filename_for_binary(
+                    name, counter, os.path.join(path, str(level))
+                )
+                for level in range(1, levels + 1)
+            ]
+            if skip and all(
+                os.path.isfile(target)
+                and os.path.getmtime(target) >= os.path.getmtime(source)
+                for target in targets
+            ):
+                return 0
+            files = [open(target + ".tmp", "wb") for target in targets]
+            compressed = self.layout == "binary" and _is_compressed(source)
+            if self.layout == "binary" and not compressed:
+                array = _map_file(source, dtype, shape, order="F")
+            else:
+                # Just the chunks of each slab are decompressed
+                array = _CompressedFile(source) if compressed else None
+            try:
+                for start in range(0, shape[2], planes):
+                    stop = min(start + planes, shape[2])
+                    if self.layout != "binary":
+                        slab = self._read_hdf5(name, counter, (slice(start, stop),))
+                        slab = slab.transpose()
+                    elif compressed:
+                        slab = array.read(
+                            start * shape[0] * shape[1], stop * shape[0] * shape[1]
+                        )
+                        slab = slab.astype(dtype, copy=False).reshape(
+                            shape[:2] + (stop - start,), order="F"
+                        )
+                    else:
+                        slab = np.asarray(array[..., start:stop])
+                    for coarse, file in zip(_pyramid(slab, levels, method), files):
+                        file.write(np.asarray(coarse, dtype=dtype).tobytes(order="F"))
+            finally:
+                for file in files:
+                    file.close()
+                if compressed:
+                    array.close()
+                del array
+            for target in targets:
+                os.replace(target + ".tmp", target)
+            return int(np.prod(shape)) * dtype.itemsize
+
+        with tqdm(
+            total=len(info) * int(np.prod(shape)) * dtype.itemsize,
+            desc=path,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+        ) as progress, ThreadPoolExecutor(max_workers) as executor:
+            for size in executor.map(lambda args: build(*args), info):
+                progress.update(size)
+
+        with open(filename + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=1)
+        os.replace(filename + ".tmp", filename)
+
+    def _get_pyramid_level(self, level: int) -> Dataset:
+        """A dataset that loads the arrays from a level of the pyramid."""
+        path = os.path.join(self.data_path, _PYRAMID)
+        metadata = _load_json(os.path.join(path, "pyramid.json"))
+        if metadata is None:
+            raise IOError(f"No pyramid was found at {path}, see Dataset.build_pyramid.")
+        if not 0 < level <= metadata["levels"]:
+            raise ValueError(
+                f"The level should be between 1 and {metadata['levels']}, not {level}."
+            )
+        coords = {
+            dim: pd.Index(
+                _block_reduce(np.asarray(coord), 2 ** level, metadata["method"]),
+                name=dim,
+            )
+            for dim, coord in self._mesh.get().items()
+        }
+        return self._derive(
+            data_path=os.path.join(path, str(level)), layout="binary", _coords=coords
+        )
+
+    def load_wind_turbine_data(
+        self,
+        file_pattern: str = None,
+        max_workers: int = None,
+        cache: GeometryCache = None,
+    ) -> Type[xr.Dataset]:
         """Load the data produced by wind turbine simulations.
 
         .. note:: This feature is experimental
 
+        All files are expected to have the same columns, so they are parsed in
+        parallel by a pool of threads straight into a table, that is sorted by the
+        time just once at the end.
+
         Parameters
         ----------
         file_pattern : str, optional
-            A filename pattern used to locate the files with :obj:`glob.iglob`.
+            A filename pattern used to locate the files with :obj:`glob.glob`.
             If None, it is obtained from ``datapath``, i.g.,
             if ``datapath = ./examples/Wind-Turbine/data`` then
             ``file_pattern = ./examples/Wind-Turbine/data/../*.perf``.
             By default None.
+        max_workers : int, optional
+            The maximum number of threads used to parse the files,
+            see :obj:`concurrent.futures.ThreadPoolExecutor`. By default None.
+        cache : :obj:`xcompact3d_toolbox.cache.GeometryCache`, optional
+            If provided, the table is loaded from the cache when the set of files
+            (their names, sizes and modification times), :obj:`dt` and
+            :obj:`iturboutput` are the same as in a previous call, otherwise, it is
+            parsed and stored in the cache. By default None
 
         Returns
         -------
         :obj:`xarray.Dataset`
             A dataset with all variables as a function of the time
 
+        Raises
+        ------
+        IOError
+            If no file is found
+        ValueError
+            If the files do not have the same columns
+
         Examples
         --------
 
@@ -891,34 +1569,70 @@ class Dataset(traitlets.HasTraits):
             Thrust           (t) float64 9.39e+05 1.826e+05 ... 4.084e+05 4.066e+05
             Torque           (t) float64 8.78e+06 1.268e+06 ... 4.231e+06 4.203e+06
             Power            (t) float64 1.112e+07 1.952e+06 ... 5.362e+06 5.328e+06
+
+        The table can be cached, so loading a finished run again is instant:
+
+        >>> cache = xcompact3d_toolbox.cache.GeometryCache()
+        >>> ds = prm.dataset.load_wind_turbine_data(cache=cache)
         """
+        if file_pattern is None:
+            file_pattern = os.path.join(self.data_path, "..", "*.perf")
 
-        def get_dataset(filename):
+        filenames = glob.glob(file_pattern)
 
-            time = os.path.basename(filename).split("_")[0]
+        if not filenames:
+            raise IOError(f"No file was found corresponding to {file_pattern}.")
 
-            time = float(time) * self._prm.iturboutput * self._prm.dt
+        time_step = self._prm.iturboutput * self._prm.dt
 
-            ds = xr.Dataset(coords=dict(t=[time]))
-            ds.t.attrs = dict(name="t", long_name="Time", units="s")
+        if cache is not None:
+            stats = [os.stat(filename) for filename in filenames]
+            key = cache.key(
+                "load_wind_turbine_data",
+                sorted(
+                    (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+                    for filename, stat in zip(filenames, stats)
+                ),
+                time_step,
+            )
+            entry = cache.load(key)
+            if entry is not None:
+                return xr.load_dataset(os.path.join(entry, "perf.nc"))
+
+        names, units, _ = _read_perf(filenames[0])
 
-            for name, values in pd.read_csv(filename).to_dict().items():
-                ds[name.strip()] = xr.DataArray(
-                    data=np.float64(values[1]),
-                    coords=ds.t.coords,
-                    attrs=dict(units=values[0].strip()[1:-1]),
+        time = np.empty(len(filenames), dtype=np.float64)
+        values = np.empty((len(filenames), len(names)), dtype=np.float64)
+
+        def read(index, filename):
+            header, _, row = _read_perf(filename)
+            if header != names:
+                raise ValueError(
+                    f"The columns at {filename} are not the same as at {filenames[0]}."
                 )
+            values[index] = row
+            time[index] = float(os.path.basename(filename).split("_")[0]) * time_step
 
-            return ds
+        with ThreadPoolExecutor(max_workers) as executor:
+            # Consumed just to raise any exception
+            for _ in executor.map(read, range(len(filenames)), filenames):
+                pass
 
-        if file_pattern is None:
-            file_pattern = os.path.join(self.data_path, "..", "*.perf")
+        order = np.argsort(time, kind="stable")
+        ds = _perf_to_dataset(names, units, time[order], values[order])
 
-        filenames = glob.iglob(file_pattern)
+        if cache is not None:
+            with cache.store(key) as entry:
+                ds.to_netcdf(os.path.join(entry, "perf.nc"))
 
-        return xr.concat((get_dataset(file) for file in filenames), dim="t").sortby("t")
+        return ds
 
-    def write(self, data: Union[xr.DataArray, xr.Dataset], file_prefix: str = None):
+    def write(
+        self,
+        data: Union[xr.DataArray, xr.Dataset],
+        file_prefix: str = None,
+        max_workers: int = 1,
+    ):
         """Write an array or dataset to raw binary files on the disc, in the
         same order that Xcompact3d would do, so they can be easily read with
         2DECOMP.
@@ -943,6 +1657,12 @@ class Dataset(traitlets.HasTraits):
             Data to be written
         file_prefix : str, optional
             filename prefix for the array, if data is :obj:`xarray.DataArray`, by default None
+        max_workers : int, optional
+            Maximum number of files written at the same time by a pool of threads,
+            by default 1. Arrays backed by dask are computed file by file with the
+            synchronous scheduler when it is larger than one, so the memory in use is
+            bounded by one chunk per worker. The progress bar reports the throughput
+            achieved, in bytes per second.
 
         Raises
         ------
@@ -994,61 +1714,61 @@ class Dataset(traitlets.HasTraits):
 
         """
         if isinstance(data, xr.Dataset):
-            os.makedirs(self.data_path, exist_ok=True)
-            self._write_dataset(data)
+            files, desc = list(self._split_dataset(data)), None
         elif isinstance(data, xr.DataArray):
-            os.makedirs(self.data_path, exist_ok=True)
-            self._write_array(data, file_prefix)
+            files = list(self._split_array(data, file_prefix))
+            desc = file_prefix or data.attrs.get("file_name", None)
         else:
             raise IOError(
                 f"Invalid type for data, try with: xarray.Dataset or xarray.DataArray"
             )
+        os.makedirs(self.data_path, exist_ok=True)
+        self._write_files(files, max_workers, desc)
 
-    def _write_dataset(self, dataset) -> None:
+    def _split_dataset(self, dataset):
 
         for array_name, array in dataset.items():
             if "file_name" in array.attrs:
-                self._write_array(array)
+                yield from self._split_array(array)
             else:
                 warnings.warn(f"Can't write array {array_name}, no filename provided")
 
-    def _write_array(self, dataArray, filename: str = None) -> None:
+    def _split_array(self, dataArray, filename: str = None, key: tuple = None):
+        """Yields the filename (with path), the data and the key (name and counter,
+        if ``t`` is a dimension) for each binary file."""
         if filename is None:  # Try to get from atributes
             filename = dataArray.attrs.get("file_name", None)
         if filename is None:
             raise IOError(f"Can't write field without a filename")
-        # If n is a dimension (for scalar), call write recursively to save
+        # If n is a dimension (for scalar), call it recursively to save
         # phi1, phi2, phi3, for instance.
         if "n" in dataArray.dims:
             for n, n_val in enumerate(dataArray.n.data):
-                self._write_array(
+                yield from self._split_array(
                     dataArray.isel(n=n, drop=True),
                     filename=f"{filename}{str(n_val).zfill(self.filename_properties.scalar_num_of_digits)}",
                 )
-        # If i is a dimension, call write recursively to save
+        # If i is a dimension, call it recursively to save
         # ux, uy and uz, for instance
         elif "i" in dataArray.dims:
             for i, i_val in enumerate(dataArray.i.data):
-                self._write_array(
+                yield from self._split_array(
                     dataArray.isel(i=i, drop=True), filename=f"{filename}{i_val}"
                 )
-        # If t is a dimension (for time), call write recursively to save
+        # If t is a dimension (for time), call it recursively to save
         # ux-0000.bin, ux-0001.bin, ux-0002.bin, for instance.
         elif "t" in dataArray.dims:
             dt = self._time_step
-            if dataArray.t.size == 1:
-                loop_itr = enumerate(dataArray.t.data)
-            else:
-                loop_itr = enumerate(tqdm(dataArray.t.data, desc=filename))
-            for k, time in loop_itr:
-                self._write_array(
+            for k, time in enumerate(dataArray.t.data):
+                yield from self._split_array(
                     dataArray.isel(t=k, drop=True),
                     self.filename_properties.get_filename_for_binary(
                         prefix=filename,
                         counter=int(time / dt),
                     ),
+                    key=(filename, int(time / dt)),
                 )
-        # and finally writes to the disc
+        # and finally the file to be written
         else:
             fileformat = self.filename_properties.file_extension
             if fileformat and not filename.endswith(fileformat):
@@ -1056,12 +1776,337 @@ class Dataset(traitlets.HasTraits):
             align = [
                 dataArray.get_axis_num(i) for i in sorted(dataArray.dims, reverse=True)
             ]
-            filename_and_path = os.path.join(self.data_path, filename)
-            dataArray.values.astype(param["mytype"]).transpose(align).tofile(
-                filename_and_path
+            # A lazy view for dask, or just a view for NumPy
+            data = dataArray.data.transpose(align)
+            yield os.path.join(self.data_path, filename), data, key
+
+    def _write_files(self, files: list, max_workers: int = 1, desc: str = None):
+        if self.keepbits is not None and self.compression is None:
+            raise ValueError("keepbits needs a compression, see Dataset.compression.")
+        dtype = np.dtype(param["mytype"])
+        total = sum(data.size for _, data, _ in files) * dtype.itemsize
+        # Each file is computed on its own when many are written at once, so
+        # there is just one chunk from dask per worker in memory
+        scheduler = "synchronous" if max_workers > 1 else None
+        manifest = self._load_manifest() if self.manifest else None
+
+        with tqdm(
+            total=total,
+            desc=desc,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            disable=len(files) < 2,
+        ) as progress, ThreadPoolExecutor(max_workers) as executor:
+
+            # Just the time series go to HDF5, the other arrays (like the
+            # geometry) are still raw binaries, as expected by XCompact3d
+            if self.layout != "binary":
+                self._write_hdf5(
+                    [file for file in files if file[2] is not None],
+                    dtype,
+                    scheduler,
+                    progress,
+                )
+                files = [file for file in files if file[2] is None]
+
+            def collect(futures):
+                for future in futures:
+                    size, name, entry = future.result()
+                    progress.update(size)
+                    if manifest is not None:
+                        manifest[name] = entry
+
+            try:
+                pending = set()
+                for filename, data, _ in files:
+                    # No more files in flight than workers
+                    if len(pending) >= max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(
+                        executor.submit(
+                            self._write_file, filename, data, dtype, scheduler, manifest
+                        )
+                    )
+                collect(as_completed(pending))
+            finally:
+                if manifest is not None:
+                    self._save_manifest(manifest)
+
+    def _write_file(self, filename, data, dtype, scheduler, manifest):
+        size = data.size * dtype.itemsize
+        if self.compression is not None:
+            # Compressed in memory, so the manifest describes the file on the disc
+            parts = _encode(data, dtype, self.compression, self.keepbits, scheduler)
+            write = functools.partial(_write_parts, parts=parts)
+        else:
+            parts = None
+            write = functools.partial(
+                _write_raw, data=data, dtype=dtype, scheduler=scheduler
+            )
+
+        if manifest is None:
+            write(filename)
+            return size, None, None
+
+        name = os.path.relpath(filename, self.data_path)
+        # Written atomically, so the file is never incomplete at the disc
+        directory, basename = os.path.split(filename)
+        temporary = os.path.join(directory, f".{basename}.{uuid.uuid4().hex}.tmp")
+        try:
+            if parts is None:
+                # Hashed back from the disc, so the data is computed just once
+                write(temporary)
+                digest = _hash_file(temporary)
+            else:
+                digest = _hash_parts(parts)
+            entry = dict(
+                hash=digest,
+                shape=list(data.shape),
+                dtype=dtype.str,
+                size=size if parts is None else sum(len(part) for part in parts),
+            )
+            previous = manifest.get(name, {})
+            if all(previous.get(key) == value for key, value in entry.items()):
+                if _is_unchanged(filename, previous):
+                    return size, name, previous
+            if parts is not None:
+                write(temporary)
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        entry["mtime"] = os.stat(filename).st_mtime_ns
+        return size, name, entry
+
+    def _get_hdf5_filename(self, counter: int) -> str:
+        if self.layout == "hdf5-run":
+            return os.path.join(self.data_path, "snapshots.h5")
+        properties = self.filename_properties
+        counter = str(counter).zfill(properties.number_of_digits)
+        return os.path.join(
+            self.data_path, f"snapshot{properties.separator}{counter}.h5"
+        )
+
+    def _write_hdf5(self, files, dtype, scheduler, progress) -> None:
+        h5py = _import_h5py()
+
+        def get_filename(file):
+            return self._get_hdf5_filename(file[2][1])
+
+        # Each HDF5 file is opened just once
+        for filename, group in itertools.groupby(
+            sorted(files, key=get_filename), key=get_filename
+        ):
+            with h5py.File(filename, "a") as h5file:
+                for _, data, (name, counter) in group:
+                    dset, prefix = self._require_hdf5_dataset(
+                        h5file, name, counter, data.shape, dtype
+                    )
+                    for start, stop in _slabs(data, dtype):
+                        slab = data[start:stop]
+                        if not isinstance(slab, np.ndarray):
+                            slab = slab.compute(scheduler=scheduler)
+                        dset[prefix + (slice(start, stop),)] = np.asarray(slab, dtype)
+                    progress.update(data.size * dtype.itemsize)
+
+    def _require_hdf5_dataset(self, h5file, name, counter, shape, dtype):
+        """Returns the dataset and the index of the snapshot on it."""
+        options = dict(dtype=dtype, compression=self.hdf5_compression)
+        if self.layout == "hdf5":
+            if name in h5file and (
+                h5file[name].shape != shape or h5file[name].dtype != dtype
+            ):
+                del h5file[name]
+            if name not in h5file:
+                h5file.create_dataset(name, shape=shape, **options)
+            return h5file[name], ()
+
+        # One dataset for the whole run, with a chunk per snapshot
+        if name not in h5file:
+            h5file.create_dataset(
+                name,
+                shape=(counter + 1,) + shape,
+                maxshape=(None,) + shape,
+                chunks=(1,) + shape,
+                fillvalue=np.nan,
+                **options,
+            )
+            h5file[name].attrs["counters"] = np.array([], dtype=int)
+        dset = h5file[name]
+        if dset.shape[0] <= counter:
+            dset.resize(counter + 1, axis=0)
+        dset.attrs["counters"] = np.union1d(dset.attrs["counters"], [counter])
+        return dset, (counter,)
+
+    def _read_hdf5(self, name: str, counter: int, key: tuple = ()):
+        """Reads an array from HDF5, in the same order as the raw binaries."""
+        h5py = _import_h5py()
+        with h5py.File(self._get_hdf5_filename(counter), "r") as h5file:
+            if self.layout == "hdf5-run":
+                key = (counter,) + key
+            return h5file[name][key]
+
+    def _get_info(self, prefix: str = "*", counter="*") -> list:
+        """Lists the name and counter of the arrays available on the disc,
+        for any of the layouts."""
+        if self.layout == "binary":
+            filename_pattern = self.filename_properties.get_filename_for_binary(
+                prefix, counter, self.data_path
+            )
+            return [
+                self.filename_properties.get_info_from_filename(filename)
+                for filename in glob.glob(filename_pattern)
+            ]
+
+        h5py = _import_h5py()
+        if self.layout == "hdf5-run":
+            filename = self._get_hdf5_filename(0)
+            if not os.path.isfile(filename):
+                return []
+            with h5py.File(filename, "r") as h5file:
+                return [
+                    (int(number), name)
+                    for name in h5file
+                    for number in h5file[name].attrs["counters"]
+                    if fnmatch.fnmatch(name, prefix)
+                    and (counter == "*" or int(number) == int(counter))
+                ]
+
+        info = []
+        filename_pattern = self._get_hdf5_filename(
+            "?" * self.filename_properties.number_of_digits
+            if counter == "*"
+            else counter
+        )
+        for filename in glob.glob(filename_pattern):
+            digits = self.filename_properties.number_of_digits
+            number = int(os.path.basename(filename)[-3 - digits : -3])
+            with h5py.File(filename, "r") as h5file:
+                info.extend(
+                    (number, name) for name in h5file if fnmatch.fnmatch(name, prefix)
+                )
+        return info
+
+    def convert(self, layout: str = "hdf5", remove: bool = False) -> None:
+        """Convert the raw binary files at :obj:`data_path` to the HDF5 ``layout``
+        (see :obj:`Dataset.layout`), one array at a time.
+
+        Just the time series are converted, the other files (like the geometry)
+        are expected as raw binaries by XCompact3d.
+
+        Parameters
+        ----------
+        layout : str, optional
+            ``"hdf5"`` for one file per snapshot, or ``"hdf5-run"`` for one file for
+            the whole run, by default ``"hdf5"``
+        remove : bool, optional
+            Remove the raw binary files after the conversion, by default False
+
+        Examples
+        --------
+
+        >>> prm.dataset.convert("hdf5-run", remove=True)
+        >>> prm.dataset.layout = "hdf5-run"
+        >>> ux = prm.dataset["ux"]  # loaded from HDF5 now
+        """
+        current = self.layout
+        self.layout = "binary"
+        info = self._get_info()
+        # Files in the same order as the raw binaries
+        shape = [
+            len(coord)
+            for dim, coord in self._mesh.get().items()
+            if dim not in self.drop_coords
+        ][::-1]
+        files = []
+        for counter, name in sorted(info):
+            filename = self.filename_properties.get_filename_for_binary(
+                name, counter, self.data_path
             )
+            data = _map_file(filename, param["mytype"], tuple(shape))
+            files.append((filename, data, (name, counter)))
+        data = None
+
+        dtype = np.dtype(param["mytype"])
+        self.layout = layout
+        try:
+            with tqdm(
+                total=sum(data.size for _, data, _ in files) * dtype.itemsize,
+                desc=f"{self.data_path} to {layout}",
+                unit="B",
+                unit_scale=True,
+                unit_divisor=1024,
+            ) as progress:
+                self._write_hdf5(files, dtype, None, progress)
+        finally:
+            self.layout = current
+        filenames = [filename for filename, *_ in files]
+        # The files mapped in memory are closed before they are removed
+        del files
+        if remove:
+            for filename in filenames:
+                os.remove(filename)
+
+    def _load_manifest(self) -> dict:
+        filename = os.path.join(self.data_path, _MANIFEST)
+        if not os.path.isfile(filename):
+            return {}
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        filename = os.path.join(self.data_path, _MANIFEST)
+        with open(filename + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(filename + ".tmp", filename)
+
+    def verify(self, full: bool = False) -> list:
+        """Check the integrity of the files written with :obj:`manifest` enabled.
+
+        By default, the check is cheap, it compares the size and the modification time
+        of each file with the ones at the manifest, so the data is not read. Use
+        ``full=True`` to compute the hash of the content again.
+
+        Parameters
+        ----------
+        full : bool, optional
+            Compare the hash of the content of each file, by default False
+
+        Returns
+        -------
+        :obj:`list` of :obj:`str`
+            The files that are missing or do not match the manifest, relative to
+            :obj:`data_path`. It is empty when everything is fine.
 
-    def write_xdmf(self, xdmf_name: str = "snapshots.xdmf") -> None:
+        Examples
+        --------
+
+        >>> prm.dataset.manifest = True
+        >>> prm.dataset.write(ds)
+        >>> prm.dataset.verify()
+        []
+        """
+        invalid = []
+        for name, entry in self._load_manifest().items():
+            filename = os.path.join(self.data_path, name)
+            if full:
+                valid = (
+                    os.path.isfile(filename) and _hash_file(filename) == entry["hash"]
+                )
+            else:
+                valid = _is_unchanged(filename, entry)
+            if not valid:
+                invalid.append(name)
+        return invalid
+
+    def write_xdmf(
+        self,
+        xdmf_name: str = "snapshots.xdmf",
+        append: bool = False,
+        split: bool = False,
+    ) -> None:
         """Write the xdmf file, so the results from the simulation and its postprocessing
         can be opened in an external visualization tool, like Paraview.
 
@@ -1073,11 +2118,23 @@ class Dataset(traitlets.HasTraits):
         ----------
         xdmf_name : str, optional
             Filename for the xdmf file, by default "snapshots.xdmf"
+        append : bool, optional
+            If :obj:`True` and ``xdmf_name`` already exists, just the snapshots after the
+            last one in the file are added to it, so it can be updated while the solver
+            progresses, by default :obj:`False`. It has no effect for the layout
+            ``"hdf5-run"``, where the references include the number of snapshots, so
+            the file is written again.
+        split : bool, optional
+            If :obj:`True`, each snapshot is written to its own xdmf file
+            (e.g., ``snapshots-000.xdmf``, ``snapshots-001.xdmf``, ...), and ``xdmf_name``
+            is a light index that references them with ``xi:include``,
+            by default :obj:`False`.
 
         Raises
         ------
         IOError
-            Raises IO error if it does not find any file for this simulation.
+            Raises IO error if it does not find any file for this simulation, or
+            if the xdmf file to be appended was not written by this method.
 
         Examples
         --------
@@ -1099,26 +2156,21 @@ class Dataset(traitlets.HasTraits):
         can be visualized on any external tool:
 
         >>> prm.dataset.write_xdmf()
+
+        Or update it with the new snapshots while the simulation is running:
+
+        >>> prm.dataset.write_xdmf(append=True)
         """
         if self.set_of_variables:
             time_numbers = range(len(self))
             var_names = sorted(list(self.set_of_variables))
         else:
-            filename_pattern = self.filename_properties.get_filename_for_binary(
-                prefix="*", counter="*", data_path=self.data_path
-            )
-            filename_list = glob.glob(filename_pattern)
+            info = self._get_info()
 
-            if not filename_list:
-                raise IOError(f"No file was found corresponding to {filename_pattern}.")
+            if not info:
+                raise IOError(f"No file was found at {self.data_path}.")
 
-            properties = zip(
-                *map(
-                    self.filename_properties.get_info_from_filename,
-                    filename_list,
-                )
-            )
-            time_numbers, var_names = properties
+            time_numbers, var_names = zip(*info)
             time_numbers = sorted(list(set(time_numbers)))
             var_names = sorted(list(set(var_names)))
 
@@ -1141,206 +2193,916 @@ class Dataset(traitlets.HasTraits):
 
         prec = 8 if param["mytype"] == np.float64 else 4
 
-        def get_filename(var_name, num):
-            return self.filename_properties.get_filename_for_binary(
-                var_name, num, self.data_path
-            )
-
-        with open(xdmf_name, "w") as f:
-            f.write('<?xml version="1.0" ?>\n')
-            f.write(' <!DOCTYPE Xdmf SYSTEM "Xdmf.dtd" []>\n')
-            f.write(
-                ' <Xdmf xmlns:xi="http://www.w3.org/2001/XInclude" Version="2.0">\n'
+        if self._mesh.y.istret == 0:
+            geometry = _XDMF_CORECTMESH.format(nx=nx, ny=ny, nz=nz, dx=dx, dy=dy, dz=dz)
+        else:
+            geometry = _XDMF_RECTMESH.format(
+                nx=nx,
+                ny=ny,
+                nz=nz,
+                prec=prec,
+                x=" ".join(map(str, self._mesh.x.vector)) if nx > 1 else 0.0,
+                y=" ".join(map(str, self._mesh.y.vector)) if ny > 1 else 0.0,
+                z=" ".join(map(str, self._mesh.z.vector)) if nz > 1 else 0.0,
             )
-            f.write(" <Domain>\n")
-            if self._mesh.y.istret == 0:
-                f.write('     <Topology name="topo" TopologyType="3DCoRectMesh"\n')
-                f.write(f'         Dimensions="{nz} {ny} {nx}">\n')
-                f.write("     </Topology>\n")
-                f.write('     <Geometry name="geo" Type="ORIGIN_DXDYDZ">\n')
-                f.write("         <!-- Origin -->\n")
-                f.write('         <DataItem Format="XML" Dimensions="3">\n')
-                f.write("         0.0 0.0 0.0\n")
-                f.write("         </DataItem>\n")
-                f.write("         <!-- DxDyDz -->\n")
-                f.write('         <DataItem Format="XML" Dimensions="3">\n')
-                f.write(f"           {dz}  {dy}  {dx}\n")
-                f.write("         </DataItem>\n")
-                f.write("     </Geometry>\n")
-            else:
-                f.write('     <Topology name="topo" TopologyType="3DRectMesh"\n')
-                f.write(f'         Dimensions="{nz} {ny} {nx}">\n')
-                f.write("     </Topology>\n")
-                f.write('     <Geometry name="geo" Type="VXVYVZ">\n')
-                f.write(
-                    f'         <DataItem Dimensions="{nx}" NumberType="Float" Precision="{prec}" Format="XML">\n'
-                )
-                f.write(
-                    f'         {" ".join(map(str, self._mesh.x.vector)) if nx > 1 else 0.0}\n'
-                )
-                f.write("          </DataItem>\n")
-                f.write(
-                    f'         <DataItem Dimensions="{ny}" NumberType="Float" Precision="{prec}" Format="XML">\n'
-                )
-                f.write(
-                    f'         {" ".join(map(str, self._mesh.y.vector)) if ny > 1 else 0.0}'
-                )
-                f.write("          </DataItem>\n")
-                f.write(
-                    f'         <DataItem Dimensions="{nz}" NumberType="Float" Precision="{prec}" Format="XML">\n'
-                )
-                f.write(
-                    f'         {" ".join(map(str, self._mesh.z.vector)) if nz > 1 else 0.0}'
+        header = _XDMF_HEADER + geometry
+        time_series = _XDMF_TIME_SERIES.format(dt=dt)
+
+        # The filenames are part of the template, just the counter changes
+        properties = self.filename_properties
+        if self.layout == "binary":
+            template = _XDMF_ATTRIBUTE
+            filenames = {
+                prefix: _escape_braces(
+                    os.path.join(self.data_path, f"{prefix}{properties.separator}")
                 )
-                f.write("         </DataItem>\n")
-                f.write("     </Geometry>\n")
-            f.write("\n")
-            f.write(
-                '     <Grid Name="TimeSeries" GridType="Collection" CollectionType="Temporal">\n'
+                + "{counter}"
+                + _escape_braces(properties.file_extension)
+                for prefix in var_names
+            }
+        elif self.layout == "hdf5":
+            template = _XDMF_ATTRIBUTE_HDF5
+            filename = os.path.join(self.data_path, f"snapshot{properties.separator}")
+            filenames = {
+                prefix: _escape_braces(filename) + "{counter}.h5"
+                for prefix in var_names
+            }
+        else:
+            # References to hyperslabs at the same file, so all of them are updated
+            # when the number of snapshots changes
+            template, append = _XDMF_ATTRIBUTE_HYPERSLAB, False
+            filename = self._get_hdf5_filename(0)
+            filenames = {prefix: _escape_braces(filename) for prefix in var_names}
+            with _import_h5py().File(filename, "r") as h5file:
+                nt = max(h5file[prefix].shape[0] for prefix in var_names)
+        attributes = "".join(
+            template.format(
+                name=_escape_braces(prefix),
+                prec=prec,
+                nx=nx,
+                ny=ny,
+                nz=nz,
+                nt=nt if self.layout == "hdf5-run" else None,
+                filename=filenames[prefix],
             )
-            f.write('         <Time TimeType="HyperSlab">\n')
-            f.write(
-                '             <DataItem Format="XML" NumberType="Float" Dimensions="3">\n'
+            for prefix in var_names
+        )
+        grid = _XDMF_GRID.format(suffix="{suffix}", attributes=attributes)
+
+        def render(suffix):
+            return grid.format(
+                suffix=suffix, counter=str(suffix).zfill(properties.number_of_digits)
             )
-            f.write("             <!--Start, Stride, Count-->\n")
-            f.write(f"             0.0 {dt}\n")
-            f.write("             </DataItem>\n")
-            f.write("         </Time>\n")
+
+        root, extension = os.path.splitext(xdmf_name)
+
+        def get_split_name(suffix):
+            return f"{root}-{str(suffix).zfill(properties.number_of_digits)}{extension}"
+
+        if append and os.path.isfile(xdmf_name):
+            last = _truncate_xdmf(xdmf_name)
+            time_numbers = [suffix for suffix in time_numbers if int(suffix) > last]
+            mode = "a"
+        else:
+            mode = "w"
+
+        with open(xdmf_name, mode) as f:
+            if mode == "w":
+                f.write(header + time_series)
             for suffix in tqdm(time_numbers, desc=xdmf_name):
-                f.write("\n")
-                f.write("\n")
-                f.write(f'         <Grid Name="{suffix}" GridType="Uniform">\n')
-                f.write(
-                    '             <Topology Reference="/Xdmf/Domain/Topology[1]"/>\n'
-                )
-                f.write(
-                    '             <Geometry Reference="/Xdmf/Domain/Geometry[1]"/>\n'
-                )
-                for prefix in var_names:
-                    f.write(f'             <Attribute Name="{prefix}" Center="Node">\n')
-                    f.write('                <DataItem Format="Binary"\n')
+                if split:
+                    with open(get_split_name(suffix), "w") as f_split:
+                        f_split.write(header + render(suffix) + _XDMF_SPLIT_FOOTER)
                     f.write(
-                        f'                 DataType="Float" Precision="{prec}" Endian="little" Seek="0" \n'
+                        _XDMF_INCLUDE.format(
+                            href=os.path.basename(get_split_name(suffix)),
+                            suffix=suffix,
+                        )
                     )
-                    f.write(f'                 Dimensions="{nz} {ny} {nx}">\n')
-                    f.write(f"                   {get_filename(prefix, suffix)}\n")
-                    f.write("                </DataItem>\n")
-                    f.write("             </Attribute>\n")
-                f.write("         </Grid>\n")
-            f.write("\n")
-            f.write("     </Grid>\n")
-            f.write(" </Domain>\n")
-            f.write("</Xdmf>")
-
+                else:
+                    f.write(render(suffix))
+            f.write(_XDMF_FOOTER)
+
+
+# Templates for Dataset.write_xdmf, in the format expected by str.format
+_XDMF_HEADER = (
+    '<?xml version="1.0" ?>\n'
+    ' <!DOCTYPE Xdmf SYSTEM "Xdmf.dtd" []>\n'
+    ' <Xdmf xmlns:xi="http://www.w3.org/2001/XInclude" Version="2.0">\n'
+    " <Domain>\n"
+)
+_XDMF_CORECTMESH = (
+    '     <Topology name="topo" TopologyType="3DCoRectMesh"\n'
+    '         Dimensions="{nz} {ny} {nx}">\n'
+    "     </Topology>\n"
+    '     <Geometry name="geo" Type="ORIGIN_DXDYDZ">\n'
+    "         <!-- Origin -->\n"
+    '         <DataItem Format="XML" Dimensions="3">\n'
+    "         0.0 0.0 0.0\n"
+    "         </DataItem>\n"
+    "         <!-- DxDyDz -->\n"
+    '         <DataItem Format="XML" Dimensions="3">\n'
+    "           {dz}  {dy}  {dx}\n"
+    "         </DataItem>\n"
+    "     </Geometry>\n"
+)
+_XDMF_RECTMESH = (
+    '     <Topology name="topo" TopologyType="3DRectMesh"\n'
+    '         Dimensions="{nz} {ny} {nx}">\n'
+    "     </Topology>\n"
+    '     <Geometry name="geo" Type="VXVYVZ">\n'
+    '         <DataItem Dimensions="{nx}" NumberType="Float" Precision="{prec}" Format="XML">\n'
+    "         {x}\n"
+    "          </DataItem>\n"
+    '         <DataItem Dimensions="{ny}" NumberType="Float" Precision="{prec}" Format="XML">\n'
+    "         {y}"
+    "          </DataItem>\n"
+    '         <DataItem Dimensions="{nz}" NumberType="Float" Precision="{prec}" Format="XML">\n'
+    "         {z}"
+    "         </DataItem>\n"
+    "     </Geometry>\n"
+)
+_XDMF_TIME_SERIES = (
+    "\n"
+    '     <Grid Name="TimeSeries" GridType="Collection" CollectionType="Temporal">\n'
+    '         <Time TimeType="HyperSlab">\n'
+    '             <DataItem Format="XML" NumberType="Float" Dimensions="3">\n'
+    "             <!--Start, Stride, Count-->\n"
+    "             0.0 {dt}\n"
+    "             </DataItem>\n"
+    "         </Time>\n"
+)
+_XDMF_GRID = (
+    "\n"
+    "\n"
+    '         <Grid Name="{suffix}" GridType="Uniform">\n'
+    '             <Topology Reference="/Xdmf/Domain/Topology[1]"/>\n'
+    '             <Geometry Reference="/Xdmf/Domain/Geometry[1]"/>\n'
+    "{attributes}"
+    "         </Grid>\n"
+)
+_XDMF_ATTRIBUTE = (
+    '             <Attribute Name="{name}" Center="Node">\n'
+    '                <DataItem Format="Binary"\n'
+    '                 DataType="Float" Precision="{prec}" Endian="little" Seek="0" \n'
+    '                 Dimensions="{nz} {ny} {nx}">\n'
+    "                   {filename}\n"
+    "                </DataItem>\n"
+    "             </Attribute>\n"
+)
+_XDMF_ATTRIBUTE_HDF5 = (
+    '             <Attribute Name="{name}" Center="Node">\n'
+    '                <DataItem Format="HDF"\n'
+    '                 DataType="Float" Precision="{prec}" \n'
+    '                 Dimensions="{nz} {ny} {nx}">\n'
+    "                   {filename}:/{name}\n"
+    "                </DataItem>\n"
+    "             </Attribute>\n"
+)
+_XDMF_ATTRIBUTE_HYPERSLAB = (
+    '             <Attribute Name="{name}" Center="Node">\n'
+    '                <DataItem ItemType="HyperSlab" Dimensions="{nz} {ny} {nx}">\n'
+    '                 <DataItem Dimensions="3 4" Format="XML">\n'
+    "                   {{suffix}} 0 0 0  1 1 1 1  1 {nz} {ny} {nx}\n"
+    "                 </DataItem>\n"
+    '                 <DataItem Format="HDF" DataType="Float" Precision="{prec}"\n'
+    '                  Dimensions="{nt} {nz} {ny} {nx}">\n'
+    "                   {filename}:/{name}\n"
+    "                 </DataItem>\n"
+    "                </DataItem>\n"
+    "             </Attribute>\n"
+)
+_XDMF_INCLUDE = (
+    "         <xi:include"
+    ' href="{href}" xpointer="xpointer(//Xdmf/Domain/Grid[@Name=\'{suffix}\'])"/>\n'
+)
+_XDMF_FOOTER = "\n     </Grid>\n </Domain>\n</Xdmf>"
+_XDMF_SPLIT_FOOTER = "\n </Domain>\n</Xdmf>"
+# The name of each snapshot, at the grids or at the references to them
+_XDMF_SNAPSHOT = re.compile(rb"""Name=["'](\d+)["']""")
+
+
+def _probe_stencil(coords: list, points: list, method: str) -> tuple:
+    """Indexes with shape ``(dim, probe, corner)`` and weights with shape
+    ``(probe, corner)`` to interpolate the arrays at the probes."""
+    indexes, weights = [], []
+    for coord, point in zip(coords, points):
+        if np.any(point < coord[0]) or np.any(point > coord[-1]):
+            raise ValueError(
+                f"Probes out of the domain, between {coord[0]} and {coord[-1]}."
+            )
+        if coord.size == 1:
+            index = np.zeros((point.size, 1), dtype=np.intp)
+            weight = np.ones((point.size, 1))
+        else:
+            # It works for stretched coordinates as well
+            left = np.clip(np.searchsorted(coord, point) - 1, 0, coord.size - 2)
+            fraction = (point - coord[left]) / (coord[left + 1] - coord[left])
+            if method == "nearest":
+                index = (left + (fraction > 0.5))[:, None]
+                weight = np.ones((point.size, 1))
+            else:
+                index = np.stack([left, left + 1], axis=-1)
+                weight = np.stack([1.0 - fraction, fraction], axis=-1)
+        indexes.append(index)
+        weights.append(weight)
+
+    # Tensor product over the dimensions, so each probe has 2**dim corners
+    nprobe = len(points[0])
+    grids = np.meshgrid(
+        *[np.arange(index.shape[1]) for index in indexes], indexing="ij"
+    )
+    corners = [grid.ravel() for grid in grids]
+    stencil = np.stack([index[:, corner] for index, corner in zip(indexes, corners)])
+    weight = np.ones((nprobe, corners[0].size))
+    for w, corner in zip(weights, corners):
+        weight = weight * w[:, corner]
+    return stencil, weight
 
-def prm_to_dict(filename="incompact3d.prm"):
 
-    f = open(filename)
+def _plane_offsets(shape: tuple, key: tuple) -> np.ndarray:
+    """The offsets of the values selected by ``key`` in a raw binary with
+    ``shape``, in Fortran order, so they are sorted."""
+    indexes = np.ix_(*[np.atleast_1d(np.arange(n)[k]) for n, k in zip(shape, key)])
+    return np.ravel_multi_index(indexes, shape, order="F").ravel(order="F")
 
-    dict_outer = {}
 
-    for line in f:
-        # Remove spaces
-        line = " ".join(line.split())
+def _read_values(filename: str, offsets: np.ndarray, dtype) -> np.ndarray:
+    """Reads the values at the sorted element ``offsets`` from a raw binary file.
 
-        if line == "":  # Cycle if line is empty
-            continue
-        if line[0] == "#":  # Cycle if starts with a comment
+    Close offsets are merged into a single read, so there are just a few
+    system calls for each file.
+    """
+    if _is_compressed(filename):
+        with _CompressedFile(filename) as file:
+            return file.take(offsets).astype(dtype, copy=False)
+    itemsize = np.dtype(dtype).itemsize
+    values = np.empty(offsets.size, dtype=dtype)
+    # Start a new read when the gap to the previous offset is too large
+    gaps = np.diff(offsets) * itemsize > _READ_GAP
+    starts = np.concatenate(([0], np.flatnonzero(gaps) + 1))
+    stops = np.concatenate((starts[1:], [offsets.size]))
+    fd = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        for start, stop in zip(starts, stops):
+            first, last = int(offsets[start]), int(offsets[stop - 1])
+            size = (last - first + 1) * itemsize
+            buffer = _pread(fd, size, first * itemsize)
+            if len(buffer) != size:
+                raise IOError(f"Unexpected end of file at {filename}.")
+            run = np.frombuffer(buffer, dtype=dtype)
+            values[start:stop] = run[offsets[start:stop] - first]
+    finally:
+        os.close(fd)
+    return values
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    # Each thread opens its own file descriptor, so there is no race here
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _load_json(filename: str):
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _block_reduce(array: np.ndarray, factor: int, method: str) -> np.ndarray:
+    """Coarsens the array by ``factor`` in every direction, the last block is
+    smaller if the size is not a multiple of it."""
+    if method == "stride":
+        return array[(slice(None, None, factor),) * array.ndim]
+    return _block_sum(array, factor) / _block_count(array.shape, factor)
+
+
+def _block_sum(array: np.ndarray, factor: int) -> np.ndarray:
+    for axis, size in enumerate(array.shape):
+        array = np.add.reduceat(array, np.arange(0, size, factor), axis=axis)
+    return array
+
+
+def _block_count(shape: tuple, factor: int) -> np.ndarray:
+    """Number of points in each block, as an array that broadcasts with the sums."""
+    counts = [np.diff(np.append(np.arange(0, size, factor), size)) for size in shape]
+    return functools.reduce(np.multiply.outer, counts)
+
+
+def _pyramid(array: np.ndarray, levels: int, method: str):
+    """Yields the array coarsened by 2, 4, 8 and so on. For the mean, each level
+    is summed from the previous one, that is exact for the smaller last blocks."""
+    sums = array
+    for level in range(1, levels + 1):
+        if method == "stride":
+            yield _block_reduce(array, 2 ** level, method)
             continue
+        sums = _block_sum(sums, 2)
+        yield sums / _block_count(array.shape, 2 ** level)
+
+
+def _read_perf(filename: str) -> tuple:
+    """Parses a file produced by wind turbine simulations, with the names of the
+    columns, their units and just one row of values."""
+    with open(filename, "r") as file:
+        header, units, row = file.read().splitlines()[:3]
+    names = [name.strip() for name in header.split(",")]
+    units = [unit.strip()[1:-1] for unit in units.split(",")]
+    values = [float(value) for value in row.split(",")]
+    if not len(names) == len(units) == len(values):
+        raise ValueError(f"Inconsistent number of columns at {filename}.")
+    return names, units, values
+
+
+def _perf_to_dataset(names, units, t, values) -> xr.Dataset:
+    ds = xr.Dataset(coords=dict(t=t))
+    ds.t.attrs = dict(name="t", long_name="Time", units="s")
+    for n, (name, unit) in enumerate(zip(names, units)):
+        ds[str(name)] = xr.DataArray(
+            data=values[:, n], coords=ds.t.coords, attrs=dict(units=str(unit))
+        )
+    return ds
+
+
+def _import_h5py():
+    try:
+        import h5py
+    except ImportError as error:
+        raise ImportError(
+            "The HDF5 layouts need h5py, try with: pip install h5py"
+        ) from error
+    return h5py
+
+
+def _escape_braces(string: str) -> str:
+    return string.replace("{", "{{").replace("}", "}}")
+
+
+def _truncate_xdmf(filename: str) -> int:
+    """Removes the footer from a file written by :obj:`Dataset.write_xdmf`, so new
+    snapshots can be appended to it, and returns the last snapshot in the file."""
+    footer = _XDMF_FOOTER.replace("\n", os.linesep).encode()
+    with open(filename, "r+b") as file:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(max(0, size - len(footer)))
+        if file.read() != footer:
+            raise IOError(f"{filename} was not written by Dataset.write_xdmf")
+        file.truncate(size - len(footer))
+
+        # Just the end of the file is read, looking for the last snapshot
+        tail = 2 ** 16
+        while True:
+            file.seek(max(0, size - tail))
+            found = _XDMF_SNAPSHOT.findall(file.read(tail))
+            if found or tail >= size:
+                break
+            tail *= 2
+    return max(map(int, found), default=-1)
+
+
+# Maximum size of each slab written from NumPy arrays, in bytes
+_SLAB_SIZE = 2 ** 24
+# Maximum size of each chunk of the compressed files, before the compression, in bytes
+_CHUNK_SIZE = 2 ** 22
+# Identifies the files written with Dataset.compression
+_MAGIC = b"X3DZ\x01"
+
+# Maximum gap between the values merged into a single read, in bytes
+_READ_GAP = 2 ** 12
+
+# Sidecar folder at Dataset.data_path for the levels of Dataset.build_pyramid
+_PYRAMID = "pyramid"
+
+# Records the files written by Dataset.write, when Dataset.manifest is True
+_MANIFEST = ".manifest.json"
+
+
+class _RawBinaryFile:
+    """Target for :obj:`dask.array.store`, it writes each block straight to its
+    offset at a raw binary file, in C order, so the last axis is the fastest.
+
+    The dtype is converted block by block (just when needed), and each block
+    is written with as few calls as possible, since the trailing axes where it
+    spans the whole array are contiguous on the disc. Different blocks can be
+    written concurrently, because the writes are positional.
+    """
+
+    def __init__(self, fd: int, shape: tuple, dtype):
+        self.fd = fd
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        # Positional writes are not available on Windows
+        self.lock = False if hasattr(os, "pwrite") else threading.Lock()
+
+    def __setitem__(self, key, value) -> None:
+        key = key if isinstance(key, tuple) else (key,)
+        key += (slice(None),) * (len(self.shape) - len(key))
+        start = [k.indices(n)[0] for k, n in zip(key, self.shape)]
+        value = np.ascontiguousarray(value, dtype=self.dtype)
+        if not value.size:
+            return
+
+        # The last axis where the block does not span the whole array
+        axis = max(
+            (i for i, n in enumerate(value.shape) if n != self.shape[i]), default=0
+        )
+        for index in np.ndindex(value.shape[:axis]):
+            first = [s + i for s, i in zip(start, index)] + start[axis:]
+            offset = np.ravel_multi_index(first, self.shape) * self.dtype.itemsize
+            self._pwrite(value[index], offset)
+
+    def _pwrite(self, buffer, offset: int) -> None:
+        view = memoryview(buffer).cast("B")
+        while view:
+            if self.lock:
+                with self.lock:
+                    os.lseek(self.fd, offset, os.SEEK_SET)
+                    written = os.write(self.fd, view)
+            else:
+                written = os.pwrite(self.fd, view, offset)
+            view, offset = view[written:], offset + written
+
+
+def _map_file(filename: str, dtype, shape: tuple, order: str = "C"):
+    """Maps a raw binary file in memory, or decompresses it at once if it was
+    written with :obj:`Dataset.compression`."""
+    if _is_compressed(filename):
+        values = _read_compressed(filename).astype(dtype, copy=False)
+        return values.reshape(shape, order=order)
+    return np.memmap(filename, dtype=dtype, mode="r", shape=shape, order=order)
+
+
+def _import_blosc():
+    try:
+        import blosc
+    except ImportError as error:
+        raise ImportError(
+            "The compression with blosc needs it, try with: pip install blosc"
+        ) from error
+    # The chunks are decompressed by a pool of threads
+    blosc.set_releasegil(True)
+    return blosc
+
+
+def _get_codec(name: str) -> tuple:
+    """The functions to encode an array into bytes with the codec ``name``,
+    and to decode them into a preallocated array.
+
+    The bytes are shuffled before zlib and lzma, so the most significant ones
+    are together, while blosc shuffles the bits itself, with SIMD instructions.
+    The fast presets are used, since most of the gain comes from the shuffle
+    and the bit-rounding.
+    """
+    if name in ("zlib", "lzma"):
+        compress, decompress = {
+            "zlib": (functools.partial(zlib.compress, level=1), zlib.decompress),
+            "lzma": (functools.partial(lzma.compress, preset=1), lzma.decompress),
+        }[name]
+
+        def encode(values):
+            itemsize = values.dtype.itemsize
+            return compress(values.view(np.uint8).reshape(-1, itemsize).T.tobytes())
+
+        def decode(buffer, values):
+            shuffled = np.frombuffer(decompress(buffer), dtype=np.uint8)
+            itemsize = values.dtype.itemsize
+            values.view(np.uint8).reshape(-1, itemsize)[...] = shuffled.reshape(
+                itemsize, -1
+            ).T
+
+        return encode, decode
+    if name == "blosc":
+        blosc = _import_blosc()
+
+        def encode(values):
+            return blosc.compress_ptr(
+                values.__array_interface__["data"][0],
+                values.size,
+                typesize=values.dtype.itemsize,
+                clevel=5,
+                shuffle=blosc.BITSHUFFLE,
+                cname="zstd",
+            )
+
+        def decode(buffer, values):
+            # Straight into the array, without any copy
+            blosc.decompress_ptr(buffer, values.__array_interface__["data"][0])
+
+        return encode, decode
+    raise ValueError(f"Unknown codec {name!r}.")
 
-        line = line.split("#")
-        # Get variable's name and value
-        param = line[1].strip()
-        value = line[0].strip()
 
+def _bitround(values: np.ndarray, keepbits: int) -> np.ndarray:
+    """Rounds the mantissa of the floats to the nearest with ``keepbits`` bits,
+    in place, so the trailing bits are zeros and they compress very well."""
+    maskbits = np.finfo(values.dtype).nmant - keepbits
+    if maskbits <= 0:
+        return values
+    nan = np.isnan(values)
+    uint = np.dtype(f"u{values.dtype.itemsize}").type
+    bits = values.view(uint)
+    bits += ((bits >> uint(maskbits)) & uint(1)) + uint((1 << (maskbits - 1)) - 1)
+    bits &= ~uint((1 << maskbits) - 1)
+    # The rounding would turn some NaNs into infinity
+    values[nan] = np.nan
+    return values
+
+
+def _encode(data, dtype, codec: str, keepbits: int = None, scheduler=None) -> list:
+    """The header and the compressed chunks of a file for :obj:`Dataset.compression`.
+
+    The data is processed slab by slab, in C order, and each chunk has up to
+    :obj:`_CHUNK_SIZE` bytes before the compression.
+    """
+    if data.ndim == 0:
+        data = data.reshape(1)
+    dtype = np.dtype(dtype)
+    if keepbits is not None and dtype.kind != "f":
+        raise ValueError("The bit-rounding is just for floating point numbers.")
+    encode, _ = _get_codec(codec)
+    step = max(1, _CHUNK_SIZE // dtype.itemsize)
+
+    chunks, sizes = [], []
+    for start, stop in _slabs(data, dtype):
+        slab = data[start:stop]
+        if not isinstance(slab, np.ndarray):
+            slab = slab.compute(scheduler=scheduler)
+        # Always a copy, so the bit-rounding is not applied to the input
+        slab = np.array(slab, dtype=dtype, order="C").reshape(-1)
+        if keepbits is not None:
+            _bitround(slab, keepbits)
+        for first in range(0, slab.size, step):
+            values = slab[first : first + step]
+            chunks.append(encode(values))
+            sizes.append([values.size, len(chunks[-1])])
+
+    header = json.dumps(
+        dict(
+            shape=list(data.shape),
+            dtype=dtype.str,
+            codec=codec,
+            keepbits=keepbits,
+            shuffle="bit" if codec == "blosc" else "byte",
+            chunks=sizes,
+        )
+    ).encode()
+    return [_MAGIC, len(header).to_bytes(4, "little"), header] + chunks
+
+
+def _write_parts(filename: str, parts: list) -> int:
+    with open(filename, "wb") as file:
+        for part in parts:
+            file.write(part)
+    return sum(len(part) for part in parts)
+
+
+def _hash_parts(parts: list) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part)
+    return hasher.hexdigest()
+
+
+def _is_compressed(filename: str) -> bool:
+    with open(filename, "rb") as file:
+        return file.read(len(_MAGIC)) == _MAGIC
+
+
+class _CompressedFile:
+    """Reads a file written with :obj:`Dataset.compression`, just the chunks that
+    contain the requested values are decompressed, in parallel by a pool
+    of threads."""
+
+    def __init__(self, filename: str, max_workers: int = None):
+        self.max_workers = max_workers
+        self.fd = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
         try:
-            # Converting from string according to datatype
-            if value[0] == "'" and value[-1] == "'":  # String
-                value = value[1:-1]
-            elif value.lower() == ".false.":  # Bool
-                value = False
-            elif value.lower() == ".true.":  # Bool
-                value = True
-            elif "." in value:  # Float
-                value = float(value)
-            else:  # Int
-                value = int(value)
-        except:
-            warnings.warn(f"Can't convert {param} : {value}")
-            continue
+            start = len(_MAGIC) + 4
+            size = int.from_bytes(_pread(self.fd, 4, len(_MAGIC)), "little")
+            header = json.loads(_pread(self.fd, size, start))
+        except BaseException:
+            os.close(self.fd)
+            raise
+        self.dtype = np.dtype(header["dtype"])
+        self.shape = tuple(header["shape"])
+        _, self.decode = _get_codec(header["codec"])
+        self.lengths = [length for _, length in header["chunks"]]
+        # Limits of each chunk, in number of values and in bytes at the file
+        self.first = np.cumsum([0] + [count for count, _ in header["chunks"]])
+        self.offsets = np.cumsum([start + size] + self.lengths)
+        self.size = int(self.first[-1])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        os.close(self.fd)
+
+    def read(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """The values from ``start`` to ``stop``, in the flat array."""
+        stop = self.size if stop is None else stop
+        if stop <= start:
+            return np.empty(0, dtype=self.dtype)
+        chunks = np.arange(
+            np.searchsorted(self.first, start, side="right") - 1,
+            np.searchsorted(self.first, stop, side="left"),
+        )
+        values = self._decode(chunks)
+        first = self.first[chunks[0]]
+        return values[start - first : stop - first]
+
+    def take(self, offsets: np.ndarray) -> np.ndarray:
+        """The values at ``offsets``, in the flat array."""
+        offsets = np.asarray(offsets)
+        index = np.searchsorted(self.first, offsets, side="right") - 1
+        chunks, inverse = np.unique(index, return_inverse=True)
+        values = self._decode(chunks)
+        # Position of each chunk at the decompressed values
+        base = np.cumsum([0] + [self.first[n + 1] - self.first[n] for n in chunks])
+        return values[offsets - self.first[index] + base[inverse.reshape(index.shape)]]
+
+    def _decode(self, chunks: np.ndarray) -> np.ndarray:
+        """The values of the ``chunks``, one after the other."""
+        counts = [int(self.first[n + 1] - self.first[n]) for n in chunks]
+        bounds = np.cumsum([0] + counts)
+        values = np.empty(bounds[-1], dtype=self.dtype)
+
+        def decode(k):
+            n = chunks[k]
+            buffer = _pread(self.fd, self.lengths[n], int(self.offsets[n]))
+            self.decode(buffer, values[bounds[k] : bounds[k + 1]])
+
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                # Consumed just to raise any exception
+                for _ in executor.map(decode, range(len(chunks))):
+                    pass
+        else:
+            for k in range(len(chunks)):
+                decode(k)
+        return values
 
-        if "(" in param and ")" == param[-1]:  # Param is a list
-            param = param.split("(")[0]
-            if param not in dict_outer:
-                dict_outer[param] = []
-            dict_outer[param].append(value)
-        else:  # Not a list
-            dict_outer[param] = value
 
-    f.close()
+def _read_compressed(filename: str, max_workers: int = None) -> np.ndarray:
+    """Reads a file written with :obj:`Dataset.compression`, as a flat array.
+    The chunks are decompressed in parallel by a pool of threads."""
+    with _CompressedFile(filename, max_workers) as file:
+        return file.read()
 
-    return dict_outer
 
+def _write_raw(filename: str, data, dtype, scheduler=None) -> int:
+    """Write a NumPy or dask array to a raw binary file, in C order.
 
-def i3d_to_dict(filename="input.i3d", string=None):
+    Arrays backed by dask are computed and written chunk by chunk, while
+    NumPy arrays are written in slabs along the first axis, so there is no
+    copy of the whole array for the transposition or the dtype conversion.
 
-    if string is None:
-        with open(filename, "r") as f:
-            string = f.read()
+    It returns the number of bytes written.
+    """
+    if data.ndim == 0:
+        data = data.reshape(1)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(filename, flags, 0o666)
+    try:
+        target = _RawBinaryFile(fd, data.shape, dtype)
+        os.ftruncate(fd, data.size * target.dtype.itemsize)
+        if isinstance(data, np.ndarray):
+            for start, stop in _slabs(data, target.dtype):
+                target[start:stop] = data[start:stop]
+        else:
+            data.store(target, lock=target.lock, scheduler=scheduler)
+    finally:
+        os.close(fd)
+    return data.size * target.dtype.itemsize
+
+
+def _slabs(data, dtype) -> list:
+    """The limits for the slabs along the first axis, they follow the chunks
+    for dask, or have up to :obj:`_SLAB_SIZE` bytes for NumPy."""
+    if isinstance(data, np.ndarray):
+        row_size = data[:1].size * np.dtype(dtype).itemsize
+        step = max(1, _SLAB_SIZE // max(1, row_size))
+        bounds = list(range(0, data.shape[0], step)) + [data.shape[0]]
+    else:
+        bounds = np.cumsum((0,) + data.chunks[0]).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _hash_file(filename: str) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(_SLAB_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _is_unchanged(filename: str, entry: dict) -> bool:
+    """Cheap check, the size and modification time of the file are the ones
+    recorded at the manifest."""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return False
+    return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime")
+
+
+# A value in a Fortran namelist
+_SCALAR = r"""
+    (?P<integer>[+-]?\d+)
+    | (?P<real>[+-]?(?:\d+\.?\d*|\.\d+)(?:[ed][+-]?\d+)?)    # Exponent e or d
+    | '(?P<single>[^']*)' | "(?P<double>[^"]*)"
+    | (?P<true>\.?t(?:rue)?\.?)
+    | (?P<false>\.?f(?:alse)?\.?)
+"""
+
+# The parameters file :obj:`.i3d` is a Fortran namelist, it is matched line by line
+# in a single pass by this regular expression, compiled just once
+_NAMELIST = re.compile(
+    rf"""
+    ^[ \t]*(?:
+        (?P<end>/(?:end)?|&end)(?!\w)                    # End of the group
+        | &(?P<group>\w+)                                # Beginning of a new group
+        | (?P<name>\w+)[ \t]*(?:\((?P<index>[^)]*)\))?[ \t]*=[ \t]*
+        (?:
+            (?:{_SCALAR})[ \t]*(?=!|$)                   # Just one value
+            | (?P<values>(?:'[^']*'|"[^"]*"|[^!\n'"])*)    # Many values
+        )
+    )?
+    .*                                                  # Comments
+    """,
+    re.IGNORECASE | re.MULTILINE | re.VERBOSE,
+)
+
+# The previous format :obj:`.prm` has one value per line, followed by its name
+_PRM = re.compile(
+    r"^[ \t]*(?P<values>[^#\s][^#\n]*?)[ \t]*#[ \t]*(?P<name>\w+)(?:\((?P<index>[^)]*)\))?",
+    re.MULTILINE,
+)
+
+# Values separated by commas or spaces, with an optional repeat count, like 3*0.0
+_VALUES = re.compile(
+    rf"""
+    (?:(?P<repeat>\d+)\*)?(?:{_SCALAR})(?=[,\s]|$)
+    | (?P<invalid>[^,\s]+)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def _convert(kind: str, token: str):
+    if kind == "integer":
+        return int(token)
+    if kind == "real":
+        return float(token.replace("d", "e").replace("D", "e"))
+    if kind in ("true", "false"):
+        return kind == "true"
+    if kind == "invalid":
+        raise ValueError(token)
+    return token
+
+
+def _set_values(dictionary: dict, match: re.Match, kind: str) -> None:
+    name = match["name"]
+    try:
+        if kind == "values":
+            values = [
+                _convert(value.lastgroup, value[value.lastgroup])
+                for value in _VALUES.finditer(match[kind])
+                for _ in range(int(value["repeat"] or 1))
+            ]
+        else:
+            values = [_convert(kind, match[kind])]
+    except ValueError:
+        warnings.warn(f"Can't convert {name} : {match[kind].strip()}")
+        return
+
+    if match["index"] is not None:  # Param is a list
+        dictionary.setdefault(name, []).extend(values)
+    elif len(values) > 1:  # Many values at once
+        dictionary[name] = values
+    elif values:
+        dictionary[name] = values[0]
+
+
+def _copy(dictionary: dict) -> dict:
+    return {
+        key: _copy(value)
+        if isinstance(value, dict)
+        else (value.copy() if isinstance(value, list) else value)
+        for key, value in dictionary.items()
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_file(parser, filename: str, mtime: int, size: int) -> dict:
+    # mtime and size are not used here, but they are part of the key of the cache
+    with open(filename, "r") as file:
+        return parser(file.read())
+
+
+def _cached_parse(parser, filename: str) -> dict:
+    stat = os.stat(filename)
+    dictionary = _parse_file(
+        parser, os.path.realpath(filename), stat.st_mtime_ns, stat.st_size
+    )
+    # A copy, so the cached entry is not changed by the caller
+    return _copy(dictionary)
 
-    return i3d_string_to_dict(string)
 
+def prm_to_dict(filename="incompact3d.prm"):
+    """Reads the parameters file in the previous format :obj:`.prm`.
 
-def i3d_string_to_dict(string):
+    The result is cached by the path, modification time and size of the file,
+    so reading again the same unchanged file is almost instantaneous.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Name of the file, by default "incompact3d.prm"
+
+    Returns
+    -------
+    :obj:`dict`
+        The value for each parameter.
+    """
+    return _cached_parse(prm_string_to_dict, filename)
+
+
+def prm_string_to_dict(string):
+    """Parses the content of a parameters file in the previous format :obj:`.prm`.
+
+    Parameters
+    ----------
+    string : str
+        The content of the file.
 
+    Returns
+    -------
+    :obj:`dict`
+        The value for each parameter.
+    """
     dict_outer = {}
+    for match in _PRM.finditer(string):
+        _set_values(dict_outer, match, "values")
+    return dict_outer
 
-    for line in io.StringIO(string):
-        # Remove comments
-        line = line.partition("!")[0].replace(" ", "")
-        # Remove spaces
-        line = " ".join(line.split())
 
-        if line == "":  # Cycle if line is empty
-            continue
+def i3d_to_dict(filename="input.i3d", string=None):
+    """Reads the parameters file :obj:`.i3d`.
 
-        # Beginning of a new group
-        if line[0] == "&":
-            key = line[1:]
-            dict_inner = {}
-            continue
+    The result is cached by the path, modification time and size of the file,
+    so reading again the same unchanged file is almost instantaneous.
 
-        # End of the group
-        if line.lower() == "/end":
-            dict_outer[key] = dict_inner
-            continue
+    Parameters
+    ----------
+    filename : str, optional
+        Name of the file, by default "input.i3d"
+    string : str, optional
+        The content of the file, it is parsed instead of ``filename`` if provided.
+
+    Returns
+    -------
+    :obj:`dict`
+        A dictionary for each namelist group, with the value for each parameter.
+    """
+    if string is not None:
+        return i3d_string_to_dict(string)
+    return _cached_parse(i3d_string_to_dict, filename)
 
-        # Get variable's name and value
-        param = line.partition("=")[0]
-        value = line.partition("=")[-1]
 
-        try:
-            # Converting from string according to datatype
-            if value[0] == "'" and value[-1] == "'":  # String
-                value = value[1:-1]
-            elif value.lower() == ".false.":  # Bool
-                value = False
-            elif value.lower() == ".true.":  # Bool
-                value = True
-            elif "." in value:  # Float
-                value = float(value)
-            else:  # Int
-                value = int(value)
-        except:
-            warnings.warn(f"Can't convert {param} : {value}")
-            continue
+def i3d_string_to_dict(string):
+    """Parses the content of a parameters file :obj:`.i3d`.
 
-        if "(" in param and ")" == param[-1]:  # Param is a list
-            param = param.split("(")[0]
-            if param not in dict_inner:
-                dict_inner[param] = []
-            dict_inner[param].append(value)
-        else:  # Not a list
-            dict_inner[param] = value
+    It is a Fortran namelist, so it supports arrays (``var(1) = 1`` or
+    ``var = 1, 2, 3``), repeat counts (``3*0.0``), booleans (``.true.``, ``T``, ``F``),
+    floats with the exponent ``d`` (``1.0d-3``) and inline comments.
+
+    Parameters
+    ----------
+    string : str
+        The content of the file.
+
+    Returns
+    -------
+    :obj:`dict`
+        A dictionary for each namelist group, with the value for each parameter.
+    """
+    dict_outer = {}
+    dict_inner = None
+
+    for match in _NAMELIST.finditer(string):
+        kind = match.lastgroup
+        if kind == "group":  # Beginning of a new group
+            dict_inner = dict_outer[match[kind]] = {}
+        elif kind == "end":  # End of the group
+            dict_inner = None
+        elif kind is not None and dict_inner is not None:
+            _set_values(dict_inner, match, kind)
 
     return dict_outer
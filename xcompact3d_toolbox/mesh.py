@@ -59,7 +59,10 @@ class Coordinate(traitlets.HasTraits):
     is_periodic = traitlets.Bool(default_value=False)
 
     _sub_grid_size = traitlets.Int(default_value=16)
-    _possible_grid_size = traitlets.List(trait=traitlets.Int())
+    # The elements are not validated, they come from the tables bellow
+    _possible_grid_size = traitlets.List()
+    _vector = traitlets.Instance(klass=np.ndarray, allow_none=True)
+    _index = traitlets.Any(default_value=None, allow_none=True)
 
     def __init__(self, **kwargs):
         """Initializes the Coordinate class.
@@ -88,6 +91,9 @@ class Coordinate(traitlets.HasTraits):
         """This method makes the coordinate automatically work as a numpy
         like array in any function from numpy.
 
+        The vector is computed just once and cached, until any of the parameters
+        or ``param["mytype"]`` changes, and a copy of it is returned.
+
         Returns
         -------
         :obj:`numpy.ndarray`
@@ -106,13 +112,7 @@ class Coordinate(traitlets.HasTraits):
         array([1.        , 0.99219767, 0.96891242, 0.93050762, 0.87758256,
                 0.81096312, 0.73168887, 0.64099686, 0.54030231])
         """
-        return np.linspace(
-            start=0.0,
-            stop=self.length,
-            num=self.grid_size,
-            endpoint=not self.is_periodic,
-            dtype=param["mytype"],
-        )
+        return self._get_vector().copy()
 
     def __len__(self):
         """Make the coordinate work with the Python function :obj:`len`.
@@ -163,6 +163,39 @@ class Coordinate(traitlets.HasTraits):
                 raise KeyError(f"{key} is not a valid parameter")
             setattr(self, key, arg)
 
+    def _compute_vector(self):
+        return np.linspace(
+            start=0.0,
+            stop=self.length,
+            num=self.grid_size,
+            endpoint=not self.is_periodic,
+            dtype=param["mytype"],
+        )
+
+    def _get_vector(self):
+        """The cached vector, as a read-only array shared by all callers."""
+        if self._vector is None or self._vector.dtype != param["mytype"]:
+            vector = self._compute_vector()
+            vector.setflags(write=False)
+            self._vector = vector
+            self._index = None
+        return self._vector
+
+    def _get_index(self, name):
+        """The vector wrapped into a :obj:`pandas.Index`, cached as well,
+        so it can be shared by all arrays with this coordinate."""
+        vector = self._get_vector()
+        if self._index is None or self._index.name != name:
+            import pandas as pd
+
+            self._index = pd.Index(vector, name=name)
+        return self._index
+
+    @traitlets.observe("grid_size", "length", "is_periodic", "_sub_grid_size")
+    def _observe_cache(self, change):
+        self._vector = None
+        self._index = None
+
     @traitlets.validate("grid_size")
     def _validate_grid_size(self, proposal):
         if not _validate_grid_size(proposal.get("value"), self.is_periodic):
@@ -360,8 +393,11 @@ class StretchedCoordinate(Coordinate):
         array([1.        , 0.99219767, 0.96891242, 0.93050762, 0.87758256,
                 0.81096312, 0.73168887, 0.64099686, 0.54030231])
         """
+        return super().__array__()
+
+    def _compute_vector(self):
         if self.istret == 0:
-            return super().__array__()
+            return super()._compute_vector()
         return _stretching(
             istret=self.istret,
             beta=self.beta,
@@ -371,6 +407,11 @@ class StretchedCoordinate(Coordinate):
             return_auxiliar_variables=False,
         )
 
+    @traitlets.observe("istret", "beta")
+    def _observe_stretching(self, change):
+        self._vector = None
+        self._index = None
+
     @traitlets.validate("istret")
     def _validate_istret(self, proposal):
         if proposal.get("value") == 3 and self.is_periodic:
@@ -556,6 +597,11 @@ class Mesh3D(traitlets.HasTraits):
             if dir not in args
         }
 
+    def _get_indexes(self, *args) -> dict:
+        """Same as :obj:`Mesh3D.drop`, but the coordinates are cached
+        :obj:`pandas.Index`, that are shared by all the arrays loaded from the disc."""
+        return {dir: getattr(self, dir)._get_index(dir) for dir in self.drop(*args)}
+
     def copy(self):
         """Return a copy of the Mesh3D object."""
         return Mesh3D(
@@ -599,12 +645,21 @@ def _validate_grid_size(grid_size, is_periodic):
 def _get_possible_grid_values(
     is_periodic: bool, start: int = 0, end: int = 9002
 ) -> list:
-    return list(
-        filter(
-            lambda num: _validate_grid_size(num, is_periodic),
-            range(start, end),
-        )
-    )
+    # Closed form for n = 2^(1+a) * 3^b * 5^c (+ 1 if not periodic), n >= 8 (or 9)
+    offset = 0 if is_periodic else 1
+    sizes = []
+    power_of_two = 2
+    while power_of_two + offset < end:
+        power_of_three = power_of_two
+        while power_of_three + offset < end:
+            size = power_of_three
+            while size + offset < end:
+                if size >= 8 and size + offset >= start:
+                    sizes.append(size + offset)
+                size *= 5
+            power_of_three *= 3
+        power_of_two *= 2
+    return sorted(sizes)
 
 
 _possible_size_periodic = _get_possible_grid_values(True)
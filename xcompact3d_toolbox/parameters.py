@@ -8,6 +8,8 @@ pre and post-processing.
     https://github.com/xcompact3d/Incompact3d
 """
 
+import contextlib
+import functools
 import os.path
 import warnings
 
@@ -19,6 +21,25 @@ from .mesh import Mesh3D
 from .param import boundary_condition, param
 
 
+def _deferred(handler):
+    """Defers the observer ``handler`` while inside :obj:`Parameters._batch`,
+    so it is called just once for each trait at the end, with the first old
+    and the last new values."""
+
+    @functools.wraps(handler)
+    def wrapper(self, change):
+        pending = getattr(self, "_pending", None)
+        if pending is None:
+            return handler(self, change)
+        key = (handler.__name__, change["name"])
+        if key in pending:
+            # Moved to the end, since the order of the last changes is kept
+            change = dict(change, old=pending.pop(key)[1]["old"])
+        pending[key] = (handler, change)
+
+    return wrapper
+
+
 class ParametersBasicParam(traitlets.HasTraits):
 
     p_row, p_col = [
@@ -326,6 +347,7 @@ class ParametersBasicParam(traitlets.HasTraits):
         return proposal.get("value")
 
     @traitlets.observe("numscalar")
+    @_deferred
     def _observe_numscalar(self, change):
         if change.get("new") == 0:
             self.iscalar = 0
@@ -397,6 +419,7 @@ class ParametersNumOptions(traitlets.HasTraits):
         super(ParametersNumOptions, self).__init__()
 
     @traitlets.observe("ilesmod")
+    @_deferred
     def _observe_ilesmod(self, change):
         if change["new"] == 0:
             # It is coded at xcompact3d, look at parameters.f90
@@ -853,6 +876,10 @@ class Parameters(
     .. note:: This is a work in progress, not all parameters are covered yet.
     """
 
+    # Nesting level of Parameters._batch and the observers deferred by it
+    _batch_depth = 0
+    _pending = None
+
     def __init__(self, raise_warning: bool = False, **kwargs):
         """Initializes the Parameters Class.
 
@@ -926,13 +953,14 @@ class Parameters(
 
         """
 
-        super(Parameters, self).__init__()
+        with self._batch():
+            super(Parameters, self).__init__()
 
-        if "loadfile" in kwargs.keys():
-            self.filename = kwargs.pop("loadfile")
-            self.load(raise_warning=raise_warning)
+            if "loadfile" in kwargs.keys():
+                self.filename = kwargs.pop("loadfile")
+                self.load(raise_warning=raise_warning)
 
-        self.set(raise_warning=raise_warning, **kwargs)
+            self.set(raise_warning=raise_warning, **kwargs)
 
         data_path = os.path.join(os.path.dirname(self.filename), "data")
         self.dataset.set(data_path=data_path)
@@ -1036,6 +1064,7 @@ class Parameters(
         "nclzS1",
         "nclzSn",
     )
+    @_deferred
     def _observe_bc(self, change):
         #
         dim = change["name"][3]  # It will be x, y or z
@@ -1051,6 +1080,7 @@ class Parameters(
             setattr(getattr(self.mesh, dim), "is_periodic", False)
 
     @traitlets.observe("p_row", "p_col", "ncores")
+    @_deferred
     def _observe_2Decomp(self, change):
         if change["name"] == "ncores":
             self.p_row, self.p_col = 0, 0
@@ -1077,6 +1107,10 @@ class Parameters(
         "ilast",
     )
     def _observe_size(self, change):
+        if self._pending is not None:
+            # It is computed just once at the end of the batch
+            return
+
         def convert_bytes(num):
             """
             this function will convert bytes to MB.... GB... etc
@@ -1138,6 +1172,43 @@ class Parameters(
 
         self.size = convert_bytes(count)
 
+    @contextlib.contextmanager
+    def _batch(self):
+        """Bundle many changes, so the observers, like the ones for the boundary
+        conditions, are called just once for each trait at the end, and
+        :obj:`size` is computed just once, instead of after every change."""
+        self._batch_depth += 1
+        if self._pending is None:
+            self._pending = {}
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                try:
+                    self._flush()
+                finally:
+                    self._pending = None
+                self._observe_size(None)
+
+    def _flush(self):
+        """Calls the observers deferred by :obj:`_batch`, in the order of the
+        last change of each trait. The values set after a change still win over
+        the side effects of its observers, just like without the batch."""
+        pending = [
+            (handler, change)
+            for handler, change in self._pending.values()
+            if change["old"] != change["new"]
+        ]
+        self._pending = None
+        try:
+            for n, (handler, change) in enumerate(pending):
+                handler(self, change)
+                for _, later in pending[n + 1 :]:
+                    setattr(self, later["name"], later["new"])
+        finally:
+            self._pending = {}
+
     def get_boundary_condition(self, variable_name: str) -> dict:
         """This method returns the appropriate boundary parameters that are
         expected by the derivatives methods.
@@ -1204,18 +1275,22 @@ class Parameters(
         ... )
 
         """
-        # They are high priority in order to avoid erros with validations and observations
-        for bc in "nclx1 nclxn ncly1 nclyn nclz1 nclzn numscalar ilesmod".split():
-            if bc in kwargs:
-                setattr(self, bc, kwargs.get(bc))
-
-        for key, arg in kwargs.items():
-            if key not in self.trait_names():
-                if raise_warning:
-                    warnings.warn(f"{key} is not a valid parameter and was not loaded")
-                else:
-                    raise KeyError(f"{key} is not a valid parameter")
-            setattr(self, key, arg)
+        with self._batch():
+            # They are high priority in order to avoid erros with validations and observations
+            for bc in "nclx1 nclxn ncly1 nclyn nclz1 nclzn numscalar ilesmod".split():
+                if bc in kwargs:
+                    setattr(self, bc, kwargs.get(bc))
+            self._flush()
+
+            for key, arg in kwargs.items():
+                if key not in self.trait_names():
+                    if raise_warning:
+                        warnings.warn(
+                            f"{key} is not a valid parameter and was not loaded"
+                        )
+                    else:
+                        raise KeyError(f"{key} is not a valid parameter")
+                setattr(self, key, arg)
 
     def from_string(self, string: str, raise_warning: bool = False) -> None:
         """Loads the attributes from a string.
@@ -1285,20 +1360,20 @@ class Parameters(
         """
         if filename is None:
             filename = self.filename
-        if self.filename.split(".")[-1] == "i3d":
+        if filename.split(".")[-1] == "i3d":
             dictionary = {}
 
             # unpacking the nested dictionary
-            for key_out, value_out in i3d_to_dict(self.filename).items():
+            for key_out, value_out in i3d_to_dict(filename).items():
                 for key_in, value_in in value_out.items():
                     dictionary[key_in] = value_in
 
-        elif self.filename.split(".")[-1] == "prm":
-            dictionary = prm_to_dict(self.filename)
+        elif filename.split(".")[-1] == "prm":
+            dictionary = prm_to_dict(filename)
 
         else:
             raise IOError(
-                f"{self.filename} is invalid. Supported formats are .i3d and .prm."
+                f"{filename} is invalid. Supported formats are .i3d and .prm."
             )
 
         self.set(raise_warning=raise_warning, **dictionary)
@@ -15,12 +15,17 @@ For more details, see:
 
 import os.path
 
+import dask.array as da
 import numba
 import numpy as np
+import scipy.sparse as sp
 import stl
 import xarray as xr
+from tqdm.auto import tqdm
 
 from .array import X3dDataArray, X3dDataset
+from .cache import GeometryCache, load_mask, save_mask
+from .csg import Box, Cylinder, HalfSpace, Shape, Sphere
 from .param import param
 
 
@@ -115,7 +120,7 @@ def init_epsi(prm, dask=False):
     return epsi
 
 
-def init_dataset(prm):
+def init_dataset(prm, dask=False, dtype=None):
     """This function initializes a :obj:`xarray.Dataset` including all variables
     that should be provided to XCompact3d and the sandbox flow configuration,
     according to the computational and physical parameters.
@@ -124,12 +129,22 @@ def init_dataset(prm):
     ----------
     prm : :obj:`xcompact3d_toolbox.parameters.Parameters`
         Contains the computational and physical parameters.
+    dask : bool
+        Defines the lazy parallel execution with dask arrays, nothing is
+        allocated until the values are needed. Each chunk is a slab in ``z``,
+        the slowest dimension at the binary files, so they can be computed and
+        written one at a time by :obj:`xcompact3d_toolbox.io.Dataset.write`
+        (the default is False).
+    dtype : data-type, optional
+        Data type for all the variables, like ``np.float32``.
+        By default None, meaning ``xcompact3d_toolbox.param["mytype"]``.
 
     Returns
     -------
     :obj:`xarray.Dataset`
         Each variable is initialized with
-        ``np.zeros(dtype=xcompact3d_toolbox.param["mytype"])`` and wrapped into a
+        ``np.zeros(dtype=xcompact3d_toolbox.param["mytype"])`` (or ``dask.array.zeros``)
+        and wrapped into a
         :obj:`xarray.Dataset` with the proper size, dimensions, coordinates and
         attributes, check them for more details. The variables are:
 
@@ -161,6 +176,10 @@ def init_dataset(prm):
     >>> #
     >>> prm.dataset.write(dataset) # write the files to the disc
 
+    For very large domains:
+
+    >>> dataset = xcompact3d_toolbox.init_dataset(prm, dask=True, dtype=np.float32)
+
     """
 
     from os import makedirs
@@ -179,11 +198,22 @@ def init_dataset(prm):
 
     description = {0: "Streamwise", 1: "Vertical", 2: "Spanwise"}
 
+    if dtype is None:
+        dtype = param["mytype"]
+
+    def zeros(*dims):
+        shape = tuple(ds[dim].size for dim in dims)
+        if dask:
+            # Slabs in z, one scalar fraction at a time
+            chunks = tuple({"z": "auto", "n": 1}.get(dim, -1) for dim in dims)
+            return da.zeros(shape, dtype=dtype, chunks=chunks)
+        return np.zeros(shape, dtype=dtype)
+
     # Boundary conditions
     if prm.nclx1 == 2:
         for i, var in enumerate("bxx1 bxy1 bxz1 noise_mod_x1".split()):
             ds[var] = xr.DataArray(
-                param["mytype"](0.0),
+                zeros("y", "z"),
                 dims=["y", "z"],
                 coords=[ds.y, ds.z],
                 attrs={
@@ -200,7 +230,7 @@ def init_dataset(prm):
     if prm.numscalar != 0:
         if prm.nclxS1 == 2:
             ds["bxphi1"] = xr.DataArray(
-                param["mytype"](0.0),
+                zeros("n", "y", "z"),
                 dims=["n", "y", "z"],
                 coords=[ds.n, ds.y, ds.z],
                 attrs={
@@ -211,7 +241,7 @@ def init_dataset(prm):
             )
         if prm.nclyS1 == 2:
             ds["byphi1"] = xr.DataArray(
-                param["mytype"](0.0),
+                zeros("n", "x", "z"),
                 dims=["n", "x", "z"],
                 coords=[ds.n, ds.x, ds.z],
                 attrs={
@@ -222,7 +252,7 @@ def init_dataset(prm):
             )
         if prm.nclySn == 2:
             ds["byphin"] = xr.DataArray(
-                param["mytype"](0.0),
+                zeros("n", "x", "z"),
                 dims=["n", "x", "z"],
                 coords=[ds.n, ds.x, ds.z],
                 attrs={
@@ -234,7 +264,7 @@ def init_dataset(prm):
     # Initial Condition
     for i, var in enumerate(["ux", "uy", "uz"]):
         ds[var] = xr.DataArray(
-            param["mytype"](0.0),
+            zeros("x", "y", "z"),
             dims=["x", "y", "z"],
             coords=[ds.x, ds.y, ds.z],
             attrs={
@@ -246,7 +276,7 @@ def init_dataset(prm):
         )
     if prm.numscalar != 0:
         ds["phi"] = xr.DataArray(
-            param["mytype"](0.0),
+            zeros("n", "x", "y", "z"),
             dims=["n", "x", "y", "z"],
             coords=[ds.n, ds.x, ds.y, ds.z],
             attrs={
@@ -259,7 +289,7 @@ def init_dataset(prm):
     # Flowrate control
     if prm.nclx1 == 0 and prm.nclxn == 0:
         ds["vol_frc"] = xr.DataArray(
-            param["mytype"](0.0),
+            zeros("x", "y", "z"),
             dims=["x", "y", "z"],
             coords=[ds.x, ds.y, ds.z],
             attrs={
@@ -271,7 +301,339 @@ def init_dataset(prm):
     return ds
 
 
-@xr.register_dataarray_accessor("geo")
+def random_noise(data_array, amplitude=1.0, seed=None):
+    """Random perturbations uniformly distributed in the interval
+    :math:`[-A, A]`, where :math:`A` is the amplitude, for initial and
+    inflow boundary conditions.
+
+    For arrays backed by `Dask`_, the random numbers are generated in parallel,
+    chunk by chunk. Each chunk has its own seed, spawned from
+    :obj:`numpy.random.SeedSequence` according to the chunk location,
+    so the result is bit-identical regardless of the number of workers,
+    and it can be streamed to the disc by :obj:`xcompact3d_toolbox.io.Dataset.write`.
+
+    Parameters
+    ----------
+    data_array : :obj:`xarray.DataArray`
+        Reference for the shape, coordinates, attributes and chunks,
+        like the variables from :obj:`init_dataset`.
+    amplitude : float or :obj:`xarray.DataArray`
+        Amplitude :math:`A`, it can be an array that broadcasts with ``data_array``,
+        like ``noise_mod_x1`` (the default is 1).
+    seed : int, optional
+        The entropy for :obj:`numpy.random.SeedSequence`, results are reproducible
+        for the same seed and chunks. By default None, meaning fresh entropy
+        from the operating system.
+
+    Returns
+    -------
+    :obj:`xarray.DataArray`
+        The random perturbations
+
+    Examples
+    --------
+
+    >>> prm = xcompact3d_toolbox.Parameters()
+    >>> ds = xcompact3d_toolbox.init_dataset(prm, dask=True)
+    >>> for var in "ux uy uz".split():
+    ...     ds[var] += xcompact3d_toolbox.sandbox.random_noise(
+    ...         ds[var], amplitude=0.05, seed=42
+    ...     )
+
+    .. _`Dask`: https://dask.org/
+
+    """
+
+    entropy = np.random.SeedSequence(seed).entropy
+    dtype = _float_dtype(data_array)
+
+    def noise(block, block_info=None):
+        location = block_info[None]["chunk-location"] if block_info else ()
+        rng = np.random.default_rng(
+            np.random.SeedSequence(entropy, spawn_key=tuple(location))
+        )
+        return (2.0 * rng.random(block.shape) - 1.0).astype(dtype)
+
+    data = data_array.data
+    if isinstance(data, da.Array):
+        data = data.map_blocks(noise, dtype=dtype, meta=np.array((), dtype=dtype))
+    else:
+        data = noise(data, {None: {"chunk-location": (0,) * data.ndim}})
+
+    with xr.set_options(keep_attrs=True):
+        return data_array.copy(data=data) * amplitude
+
+
+def synthetic_turbulence(
+    data_array,
+    intensity=1.0,
+    peak_wavenumber=None,
+    spectrum=None,
+    modes=1000,
+    seed=None,
+):
+    r"""Divergence-free synthetic turbulence with a prescribed energy spectrum,
+    for initial and inflow boundary conditions.
+
+    The velocity field is a sum of random Fourier modes, as proposed by:
+
+    * Kraichnan, R. H. (1970). Diffusion by a random velocity field.
+      The Physics of Fluids, 13(1), 22-31.
+
+    .. math::
+        \mathbf{u}(\mathbf{x}) = 2 \sum_{n=1}^{N} \sqrt{E(k_n) \Delta k_n}
+        \cos(k_n \hat{\mathbf{k}}_n \cdot \mathbf{x} + \psi_n) \boldsymbol{\sigma}_n,
+
+    where the directions :math:`\hat{\mathbf{k}}_n` are uniformly distributed on
+    the unit sphere, :math:`\boldsymbol{\sigma}_n \perp \hat{\mathbf{k}}_n`,
+    so each mode is divergence-free, and :math:`\psi_n` is a random phase.
+    The wavenumbers are spaced logarithmically from the largest length of the
+    domain to the mesh resolution.
+    By default, :math:`E(k)` is the spectrum from:
+
+    * Passot, T., & Pouquet, A. (1987). Numerical simulation of compressible
+      homogeneous flows in the turbulent regime. Journal of Fluid
+      Mechanics, 181, 441-466.
+
+    .. math::
+        E(k) = 16 \sqrt{\frac{2}{\pi}} \frac{u'^2}{k_0}
+        \left(\frac{k}{k_0}\right)^4 \exp\left[-2\left(\frac{k}{k_0}\right)^2\right].
+
+    The modes are drawn just once, and then the velocity is evaluated chunk
+    by chunk in parallel for arrays backed by `Dask`_, with a kernel powered by
+    `Numba`_. The result does not depend on the chunks or the number of workers.
+
+    Parameters
+    ----------
+    data_array : :obj:`xarray.DataArray`
+        Reference for the shape, coordinates and chunks, like ``ux`` from
+        :obj:`init_dataset`. It can be a plane as well, like ``bxx1``,
+        the missing coordinates are taken as zero.
+    intensity : float
+        Root mean square :math:`u'` of each velocity component, for the default
+        spectrum (the default is 1).
+    peak_wavenumber : float, optional
+        The wavenumber :math:`k_0` with the maximum energy, for the default spectrum.
+        By default None, meaning four times the smallest wavenumber of the domain.
+    spectrum : callable, optional
+        The energy spectrum :math:`E(k)`, replacing the default one.
+        It receives and returns :obj:`numpy.ndarray`.
+    modes : int
+        The number of random Fourier modes (the default is 1000).
+    seed : int, optional
+        The entropy for :obj:`numpy.random.SeedSequence`, results are reproducible
+        for the same seed. By default None, meaning fresh entropy
+        from the operating system.
+
+    Returns
+    -------
+    :obj:`xarray.DataArray`
+        The velocity field, with a new dimension ``i`` for the components
+        (``x``, ``y`` and ``z``).
+
+    Raises
+    -------
+    ValueError
+        If the dimensions of ``data_array`` are not ``x``, ``y`` or ``z``.
+
+    Examples
+    --------
+
+    >>> prm = xcompact3d_toolbox.Parameters()
+    >>> ds = xcompact3d_toolbox.init_dataset(prm, dask=True)
+    >>> u = xcompact3d_toolbox.sandbox.synthetic_turbulence(
+    ...     ds.ux, intensity=0.1, seed=42
+    ... )
+    >>> for i in "xyz":
+    ...     ds[f"u{i}"] += u.sel(i=i, drop=True)
+
+    .. _`Dask`: https://dask.org/
+    .. _`Numba`: http://numba.pydata.org/
+
+    """
+
+    for dim in data_array.dims:
+        if dim not in ("x", "y", "z"):
+            raise ValueError(f"Invalid dimension {dim}, it should be x, y or z")
+
+    coords = {dim: data_array[dim].values.astype(np.float64) for dim in data_array.dims}
+    lengths = [coord[-1] - coord[0] for coord in coords.values() if coord.size > 1]
+    spacings = [np.diff(coord).min() for coord in coords.values() if coord.size > 1]
+    k_min = 2.0 * np.pi / max(lengths)
+    k_max = np.pi / min(spacings)
+
+    if spectrum is None:
+        k0 = 4.0 * k_min if peak_wavenumber is None else peak_wavenumber
+
+        def spectrum(k):
+            return (
+                16.0
+                * np.sqrt(2.0 / np.pi)
+                * intensity ** 2.0
+                / k0
+                * (k / k0) ** 4.0
+                * np.exp(-2.0 * (k / k0) ** 2.0)
+            )
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+
+    edges = np.geomspace(k_min, k_max, num=modes + 1)
+    k = np.sqrt(edges[1:] * edges[:-1])
+    amplitude = 2.0 * np.sqrt(spectrum(k) * np.diff(edges))
+
+    # Random directions, uniformly distributed on the unit sphere
+    direction = rng.normal(size=(modes, 3))
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    # Random unit vectors normal to them
+    sigma = np.cross(direction, rng.normal(size=(modes, 3)))
+    sigma /= np.linalg.norm(sigma, axis=1, keepdims=True)
+    phase = rng.uniform(0.0, 2.0 * np.pi, size=modes)
+
+    wavevector = k[:, np.newaxis] * direction
+    dtype = _float_dtype(data_array)
+
+    def velocity(block, block_info=None):
+        location = block_info[0]["array-location"] if block_info else None
+        xyz = []
+        for dim in "xyz":
+            if dim in coords:
+                n = data_array.get_axis_num(dim)
+                start, stop = location[n] if location else (0, block.shape[n])
+                xyz.append(coords[dim][start:stop])
+            else:
+                xyz.append(np.zeros(1))
+        u = _random_fourier_modes(*xyz, wavevector, phase, amplitude * sigma.T)
+        # From (i, x, y, z) to (i, *data_array.dims)
+        present = [dim for dim in "xyz" if dim in coords]
+        u = u.squeeze(axis=tuple(1 + "xyz".index(d) for d in "xyz" if d not in present))
+        order = [0] + [1 + present.index(dim) for dim in data_array.dims]
+        return u.transpose(order).astype(dtype)
+
+    data = data_array.data
+    if isinstance(data, da.Array):
+        data = data.map_blocks(
+            velocity,
+            new_axis=0,
+            chunks=((3,),) + data.chunks,
+            dtype=dtype,
+            meta=np.array((), dtype=dtype),
+        )
+    else:
+        data = velocity(data)
+
+    return xr.DataArray(
+        data,
+        dims=("i",) + data_array.dims,
+        coords={"i": ["x", "y", "z"], **data_array.coords},
+        name="velocity",
+    )
+
+
+def inflow_from_precursor(precursor, prm, x, snapshots=None):
+    """Extract the inflow boundary condition for a simulation from the snapshots
+    of a precursor simulation, like a periodic channel or boundary layer.
+
+    The plane at the given ``x`` is read from each snapshot of the precursor
+    with :obj:`xcompact3d_toolbox.io.Dataset.load_plane`,
+    interpolated onto the ``y`` and ``z`` coordinates of the new simulation
+    and written to the disc as ``bxx1``, ``bxy1`` and ``bxz1``
+    (see :obj:`init_dataset`), numbered from zero.
+    Just one plane at a time is kept in memory, no matter the number of snapshots.
+
+    The interpolation is bilinear, as a sparse matrix computed just once
+    for the whole time series.
+    Points out of the precursor's domain take the value at the nearest boundary,
+    or wrap around in the periodic directions.
+
+    Parameters
+    ----------
+    precursor : :obj:`xcompact3d_toolbox.parameters.Parameters`
+        Contains the computational and physical parameters of the
+        precursor simulation, its snapshots are located by ``precursor.dataset``.
+    prm : :obj:`xcompact3d_toolbox.parameters.Parameters`
+        Contains the computational and physical parameters of the new simulation,
+        the inflow planes are written by ``prm.dataset``.
+    x : float
+        Streamwise coordinate at the precursor, the nearest plane is used.
+    snapshots : iterable of int, optional
+        The snapshots from the precursor to be used, like ``range(100, 200)``.
+        By default None, meaning all of them.
+
+    Examples
+    --------
+
+    >>> precursor = xcompact3d_toolbox.Parameters(loadfile="channel.i3d")
+    >>> prm = xcompact3d_toolbox.Parameters(loadfile="input.i3d")
+    >>> xcompact3d_toolbox.sandbox.inflow_from_precursor(
+    ...     precursor, prm, x=precursor.xlx / 2.0, snapshots=range(100, 200)
+    ... )
+
+    """
+
+    source = precursor.get_mesh()
+    target = prm.get_mesh()
+
+    def matrix(dim):
+        coord = getattr(precursor.mesh, dim)
+        period = coord.length if coord.is_periodic else None
+        return _interpolation_matrix(source[dim], target[dim], period)
+
+    # Acts on the plane raveled in Fortran order, just like the binary files
+    interpolation = sp.kron(matrix("z"), matrix("y"), format="csr")
+
+    if snapshots is None:
+        snapshots = range(len(precursor.dataset))
+
+    for k, snapshot in enumerate(tqdm(snapshots, desc="inflow")):
+        for var, bc in zip("ux uy uz".split(), "bxx1 bxy1 bxz1".split()):
+            filename = precursor.dataset.filename_properties.get_filename_for_binary(
+                var, snapshot, precursor.dataset.data_path
+            )
+            plane = precursor.dataset.load_plane(filename, add_time=False, x=x)
+            values = interpolation @ plane.values.ravel(order="F")
+            prm.dataset.write(
+                xr.DataArray(
+                    values.reshape(target["y"].size, target["z"].size, order="F"),
+                    dims=["y", "z"],
+                    coords=dict(y=target["y"], z=target["z"]),
+                ),
+                prm.dataset.filename_properties.get_filename_for_binary(bc, k),
+            )
+
+
+def _interpolation_matrix(source, target, period=None):
+    """Sparse matrix for linear interpolation from the ``source`` coordinate
+    to the ``target`` one, with constant extrapolation, or wrapped around when
+    the ``source`` coordinate is periodic with the given ``period``."""
+    size = source.size
+    if size == 1:
+        return sp.csr_matrix(np.ones((target.size, 1)))
+    if period is not None:
+        # The first point is repeated at the end, one period ahead
+        target = np.mod(target - source[0], period) + source[0]
+        source = np.append(source, source[0] + period)
+    index = np.clip(
+        np.searchsorted(source, target, side="right") - 1, 0, source.size - 2
+    )
+    weight = np.clip(
+        (target - source[index]) / (source[index + 1] - source[index]), 0.0, 1.0
+    )
+    rows = np.arange(target.size)
+    return sp.csr_matrix(
+        (
+            np.concatenate((1.0 - weight, weight)),
+            (np.concatenate((rows, rows)), np.concatenate((index, index + 1)) % size),
+        ),
+        shape=(target.size, size),
+    )
+
+
+def _float_dtype(data_array):
+    if np.issubdtype(data_array.dtype, np.floating):
+        return data_array.dtype
+    return np.dtype(param["mytype"])
+
+
 class Geometry:
     """An accessor with some standard geometries for :obj:`xarray.DataArray`.
     Use them in combination with the arrays initialized at
@@ -291,8 +653,13 @@ class Geometry:
         scale: float = None,
         user_tol: float = 2.0 * np.pi,
         remp: bool = True,
+        method: str = "exact",
+        beta: float = 2.0,
+        precision: str = "float64",
+        refine_band: float = None,
+        cache: GeometryCache = None,
     ):
-        """Load a STL file and compute if the nodes of the computational
+        r"""Load a STL file and compute if the nodes of the computational
         mesh are inside or outside the object. In this way, the
         customized geometry can be used at the flow solver.
 
@@ -310,9 +677,27 @@ class Geometry:
 
         To maximize the performance here at the toolbox, :obj:`from_stl` is powered by
         `Numba`_, that translates Python functions to optimized machine code at runtime.
-        This method is compatible with `Dask`_ for parallel computation.
+        This method is compatible with `Dask`_ for parallel computation, the
+        result stays lazy and it is computed for each chunk.
         In addition, just the subdomain near the object is tested, to save computational
-        time.
+        time, and the mesh points are distributed among all available threads.
+
+        For large STL files, ``method = "fast"`` approximates the winding number
+        with a bounding volume hierarchy, where clusters of triangles far away from
+        the mesh point are replaced by their dipole expansion, following:
+
+        * Barill, G., Dickson, N. G., Schmidt, R., Levin, D. I., & Jacobson,
+          A. (2018). Fast winding numbers for soups and clouds. ACM
+          Transactions on Graphics (TOG), 37(4), 1-12.
+
+        Since the computational mesh is cartesian, ``method = "raycast"`` computes
+        the inside-outside segmentation one line at a time. For each ``(y, z)``
+        line, a ray in ``x`` is intersected with the triangles (binned according to
+        their footprint in the ``yz`` plane), the crossings are sorted and the
+        segments between them are filled. The winding number is used as a fallback
+        for the lines where the crossings are not consistent, like when the ray
+        is tangent to a non-watertight region of the surface. Mesh points lying
+        exactly at the surface may be classified differently from the other methods.
 
         .. note:: The precision of the method is influenced by the
            complexity of the STL mesh, there is no guarantee it will work
@@ -355,6 +740,43 @@ class Geometry:
         remp : bool, optional
             Add the geometry to the :obj:`xarray.DataArray` if
             :obj:`True` and removes it if :obj:`False`, by default True
+        method : str, optional
+            The algorithm used to compute the generalized winding number:
+
+            * ``"exact"`` - Sum the contribution of every triangle for each
+              mesh point (default). It is the reference for accuracy;
+            * ``"fast"`` - Hierarchical approximation, the cost per mesh point
+              is about logarithmic in the number of triangles.
+            * ``"raycast"`` - Scanline ray-casting fill along ``x``, the cost is
+              proportional to the number of lines in ``yz``. Notice that
+              :obj:`user_tol` is only used at the lines with the fallback.
+        beta : float, optional
+            Accuracy parameter for ``method = "fast"``. A cluster of triangles is
+            approximated when its distance to the mesh point is larger than
+            ``beta`` times its radius, larger values are more accurate and slower.
+            By default 2.0
+        precision : str, optional
+            Floating point precision of the winding number for ``method = "exact"``,
+            it can be ``"float32"``, ``"float64"`` (default) or ``"longdouble"``.
+            The points whose winding number is within :obj:`refine_band` from
+            :obj:`user_tol` are re-evaluated in extended precision
+            (:obj:`numpy.longdouble`), while ``"longdouble"`` evaluates all
+            points in extended precision, which is accurate but much slower.
+        refine_band : float, optional
+            Half width of the band around :obj:`user_tol` where the winding
+            number is re-evaluated in extended precision. By default None,
+            meaning an estimate of the round-off error, proportional to the
+            number of triangles and to the machine epsilon of :obj:`precision`.
+            The winding number is :math:`0` outside and :math:`2\pi` inside the
+            object, so the points within this band from these values take them
+            exactly, and just the ones left close to the surface are re-evaluated.
+        cache : :obj:`xcompact3d_toolbox.cache.GeometryCache`, optional
+            If provided, the result is loaded from the cache when the triangles
+            (after scaling, rotating and translating them), the coordinates
+            and the arguments above are the same as in a previous call,
+            otherwise, it is computed and stored in the cache. Notice that the
+            result is computed at once in this case, even for arrays backed by
+            `Dask`_. By default None
 
         Returns
         -------
@@ -370,6 +792,10 @@ class Geometry:
         ValueError
             If :obj:`stl_mesh` is not closed, the test is performed by
             :obj:`stl.mesh.Mesh.is_closed`
+        ValueError
+            If :obj:`method` is not supported
+        ValueError
+            If :obj:`precision` is not supported
 
 
         Examples
@@ -429,26 +855,153 @@ class Geometry:
         if not stl_mesh.is_closed():
             raise ValueError("stl_mesh is not closed")
 
+        if method not in ("exact", "fast", "raycast"):
+            raise ValueError(f"{method} is not a valid method for from_stl")
+
+        if precision not in ("float32", "float64", "longdouble"):
+            raise ValueError(f"{precision} is not a valid precision for from_stl")
+
+        if method == "fast":
+            # The hierarchy is built just once and shared by all chunks
+            triangles = stl_mesh.vectors.astype(np.float64)
+            bvh = _build_bvh(triangles)
+
+        def inside_mesh(x, y, z):
+            """Compute what points are inside the object for the given coordinates,
+            that can be the whole domain or just a chunk.
+            """
+
+            lim_x = get_boundary(stl_mesh.x, x)
+            lim_y = get_boundary(stl_mesh.y, y)
+            lim_z = get_boundary(stl_mesh.z, z)
+
+            if method == "exact":
+                return _geometry_inside_mesh_refined(
+                    stl_mesh.vectors,
+                    x,
+                    y,
+                    z,
+                    user_tol,
+                    lim_x,
+                    lim_y,
+                    lim_z,
+                    precision,
+                    refine_band,
+                )
+            elif method == "fast":
+                return _geometry_inside_mesh_fast(
+                    triangles,
+                    *bvh,
+                    x.astype(np.float64),
+                    y.astype(np.float64),
+                    z.astype(np.float64),
+                    user_tol,
+                    beta,
+                    lim_x,
+                    lim_y,
+                    lim_z,
+                )
+            else:
+                triangles_ = stl_mesh.vectors.astype(np.float64)
+                x, y, z = (coord.astype(np.float64) for coord in (x, y, z))
+                return _geometry_inside_mesh_raycast(
+                    triangles_,
+                    *_bin_triangles(triangles_, y, z, lim_y, lim_z),
+                    x,
+                    y,
+                    z,
+                    user_tol,
+                    lim_x,
+                    lim_y,
+                    lim_z,
+                )
+
+        def draw(data_array):
+            inside = inside_mesh(
+                data_array.x.data, data_array.y.data, data_array.z.data
+            )
+            return data_array.where(~inside, remp)
+
+        if cache is None:
+            # Lazy and computed for each chunk if the array is backed by dask
+            return xr.map_blocks(draw, self._data_array)
+
         x = self._data_array.x.data
         y = self._data_array.y.data
         z = self._data_array.z.data
 
-        return self._data_array.where(
-            ~_geometry_inside_mesh(
-                stl_mesh.vectors.astype(np.longdouble),
-                x.astype(np.longdouble),
-                y.astype(np.longdouble),
-                z.astype(np.longdouble),
-                user_tol,
-                get_boundary(stl_mesh.x, x),
-                get_boundary(stl_mesh.y, y),
-                get_boundary(stl_mesh.z, z),
-            ),
-            remp,
+        key = cache.key(
+            "from_stl",
+            stl_mesh.vectors,
+            x,
+            y,
+            z,
+            user_tol,
+            method,
+            beta,
+            precision,
+            refine_band,
         )
+        entry = cache.load(key)
+        if entry is not None:
+            inside = load_mask(entry, "inside")
+        else:
+            inside = inside_mesh(x, y, z)
+            with cache.store(key) as entry:
+                save_mask(entry, "inside", inside)
+
+        return self._data_array.where(~inside, remp)
+
+    def from_csg(self, shape: Shape, remp: bool = True):
+        """Draw a composite shape, built with the constructive solid geometry
+        from :obj:`xcompact3d_toolbox.csg`.
+
+        The whole expression tree is evaluated in just one pass, and each node
+        is restricted to its bounding box, so only the sub-block of the array
+        inside the bounding box of the shape is updated. This method is compatible with
+        `Dask`_, the shape is evaluated for each chunk in parallel.
+
+        Parameters
+        ----------
+        shape : :obj:`xcompact3d_toolbox.csg.Shape`
+            The composite shape.
+        remp : bool
+            Adds the geometry to the :obj:`xarray.DataArray` if True and removes
+            it if False (the default is True).
+
+        Returns
+        -------
+        :obj:`xarray.DataArray`
+            Array with(out) the shape
+
+        Examples
+        -------
+
+        >>> from xcompact3d_toolbox.csg import Box, Cylinder
+        >>> prm = xcompact3d_toolbox.Parameters()
+        >>> epsi = xcompact3d_toolbox.init_epsi(prm)
+        >>> shape = Box(x=(2, 5), y=(0, 1)) - Cylinder(x=3.5, y=0.5, radius=0.25)
+        >>> for key in epsi.keys():
+        >>>     epsi[key] = epsi[key].geo.from_csg(shape)
+
+        .. _`Dask`: https://dask.org/
+
+        """
+
+        def draw(data_array):
+            index, inside = shape.evaluate_bounded(
+                {dim: data_array[dim].values for dim in data_array.dims}
+            )
+            result = data_array.copy()
+            if index is not None:
+                # Just the sub-block inside the bounding box is updated
+                result.data[index][inside] = remp
+            return result
+
+        return xr.map_blocks(draw, self._data_array)
 
     def cylinder(self, radius=0.5, axis="z", height=None, remp=True, **kwargs):
-        """Draw a cylinder.
+        r"""Draw a cylinder.
 
         Parameters
         ----------
@@ -491,25 +1044,116 @@ class Geometry:
                     f'Invalid key for "kwargs", it should be a valid dimension'
                 )
 
-        dis = 0.0
-        for d in self._data_array.dims:
-            if d == axis:
-                continue
-            dis = dis + (self._data_array[d] - kwargs.get(d, 0.0)) ** 2.0
-        dis = np.sqrt(dis)
-
-        if height != None:
-            height *= 0.5
-            # Notice that r*10 is just to guarantee that the values are larger than r
-            # and consequently outside the cylinder
-            dis = dis.where(
-                self._data_array[axis] <= kwargs.get(axis, 0.0) + height, radius * 10
-            )
-            dis = dis.where(
-                self._data_array[axis] >= kwargs.get(axis, 0.0) - height, radius * 10
+        return self.from_csg(
+            Cylinder(radius=radius, axis=axis, height=height, **kwargs), remp
+        )
+
+    def cylinders(self, centers, radii=0.5, axis="z", height=None, remp=True):
+        r"""Draw many cylinders at once, like the tubes in a heat exchanger.
+
+        All cylinders are rasterized in a single kernel powered by `Numba`_,
+        where the mesh points are distributed among all available threads and
+        each cylinder is tested just inside its bounding box. The result is the
+        same as calling :obj:`cylinder` for each one of them, but much faster.
+
+        Parameters
+        ----------
+        centers : :obj:`dict` of array_like
+            Cylinders' center points, the keys are the dimensions and the values
+            are the coordinates for each cylinder, it is zero for the missing dimensions.
+        radii : float or array_like
+            Cylinders' radii (the default is 0.5).
+        axis : str
+            Cylinders' axis (the default is ``"z"``), they are just circles
+            if the array has no such dimension, as in 2D.
+        height : float, array_like or None
+            Cylinders' height (the default is None), if None, it will take
+            the entire axis, otherwise :math:`\pm h/2` is considered from the center.
+        remp : bool
+            Adds the geometry to the :obj:`xarray.DataArray` if True and removes
+            it if False (the default is True).
+
+        Returns
+        -------
+        :obj:`xarray.DataArray`
+            Array with(out) the cylinders
+
+        Raises
+        -------
+        KeyError
+            Center coordinates must be valid dimensions
+
+        Examples
+        -------
+
+        A staggered tube bank:
+
+        >>> prm = xcompact3d_toolbox.Parameters()
+        >>> epsi = xcompact3d_toolbox.init_epsi(prm)
+        >>> x, y = np.meshgrid(np.arange(2.0, 10.0), np.arange(1.0, 5.0))
+        >>> x[1::2] += 0.5
+        >>> for key in epsi.keys():
+        >>>     epsi[key] = epsi[key].geo.cylinders(
+        ...         centers=dict(x=x.ravel(), y=y.ravel()), radii=0.25
+        ...     )
+
+        .. _`Numba`: http://numba.pydata.org/
+
+        """
+
+        for key in centers.keys():
+            if not key in self._data_array.dims:
+                raise KeyError(
+                    f'Invalid key for "centers", it should be a valid dimension'
+                )
+
+        # The axis is the last dimension at the kernel, a 2D array has no axis
+        # at all, so it is just a single point and the height is unbounded
+        planar = axis not in self._data_array.dims
+        if planar:
+            height = None
+        dims = [d for d in self._data_array.dims if d != axis] + [axis]
+
+        centers = np.broadcast_arrays(
+            *(np.atleast_1d(centers.get(d, 0.0)).astype(np.float64) for d in dims),
+            np.atleast_1d(radii).astype(np.float64),
+            np.atleast_1d(np.inf if height is None else height).astype(np.float64),
+        )
+        centers, radii, height = centers[:-2], centers[-2], centers[-1]
+
+        def draw(data_array):
+            coords = [
+                np.zeros(1) if d not in data_array.dims else data_array[d].values
+                for d in dims
+            ]
+            coords = [coord.astype(np.float64) for coord in coords]
+
+            limits = []
+            for coord, center, size in zip(
+                coords, centers, (radii, radii, 0.5 * height)
+            ):
+                limits.append(
+                    np.stack(
+                        (
+                            coord.searchsorted(center - size, "left"),
+                            coord.searchsorted(center + size, "right"),
+                        ),
+                        axis=-1,
+                    )
+                )
+
+            inside = _geometry_cylinders(*coords, *centers, radii, height, *limits)
+            inside = xr.DataArray(inside, dims=dims)
+            if planar:
+                inside = inside.squeeze(axis)
+
+            return data_array.where(
+                ~inside.transpose(*data_array.dims).data,
+                remp,
             )
 
-        return self._data_array.where(dis > radius, remp)
+        # Lazy and computed for each chunk if the array is backed by dask
+        return xr.map_blocks(draw, self._data_array)
 
     def box(self, remp=True, **kwargs):
         """Draw a box.
@@ -548,13 +1192,7 @@ class Geometry:
                     f'Invalid key for "kwargs", it should be a valid dimension'
                 )
 
-        tmp = xr.zeros_like(self._data_array)
-
-        for key, value in kwargs.items():
-            tmp = tmp.where(self._data_array[key] >= value[0], True)
-            tmp = tmp.where(self._data_array[key] <= value[1], True)
-
-        return self._data_array.where(tmp, remp)
+        return self.from_csg(Box(**kwargs), remp)
 
     def square(self, length=1.0, thickness=0.1, remp=True, **kwargs):
         """Draw a squared frame.
@@ -596,14 +1234,13 @@ class Geometry:
                     f'Invalid key for "kwargs", it should be a valid dimension'
                 )
 
-        center = {kwargs.get(key, 0.0) for key in self._data_array.dims}
+        center = {key: kwargs.get(key, 0.0) for key in self._data_array.dims}
 
         boundaries1 = {
             "x": (center["x"] - 0.5 * thickness, center["x"] + 0.5 * thickness),
             "y": (center["y"] - 0.5 * length, center["y"] + 0.5 * length),
             "z": (center["z"] - 0.5 * length, center["z"] + 0.5 * length),
         }
-        tmp = self._data_array.geo.box(**boundaries1, remp=True)
         #
         length -= 2 * thickness
         boundaries2 = {
@@ -611,9 +1248,8 @@ class Geometry:
             "y": (center["y"] - 0.5 * length, center["y"] + 0.5 * length),
             "z": (center["z"] - 0.5 * length, center["z"] + 0.5 * length),
         }
-        tmp = tmp.geo.box(**boundaries2, remp=False)
         #
-        return self._data_array.where(tmp, remp)
+        return self.from_csg(Box(**boundaries1) - Box(**boundaries2), remp)
 
     def sphere(self, radius=0.5, remp=True, **kwargs):
         """Draw a sphere.
@@ -653,12 +1289,7 @@ class Geometry:
                     f'Invalid key for "kwargs", it should be a valid dimension'
                 )
 
-        dis = 0.0
-        for d in self._data_array.dims:
-            dis = dis + (self._data_array[d] - kwargs.get(d, 0.0)) ** 2.0
-        dis = np.sqrt(dis)
-
-        return self._data_array.where(dis > radius, remp)
+        return self.from_csg(Sphere(radius=radius, **kwargs), remp)
 
     def ahmed_body(self, scale=1.0, angle=45.0, wheels=False, remp=True, **kwargs):
         """Draw an Ahmed body.
@@ -722,34 +1353,26 @@ class Geometry:
         if scale != 1:
             raise NotImplementedError("Unsupported: Not prepared yet for scale != 1")
 
-        tmp = xr.zeros_like(self._data_array)
-        tmp2 = xr.zeros_like(self._data_array)
-
         # the "corners" are the intersections between the cylinders
-
-        # horizontal
-
-        tmp = tmp.geo.cylinder(
-            x=100.00 * s + kwargs["x"],
-            y=150.00 * s + kwargs["y"],
-            z=97.25 * s + kwargs["z"],
-            axis="z",
-            radius=100.00 * s,
-            height=194.50 * s,
-        )
-
-        tmp = tmp.geo.cylinder(
-            x=100.00 * s + kwargs["x"],
-            y=238.00 * s + kwargs["y"],
-            z=97.25 * s + kwargs["z"],
-            axis="z",
-            radius=100.00 * s,
-            height=194.50 * s,
-        )
-
-        # vertical
-
-        tmp2 = tmp2.geo.cylinder(
+        corners = (
+            # horizontal
+            Cylinder(
+                x=100.00 * s + kwargs["x"],
+                y=150.00 * s + kwargs["y"],
+                z=97.25 * s + kwargs["z"],
+                axis="z",
+                radius=100.00 * s,
+                height=194.50 * s,
+            )
+            | Cylinder(
+                x=100.00 * s + kwargs["x"],
+                y=238.00 * s + kwargs["y"],
+                z=97.25 * s + kwargs["z"],
+                axis="z",
+                radius=100.00 * s,
+                height=194.50 * s,
+            )
+        ) & Cylinder(  # vertical
             x=100.00 * s + kwargs["x"],
             y=194.00 * s + kwargs["y"],
             z=100.00 * s + kwargs["z"],
@@ -758,74 +1381,73 @@ class Geometry:
             height=288.00 * s,
         )
 
-        # get intersection
-        tmp = np.logical_and(tmp == True, tmp2 == True)
-
-        del tmp2
-
         # now the regular cylinders
-
-        tmp = tmp.geo.cylinder(
-            x=100.00 * s + kwargs["x"],
-            y=150.00 * s + kwargs["y"],
-            z=147.25 * s + kwargs["z"] + 1.0,  # fixing issue #5
-            axis="z",
-            radius=100.00 * s,
-            height=94.50 * s + 2.0,  # fixing issue #5
-        )
-
-        tmp = tmp.geo.cylinder(
-            x=100.00 * s + kwargs["x"],
-            y=238.00 * s + kwargs["y"],
-            z=147.25 * s + kwargs["z"] + 1.0,  # fixing issue #5
-            axis="z",
-            radius=100.00 * s,
-            height=94.50 * s + 2.0,  # fixing issue #5
-        )
-
-        tmp = tmp.geo.cylinder(
-            x=100.00 * s + kwargs["x"],
-            y=194.00 * s + kwargs["y"],
-            z=100.00 * s + kwargs["z"],
-            axis="y",
-            radius=100.00 * s,
-            height=88.00 * s,
-        )
-
-        if wheels:
-            tmp = tmp.geo.cylinder(
-                x=200.00 * s + kwargs["x"],
-                y=25.00 * s + kwargs["y"],
-                z=46.50 * s + kwargs["z"],
+        body = (
+            corners
+            | Cylinder(
+                x=100.00 * s + kwargs["x"],
+                y=150.00 * s + kwargs["y"],
+                z=147.25 * s + kwargs["z"] + 1.0,  # fixing issue #5
+                axis="z",
+                radius=100.00 * s,
+                height=94.50 * s + 2.0,  # fixing issue #5
+            )
+            | Cylinder(
+                x=100.00 * s + kwargs["x"],
+                y=238.00 * s + kwargs["y"],
+                z=147.25 * s + kwargs["z"] + 1.0,  # fixing issue #5
+                axis="z",
+                radius=100.00 * s,
+                height=94.50 * s + 2.0,  # fixing issue #5
+            )
+            | Cylinder(
+                x=100.00 * s + kwargs["x"],
+                y=194.00 * s + kwargs["y"],
+                z=100.00 * s + kwargs["z"],
                 axis="y",
-                radius=15.00 * s,
-                height=50.00 * s,
+                radius=100.00 * s,
+                height=88.00 * s,
             )
+        )
 
-            tmp = tmp.geo.cylinder(
-                x=725.00 * s + kwargs["x"],
-                y=25.00 * s + kwargs["y"],
-                z=46.50 * s + kwargs["z"],
-                axis="y",
-                radius=15.00 * s,
-                height=50.00 * s,
+        if wheels:
+            body = (
+                body
+                | Cylinder(
+                    x=200.00 * s + kwargs["x"],
+                    y=25.00 * s + kwargs["y"],
+                    z=46.50 * s + kwargs["z"],
+                    axis="y",
+                    radius=15.00 * s,
+                    height=50.00 * s,
+                )
+                | Cylinder(
+                    x=725.00 * s + kwargs["x"],
+                    y=25.00 * s + kwargs["y"],
+                    z=46.50 * s + kwargs["z"],
+                    axis="y",
+                    radius=15.00 * s,
+                    height=50.00 * s,
+                )
             )
 
         # the boxes
-        tmp = tmp.geo.box(
-            x=(kwargs["x"], 200.00 * s + kwargs["x"]),
-            y=(150.00 * s + kwargs["y"], 238.00 * s + kwargs["y"]),
-            z=(100.00 * s + kwargs["z"], 194.50 * s + kwargs["z"]),
-        )
-
-        tmp = tmp.geo.box(
-            x=(100.00 * s + kwargs["x"], 1044.00 * s + kwargs["x"]),
-            y=(50.00 * s + kwargs["y"], 338.00 * s + kwargs["y"]),
-            z=(kwargs["z"], 194.50 * s + kwargs["z"]),
+        body = (
+            body
+            | Box(
+                x=(kwargs["x"], 200.00 * s + kwargs["x"]),
+                y=(150.00 * s + kwargs["y"], 238.00 * s + kwargs["y"]),
+                z=(100.00 * s + kwargs["z"], 194.50 * s + kwargs["z"]),
+            )
+            | Box(
+                x=(100.00 * s + kwargs["x"], 1044.00 * s + kwargs["x"]),
+                y=(50.00 * s + kwargs["y"], 338.00 * s + kwargs["y"]),
+                z=(kwargs["z"], 194.50 * s + kwargs["z"]),
+            )
         )
 
         # and finally a mirror
-        tmp = tmp.geo.mirror(dim="z")
+        body = body.mirror("z", 0.5 * float(self._data_array.z[-1]))
 
         # Angle in the back
         hipo = (93.80 / math.sin(math.radians(25))) * s
@@ -837,15 +1459,14 @@ class Geometry:
 
         coefficients = np.polyfit(x, y, 1)
 
-        cut = self._data_array.x * coefficients[0] + coefficients[1]
-
-        tmp = tmp.where(self._data_array.y <= cut, False)
+        body = body & HalfSpace(offset=coefficients[1], x=-coefficients[0], y=1.0)
 
-        return self._data_array.where(np.logical_not(tmp), remp)
+        return self.from_csg(body, remp)
 
     def mirror(self, dim="x"):
         """Mirror the :math:`\\epsilon` array with respect to the central plane
-        in the direction ``dim``.
+        in the direction ``dim``. It is lazy for arrays backed by `Dask`_,
+        so the whole array is never gathered.
 
         Parameters
         ----------
@@ -865,19 +1486,106 @@ class Geometry:
         >>> for key in epsi.keys():
         >>>     epsi[key] = epsi[key].geo.cylinder(x=4, y=5).geo.mirror("x")
 
+        .. _`Dask`: https://dask.org/
+
         """
         return self._data_array.where(
             self._data_array[dim] <= self._data_array[dim][-1] / 2.0,
-            self._data_array[{dim: slice(None, None, -1)}].values,
+            self._data_array[{dim: slice(None, None, -1)}].data,
         )
 
+    def signed_distance(self, band: float = None, tol: float = 1e-12):
+        r"""Compute the signed distance to the surface of the geometry, that is
+        negative inside the solid and positive at the fluid points.
 
-@numba.njit
+        The :math:`\epsilon` array is used to seed the points next to the interface,
+        that is placed halfway between a solid and a fluid point, just like at
+        :obj:`xcompact3d_toolbox.genepsi.gene_epsi_3D`.
+        Then, the Eikonal equation :math:`|\nabla d| = 1` is solved with the
+        fast sweeping method, with first order upwind differences for the
+        cartesian mesh (that can be stretched in ``y``), following:
+
+        * Zhao, H. (2005). A fast sweeping method for eikonal equations.
+          Mathematics of computation, 74(250), 603-627.
+
+        The eight sweeping directions are computed in parallel, each one
+        on its own copy of the field, and they are combined by the minimum value,
+        as proposed by:
+
+        * Zhao, H. (2007). Parallel implementations of the fast sweeping method.
+          Journal of Computational Mathematics, 421-429.
+
+        It is powered by `Numba`_, so it works for geometries from the analytic
+        primitives, from :obj:`from_csg` and from :obj:`from_stl` as well.
+
+        .. note:: The whole array is computed at once, even if it is backed by `Dask`_.
+
+        Parameters
+        ----------
+        band : float, optional
+            Width of the narrow band around the surface. The distance is limited
+            to :math:`\pm` ``band``, and the points out of it are not updated,
+            what makes it faster. By default None, meaning the whole domain
+        tol : float, optional
+            The sweeps stop when the largest change is smaller than :obj:`tol`,
+            by default 1e-12
+
+        Returns
+        -------
+        :obj:`xarray.DataArray`
+            The signed distance, with the same coordinates of the :math:`\epsilon` array
+
+        Examples
+        -------
+
+        >>> prm = xcompact3d_toolbox.Parameters()
+        >>> epsi = xcompact3d_toolbox.init_epsi(prm)
+        >>> sdf = epsi["epsi"].geo.cylinder(x=4, y=5).geo.signed_distance(band=1.0)
+
+        .. _`Dask`: https://dask.org/
+        .. _`Numba`: http://numba.pydata.org/
+
+        """
+        solid = self._data_array.values.astype(bool)
+        coords = [
+            self._data_array[d].values.astype(np.float64) for d in self._data_array.dims
+        ]
+
+        if band is None:
+            band = np.inf
+
+        distance = np.full(solid.shape, band, dtype=np.float64)
+        # The interface is halfway between a solid and a fluid point
+        for axis, coord in enumerate(coords):
+            interface = np.moveaxis(
+                solid.take(range(1, coord.size), axis)
+                != solid.take(range(coord.size - 1), axis),
+                axis,
+                -1,
+            )
+            half = 0.5 * np.diff(coord)
+            before = np.moveaxis(distance, axis, -1)[..., :-1]
+            after = np.moveaxis(distance, axis, -1)[..., 1:]
+            np.minimum(before, np.where(interface, half, np.inf), out=before)
+            np.minimum(after, np.where(interface, half, np.inf), out=after)
+        seed = distance < band
+
+        distance = _fast_sweeping(distance, seed, *coords, band, tol)
+
+        return xr.DataArray(
+            np.where(solid, -distance, distance),
+            dims=self._data_array.dims,
+            coords=self._data_array.coords,
+            name="signed_distance",
+        )
+
+
+@numba.njit(parallel=True)
 def _geometry_inside_mesh(triangles, x, y, z, user_tol, lim_x, lim_y, lim_z):
 
     result = np.zeros((x.size, y.size, z.size), dtype=numba.boolean)
 
-    for i in range(*lim_x):
+    for i in numba.prange(lim_x[0], lim_x[1]):
         for j in range(*lim_y):
             for k in range(*lim_z):
                 result[i, j, k] = _point_in_geometry(
@@ -887,6 +1595,92 @@ def _geometry_inside_mesh(triangles, x, y, z, user_tol, lim_x, lim_y, lim_z):
     return result
 
 
+@numba.njit(parallel=True)
+def _geometry_winding_number(triangles, x, y, z, lim_x, lim_y, lim_z):
+
+    result = np.zeros((x.size, y.size, z.size), dtype=triangles.dtype)
+
+    for i in numba.prange(lim_x[0], lim_x[1]):
+        for j in range(*lim_y):
+            for k in range(*lim_z):
+                result[i, j, k] = _winding_number(triangles, x[i], y[j], z[k])
+
+    return result
+
+
+def _winding_number_extended(triangles, points, chunk_size=2 ** 20):
+    """Generalized winding number in extended precision (:obj:`numpy.longdouble`).
+
+    It is vectorized with NumPy instead of Numba, since Numba does not support
+    extended precision. Points are evaluated in chunks, so the temporary arrays
+    have about :obj:`chunk_size` triangles.
+    """
+    triangles = triangles.astype(np.longdouble)
+    points = points.astype(np.longdouble)
+    ret = np.empty(points.shape[0], dtype=np.longdouble)
+
+    step = max(1, chunk_size // triangles.shape[0])
+    for start in range(0, points.shape[0], step):
+        X = points[start : start + step, np.newaxis, np.newaxis, :]
+        A, B, C = np.moveaxis(triangles[np.newaxis] - X, 2, 0)
+        omega = np.sum(A * np.cross(B, C), axis=-1)
+
+        a, b, c = (np.sqrt(np.sum(V * V, axis=-1)) for V in (A, B, C))
+        d = a * b * c
+        d += c * np.sum(A * B, axis=-1)
+        d += a * np.sum(B * C, axis=-1)
+        d += b * np.sum(C * A, axis=-1)
+
+        ret[start : start + step] = np.sum(np.arctan2(omega, d), axis=-1)
+
+    return ret
+
+
+def _geometry_inside_mesh_refined(
+    triangles, x, y, z, user_tol, lim_x, lim_y, lim_z, precision, refine_band
+):
+    r"""Compute the winding number with :obj:`precision` and re-evaluate in
+    extended precision just the points within :obj:`refine_band` from
+    :obj:`user_tol`, but not from :math:`0` or :math:`2\pi`. All points are evaluated in extended precision for
+    ``precision = "longdouble"``.
+    """
+    subdomain = (slice(*lim_x), slice(*lim_y), slice(*lim_z))
+    inside = np.zeros((x.size, y.size, z.size), dtype=bool)
+
+    if precision == "longdouble":
+        refine = np.zeros_like(inside)
+        refine[subdomain] = True
+    else:
+        dtype = np.dtype(precision)
+        if refine_band is None:
+            refine_band = 10.0 * np.pi * triangles.shape[0] * np.finfo(dtype).eps
+        winding = _geometry_winding_number(
+            triangles.astype(dtype),
+            x.astype(dtype),
+            y.astype(dtype),
+            z.astype(dtype),
+            lim_x,
+            lim_y,
+            lim_z,
+        )[subdomain]
+        # Away from the surface the winding number is 0 outside and 2π inside,
+        # so the round-off is removed from these points, and just the ones
+        # left near user_tol are re-evaluated
+        exact = 2.0 * np.pi * np.round(winding / (2.0 * np.pi))
+        snap = np.abs(winding - exact) <= refine_band
+        winding = np.where(snap, exact, winding)
+        inside[subdomain] = winding >= user_tol
+        refine = np.zeros_like(inside)
+        refine[subdomain] = ~snap & (np.abs(winding - user_tol) <= refine_band)
+
+    i, j, k = np.nonzero(refine)
+    if i.size:
+        points = np.stack((x[i], y[j], z[k]), axis=-1)
+        inside[i, j, k] = _winding_number_extended(triangles, points) >= user_tol
+
+    return inside
+
+
 @numba.njit
 def _anorm2(X):
     # Compute euclidean norm
@@ -920,6 +1714,12 @@ def _point_in_geometry(triangles, x, y, z, user_tol):
     by `Devert Alexandre <https://github.com/marmakoide>`_,
     licensed under the MIT License.
     """
+    return _winding_number(triangles, x, y, z) >= user_tol
+
+
+@numba.njit
+def _winding_number(triangles, x, y, z):
+    # Sum of the signed half solid angles, in the precision of triangles
     X = np.array((x, y, z), dtype=triangles.dtype)
 
     # One generalized winding number per input vertex
@@ -938,4 +1738,447 @@ def _point_in_geometry(triangles, x, y, z, user_tol):
 
         ret += np.arctan2(omega, d)
 
-    return ret >= user_tol
+    return ret
+
+
+@numba.njit
+def _build_bvh(triangles, leaf_size=8):
+    """Build a bounding volume hierarchy for the triangles, splitting each node
+    at the median of the centroids along its largest extent.
+
+    Besides the tree, it returns the moments used by the far field approximation
+    of each node: the sum of the area vectors, the area weighted center and the
+    radius of the sphere centered there that bounds all its triangles.
+    """
+    ntri = triangles.shape[0]
+    centroids = np.zeros((ntri, 3))
+    areas = np.zeros((ntri, 3))
+    for t in range(ntri):
+        centroids[t] = (triangles[t, 0] + triangles[t, 1] + triangles[t, 2]) / 3.0
+        areas[t] = 0.5 * np.cross(
+            triangles[t, 1] - triangles[t, 0], triangles[t, 2] - triangles[t, 0]
+        )
+
+    order = np.arange(ntri)
+    max_nodes = 2 * ntri + 1
+    start = np.zeros(max_nodes, dtype=np.int64)
+    end = np.zeros(max_nodes, dtype=np.int64)
+    child = -np.ones((max_nodes, 2), dtype=np.int64)
+
+    nnodes = 1
+    start[0], end[0] = 0, ntri
+    stack = [0]
+    while len(stack) > 0:
+        node = stack.pop()
+        if end[node] - start[node] <= leaf_size:
+            continue
+        index = order[start[node] : end[node]]
+        extent = np.zeros(3)
+        for d in range(3):
+            extent[d] = centroids[index, d].max() - centroids[index, d].min()
+        axis = np.argmax(extent)
+        order[start[node] : end[node]] = index[np.argsort(centroids[index, axis])]
+        middle = (start[node] + end[node]) // 2
+        for n in range(2):
+            start[nnodes] = middle if n else start[node]
+            end[nnodes] = end[node] if n else middle
+            child[node, n] = nnodes
+            stack.append(nnodes)
+            nnodes += 1
+
+    area = np.zeros((nnodes, 3))
+    center = np.zeros((nnodes, 3))
+    radius = np.zeros(nnodes)
+    for node in range(nnodes):
+        index = order[start[node] : end[node]]
+        weight = 0.0
+        for t in index:
+            w = np.sqrt(np.sum(areas[t] ** 2.0))
+            area[node] += areas[t]
+            center[node] += w * centroids[t]
+            weight += w
+        if weight > 0.0:
+            center[node] /= weight
+        else:
+            for t in index:
+                center[node] += centroids[t] / index.size
+        for t in index:
+            for v in range(3):
+                dist = np.sqrt(np.sum((triangles[t, v] - center[node]) ** 2.0))
+                radius[node] = max(radius[node], dist)
+
+    return order, start[:nnodes], end[:nnodes], child[:nnodes], area, center, radius
+
+
+@numba.njit(parallel=True)
+def _geometry_inside_mesh_fast(
+    triangles,
+    order,
+    start,
+    end,
+    child,
+    area,
+    center,
+    radius,
+    x,
+    y,
+    z,
+    user_tol,
+    beta,
+    lim_x,
+    lim_y,
+    lim_z,
+):
+
+    result = np.zeros((x.size, y.size, z.size), dtype=numba.boolean)
+
+    for i in numba.prange(lim_x[0], lim_x[1]):
+        for j in range(*lim_y):
+            for k in range(*lim_z):
+                result[i, j, k] = (
+                    _winding_number_fast(
+                        triangles,
+                        order,
+                        start,
+                        end,
+                        child,
+                        area,
+                        center,
+                        radius,
+                        x[i],
+                        y[j],
+                        z[k],
+                        beta,
+                    )
+                    >= user_tol
+                )
+
+    return result
+
+
+@numba.njit
+def _winding_number_fast(
+    triangles, order, start, end, child, area, center, radius, x, y, z, beta
+):
+    # Same scale used by _point_in_geometry, where the sum of arctan2 over all
+    # triangles is half the solid angle, i.e., 2pi at the interior points.
+    X = np.array((x, y, z), dtype=triangles.dtype)
+
+    ret = 0.0
+
+    stack = [0]
+    while len(stack) > 0:
+        node = stack.pop()
+        R = center[node] - X
+        dist = _anorm2(R)
+        if child[node, 0] < 0:
+            # Leaf, exact contribution from each triangle
+            for t in order[start[node] : end[node]]:
+                A = triangles[t, 0] - X
+                B = triangles[t, 1] - X
+                C = triangles[t, 2] - X
+                omega = _adet(A, B, C)
+
+                a, b, c = _anorm2(A), _anorm2(B), _anorm2(C)
+                d = a * b * c
+                d += c * np.sum(np.multiply(A, B))
+                d += a * np.sum(np.multiply(B, C))
+                d += b * np.sum(np.multiply(C, A))
+
+                ret += np.arctan2(omega, d)
+        elif dist > beta * radius[node]:
+            # Far field, dipole expansion
+            ret += 0.5 * np.sum(np.multiply(area[node], R)) / dist ** 3.0
+        else:
+            stack.append(child[node, 0])
+            stack.append(child[node, 1])
+
+    return ret
+
+
+@numba.njit
+def _bin_triangles(triangles, y, z, lim_y, lim_z):
+    """Spatial bins for the triangles, according to their footprint in the ``yz``
+    plane. Each bin groups some consecutive mesh lines in ``y`` and ``z``, and the
+    triangles are stored in compressed sparse row format (offset and index)."""
+
+    ntri = triangles.shape[0]
+    nlines_y = max(lim_y[1] - lim_y[0], 1)
+    nlines_z = max(lim_z[1] - lim_z[0], 1)
+
+    # Roughly sqrt(ntri) bins in each direction
+    nbins = max(int(np.sqrt(ntri)), 1)
+    width_y = max(-(-nlines_y // nbins), 1)
+    width_z = max(-(-nlines_z // nbins), 1)
+    nbins_y = -(-nlines_y // width_y)
+    nbins_z = -(-nlines_z // width_z)
+
+    first = np.zeros((ntri, 2), dtype=np.int64)
+    last = -np.ones((ntri, 2), dtype=np.int64)
+    count = np.zeros(nbins_y * nbins_z + 1, dtype=np.int64)
+
+    for t in range(ntri):
+        j0 = max(np.searchsorted(y, triangles[t, :, 1].min(), "left"), lim_y[0])
+        j1 = min(np.searchsorted(y, triangles[t, :, 1].max(), "right"), lim_y[1])
+        k0 = max(np.searchsorted(z, triangles[t, :, 2].min(), "left"), lim_z[0])
+        k1 = min(np.searchsorted(z, triangles[t, :, 2].max(), "right"), lim_z[1])
+        if j0 >= j1 or k0 >= k1:
+            continue
+        first[t, 0] = (j0 - lim_y[0]) // width_y
+        last[t, 0] = (j1 - 1 - lim_y[0]) // width_y
+        first[t, 1] = (k0 - lim_z[0]) // width_z
+        last[t, 1] = (k1 - 1 - lim_z[0]) // width_z
+        for jb in range(first[t, 0], last[t, 0] + 1):
+            for kb in range(first[t, 1], last[t, 1] + 1):
+                count[jb * nbins_z + kb + 1] += 1
+
+    offset = np.cumsum(count)
+    index = np.zeros(offset[-1], dtype=np.int64)
+    position = offset[:-1].copy()
+
+    for t in range(ntri):
+        for jb in range(first[t, 0], last[t, 0] + 1):
+            for kb in range(first[t, 1], last[t, 1] + 1):
+                index[position[jb * nbins_z + kb]] = t
+                position[jb * nbins_z + kb] += 1
+
+    return offset, index, width_y, width_z, nbins_z
+
+
+@numba.njit
+def _owns_edge(dy, dz):
+    # Tie-breaking rule for points exactly at an edge: when two triangles share
+    # an edge, it has opposite directions on them, so only one owns it
+    return dz > 0.0 or (dz == 0.0 and dy < 0.0)
+
+
+@numba.njit(parallel=True)
+def _geometry_inside_mesh_raycast(
+    triangles,
+    offset,
+    index,
+    width_y,
+    width_z,
+    nbins_z,
+    x,
+    y,
+    z,
+    user_tol,
+    lim_x,
+    lim_y,
+    lim_z,
+):
+
+    result = np.zeros((x.size, y.size, z.size), dtype=numba.boolean)
+
+    nlines_z = lim_z[1] - lim_z[0]
+    nlines = (lim_y[1] - lim_y[0]) * nlines_z
+
+    for line in numba.prange(nlines):
+        j = lim_y[0] + line // nlines_z
+        k = lim_z[0] + line % nlines_z
+        b = ((j - lim_y[0]) // width_y) * nbins_z + (k - lim_z[0]) // width_z
+
+        crossings = np.zeros(offset[b + 1] - offset[b])
+        ncross = 0
+
+        for t in index[offset[b] : offset[b + 1]]:
+            y0, z0 = triangles[t, 0, 1], triangles[t, 0, 2]
+            y1, z1 = triangles[t, 1, 1], triangles[t, 1, 2]
+            y2, z2 = triangles[t, 2, 1], triangles[t, 2, 2]
+            x0, x1, x2 = triangles[t, 0, 0], triangles[t, 1, 0], triangles[t, 2, 0]
+
+            area = (y1 - y0) * (z2 - z0) - (z1 - z0) * (y2 - y0)
+            if area == 0.0:
+                # Parallel to the ray
+                continue
+            if area < 0.0:
+                # Counterclockwise in the yz plane
+                y1, z1, x1, y2, z2, x2 = y2, z2, x2, y1, z1, x1
+                area = -area
+
+            # Edge functions, they are the barycentric coordinates times the area
+            e0 = (y2 - y1) * (z[k] - z1) - (z2 - z1) * (y[j] - y1)
+            e1 = (y0 - y2) * (z[k] - z2) - (z0 - z2) * (y[j] - y2)
+            e2 = (y1 - y0) * (z[k] - z0) - (z1 - z0) * (y[j] - y0)
+
+            if e0 < 0.0 or (e0 == 0.0 and not _owns_edge(y2 - y1, z2 - z1)):
+                continue
+            if e1 < 0.0 or (e1 == 0.0 and not _owns_edge(y0 - y2, z0 - z2)):
+                continue
+            if e2 < 0.0 or (e2 == 0.0 and not _owns_edge(y1 - y0, z1 - z0)):
+                continue
+
+            crossings[ncross] = (e0 * x0 + e1 * x1 + e2 * x2) / area
+            ncross += 1
+
+        if ncross % 2 != 0:
+            # Fallback to the generalized winding number
+            for i in range(*lim_x):
+                result[i, j, k] = _point_in_geometry(
+                    triangles, x[i], y[j], z[k], user_tol
+                )
+            continue
+
+        crossings = np.sort(crossings[:ncross])
+        for n in range(0, ncross, 2):
+            i0 = max(np.searchsorted(x, crossings[n], "left"), lim_x[0])
+            i1 = min(np.searchsorted(x, crossings[n + 1], "right"), lim_x[1])
+            for i in range(i0, i1):
+                result[i, j, k] = True
+
+    return result
+
+
+@numba.njit(parallel=True)
+def _geometry_cylinders(
+    a, b, c, center_a, center_b, center_c, radii, height, lim_a, lim_b, lim_c
+):
+    # Cylinders parallel to the last dimension, height is inf when unbounded
+
+    result = np.zeros((a.size, b.size, c.size), dtype=numba.boolean)
+
+    for i in numba.prange(a.size):
+        for n in range(radii.size):
+            if i < lim_a[n, 0] or i >= lim_a[n, 1]:
+                continue
+            for j in range(lim_b[n, 0], lim_b[n, 1]):
+                dis = (a[i] - center_a[n]) ** 2.0 + (b[j] - center_b[n]) ** 2.0
+                if np.sqrt(dis) > radii[n]:
+                    continue
+                for k in range(lim_c[n, 0], lim_c[n, 1]):
+                    if (
+                        c[k] <= center_c[n] + 0.5 * height[n]
+                        and c[k] >= center_c[n] - 0.5 * height[n]
+                    ):
+                        result[i, j, k] = True
+
+    return result
+
+
+@numba.njit(parallel=True)
+def _fast_sweeping(distance, seed, x, y, z, band, tol):
+    # The eight sweeps are computed in parallel and combined by the minimum
+
+    trial = np.empty((8,) + distance.shape, dtype=distance.dtype)
+
+    while True:
+        for s in numba.prange(8):
+            trial[s] = distance
+            _sweep(trial[s], seed, x, y, z, band, s & 1, (s >> 1) & 1, (s >> 2) & 1)
+
+        change = 0.0
+        for i in numba.prange(x.size):
+            for j in range(y.size):
+                for k in range(z.size):
+                    value = trial[0, i, j, k]
+                    for s in range(1, 8):
+                        value = min(value, trial[s, i, j, k])
+                    change = max(change, distance[i, j, k] - value)
+                    distance[i, j, k] = value
+
+        if change <= tol:
+            return distance
+
+
+@numba.njit
+def _sweep(distance, seed, x, y, z, band, reverse_x, reverse_y, reverse_z):
+    # Gauss-Seidel iterations in one of the eight directions
+    nx, ny, nz = distance.shape
+
+    for ii in range(nx):
+        i = nx - 1 - ii if reverse_x else ii
+        for jj in range(ny):
+            j = ny - 1 - jj if reverse_y else jj
+            for kk in range(nz):
+                k = nz - 1 - kk if reverse_z else kk
+                if seed[i, j, k]:
+                    continue
+
+                # The smallest neighbor in each direction and the spacing to it
+                ax, hx = _upwind(distance, x, i, j, k, i - 1, j, k, i + 1, j, k, i)
+                ay, hy = _upwind(distance, y, i, j, k, i, j - 1, k, i, j + 1, k, j)
+                az, hz = _upwind(distance, z, i, j, k, i, j, k - 1, i, j, k + 1, k)
+
+                # Nothing to do out of the narrow band
+                if min(ax, ay, az) >= band:
+                    continue
+
+                value = _godunov(ax, hx, ay, hy, az, hz)
+                if value < distance[i, j, k]:
+                    distance[i, j, k] = min(value, band)
+
+
+@numba.njit(inline="always")
+def _upwind(distance, coord, i, j, k, i0, j0, k0, i1, j1, k1, n):
+    a, h = np.inf, 1.0
+    if n > 0:
+        a, h = distance[i0, j0, k0], coord[n] - coord[n - 1]
+    if n < coord.size - 1 and distance[i1, j1, k1] < a:
+        a, h = distance[i1, j1, k1], coord[n + 1] - coord[n]
+    return a, h
+
+
+@numba.njit(inline="always")
+def _godunov(a0, h0, a1, h1, a2, h2):
+    # Solve sum(((u - a) / h) ** 2) = 1 for u > a, adding one direction at a time
+    if a1 < a0:
+        a0, h0, a1, h1 = a1, h1, a0, h0
+    if a2 < a1:
+        a1, h1, a2, h2 = a2, h2, a1, h1
+    if a1 < a0:
+        a0, h0, a1, h1 = a1, h1, a0, h0
+
+    value = a0 + h0
+    if not a1 < value:
+        return value
+
+    w0, w1 = 1.0 / (h0 * h0), 1.0 / (h1 * h1)
+    sum_1 = w0 + w1
+    sum_a = a0 * w0 + a1 * w1
+    sum_a2 = a0 * a0 * w0 + a1 * a1 * w1
+    discriminant = sum_a * sum_a - sum_1 * (sum_a2 - 1.0)
+    if discriminant < 0.0:
+        return value
+    value = (sum_a + np.sqrt(discriminant)) / sum_1
+    if not a2 < value:
+        return value
+
+    w2 = 1.0 / (h2 * h2)
+    sum_1 += w2
+    sum_a += a2 * w2
+    sum_a2 += a2 * a2 * w2
+    discriminant = sum_a * sum_a - sum_1 * (sum_a2 - 1.0)
+    if discriminant < 0.0:
+        return value
+    return (sum_a + np.sqrt(discriminant)) / sum_1
+
+
+@numba.njit(parallel=True)
+def _random_fourier_modes(x, y, z, wavevector, phase, amplitude):
+    # Sum of the modes for each point, amplitude has shape (3, modes)
+
+    result = np.empty((3, x.size, y.size, z.size), dtype=np.float64)
+
+    # cos(a + b) = cos(a) cos(b) - sin(a) sin(b), where b is the term in z,
+    # so just multiplications and additions are left at the innermost loop
+    cos_z = np.cos(np.outer(z, wavevector[:, 2]))
+    sin_z = np.sin(np.outer(z, wavevector[:, 2]))
+
+    for i in numba.prange(x.size):
+        for j in range(y.size):
+            line = wavevector[:, 0] * x[i] + wavevector[:, 1] * y[j] + phase
+            cos_line = np.cos(line)
+            sin_line = np.sin(line)
+            for k in range(z.size):
+                u, v, w = 0.0, 0.0, 0.0
+                for n in range(phase.size):
+                    c = cos_line[n] * cos_z[k, n] - sin_line[n] * sin_z[k, n]
+                    u += amplitude[0, n] * c
+                    v += amplitude[1, n] * c
+                    w += amplitude[2, n] * c
+                result[0, i, j, k] = u
+                result[1, i, j, k] = v
+                result[2, i, j, k] = w
+
+    return result